@@ -0,0 +1,102 @@
+"""Shared helpers for the Asterisk Doorbell benchmarks."""
+import os
+import sys
+
+from aiohttp import WSMsgType, web
+
+# Make `custom_components.asterisk_doorbell` importable when run from a checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SDP_BODY = (
+    "v=0\r\n"
+    "o=- 4611731400430051336 2 IN IP4 127.0.0.1\r\n"
+    "s=-\r\n"
+    "t=0 0\r\n"
+    "a=group:BUNDLE 0 1\r\n"
+    "m=audio 9 UDP/TLS/RTP/SAVPF 111 63 9 0 8 13 110 126\r\n"
+    "c=IN IP4 0.0.0.0\r\n"
+    "a=rtcp:9 IN IP4 0.0.0.0\r\n"
+    "a=ice-ufrag:Yx2k\r\n"
+    "a=ice-pwd:Sx3zq0W0dBqW1JQ3lGZb2xEn\r\n"
+    "a=fingerprint:sha-256 5E:0D:7A:1C:9E:36:83:6A:0A:11:72:9F:EA:2F:12:4C:"
+    "B5:0E:36:1B:9C:51:6E:0F:11:95:5A:47:25:60:25:4C\r\n"
+    "a=setup:actpass\r\n"
+    "a=mid:0\r\n"
+    "a=sendrecv\r\n"
+    "a=rtpmap:111 opus/48000/2\r\n"
+    "a=rtpmap:0 PCMU/8000\r\n"
+    "a=rtpmap:8 PCMA/8000\r\n"
+    "m=video 9 UDP/TLS/RTP/SAVPF 96 97 102\r\n"
+    "c=IN IP4 0.0.0.0\r\n"
+    "a=mid:1\r\n"
+    "a=recvonly\r\n"
+    "a=rtpmap:96 VP8/90000\r\n"
+    "a=rtpmap:102 H264/90000\r\n"
+) * 2
+
+
+def sip_request(method, seq, body=""):
+    """Build a realistic JsSIP-style request frame."""
+    return (
+        f"{method} sip:asterisk.local;transport=ws SIP/2.0\r\n"
+        f"Via: SIP/2.0/WSS 8a2k3j1l.invalid;branch=z9hG4bK{seq:08d}\r\n"
+        "Max-Forwards: 69\r\n"
+        f"To: <sip:homeassistant@asterisk.local>\r\n"
+        f"From: <sip:homeassistant@asterisk.local>;tag=k3l1m2n4o5\r\n"
+        f"Call-ID: bench-{seq:08d}\r\n"
+        f"CSeq: {seq} {method}\r\n"
+        "Contact: <sip:r5t6y7u8@8a2k3j1l.invalid;transport=ws>;expires=120\r\n"
+        "Allow: INVITE,ACK,CANCEL,BYE,UPDATE,MESSAGE,OPTIONS,REFER,INFO,NOTIFY\r\n"
+        "Supported: path,gruu,outbound\r\n"
+        "User-Agent: Asterisk Doorbell HA (SIPManager)\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "\r\n"
+        f"{body}"
+    )
+
+
+# Representative mix of frames crossing the proxy: mostly small requests
+# with the occasional large INVITE carrying SDP.
+FRAME_MIX = (
+    ("REGISTER", ""),
+    ("OPTIONS", ""),
+    ("REGISTER", ""),
+    ("INVITE", SDP_BODY),
+)
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def start_site(app, host="127.0.0.1"):
+    """Start an aiohttp app on a free port and return (runner, port)."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+def echo_app():
+    """WebSocket server that echoes every frame back, standing in for Asterisk."""
+
+    async def handler(request):
+        ws = web.WebSocketResponse(protocols=["sip"])
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                await ws.send_str(msg.data)
+            elif msg.type == WSMsgType.BINARY:
+                await ws.send_bytes(msg.data)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    return app
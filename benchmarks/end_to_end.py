@@ -0,0 +1,301 @@
+"""End-to-end ring latency and load benchmark.
+
+Drives the asterisk_doorbell.call, answered and terminate services on a
+bare Home Assistant core with the integration's services, event gate and
+call history set up, while N simulated dashboards are subscribed through
+asterisk_doorbell/subscribe_state and M SIP clients sit on the WebSocket
+proxy in front of a fake Asterisk. Reports:
+
+- ring to state: from the call service being invoked until every
+  subscriber has been sent the ringing state, p50 and p99
+- state writes per ring: sensor writes caused by one call, answered and
+  terminate cycle, counted on the coordinator listeners the sensors use
+- memory per proxied connection, measured with tracemalloc in this process
+  while the clients and the fake Asterisk run in a child process
+
+Gate timings are scaled down like the other benchmarks so a run takes
+seconds; pass --time-scale 1 for real timings.
+
+    python benchmarks/end_to_end.py --subscribers 20 --clients 50 --rings 200
+"""
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import statistics
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import WSMsgType, web
+
+from common import percentile, sip_request, start_site
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.asterisk_doorbell import GlobalAsteriskCoordinator, services
+from custom_components.asterisk_doorbell.const import DOMAIN
+from custom_components.asterisk_doorbell.history import async_setup_history
+from custom_components.asterisk_doorbell.settings import async_cache_settings
+from custom_components.asterisk_doorbell.sip import KEEPALIVE_PING
+from custom_components.asterisk_doorbell.websocket_api import websocket_subscribe_state
+from custom_components.asterisk_doorbell.websocket_proxy import async_pipe_websockets
+
+
+class Subscriber:
+    """Stands in for a dashboard's websocket connection."""
+
+    def __init__(self, expected):
+        """Initialize the connection."""
+        self.subscriptions = {}
+        self._expected = expected
+
+    def send_result(self, msg_id, result=None):
+        """Accept the subscription."""
+
+    def send_error(self, msg_id, code, message):
+        """Fail loudly; the benchmark set something up wrong."""
+        raise RuntimeError(message)
+
+    def send_message(self, message):
+        """Record when a state the benchmark waits for was sent."""
+        # Home Assistant serializes every message it queues for a client
+        json.dumps(message)
+        state = message["event"]
+        key = (state["confbridge_id"], state["call_status"])
+        received = self._expected.get(key)
+        if received is not None:
+            received.append(time.perf_counter())
+
+
+def count_sensor_writes(coordinator, writes):
+    """Register listeners the way the sensors do and count their writes."""
+
+    def write():
+        writes[0] += 1
+
+    for field in coordinator.FIELDS:
+        coordinator.async_add_listener(write, field)
+
+    def new_bridge(confbridge_id):
+        # The new confbridge sensor writes its first state when added
+        write()
+        coordinator.async_add_bridge_listener(confbridge_id, write)
+
+    coordinator.async_add_new_bridge_callback(new_bridge)
+
+
+async def ring_loop(hass, confbridge_id, rings, hold, expected, latencies):
+    """Ring one confbridge over and over: call, answered, terminate."""
+    for _ in range(rings):
+        received = expected[(confbridge_id, "ringing")] = []
+        started = time.perf_counter()
+        await hass.services.async_call(
+            DOMAIN, "call", {"confbridge": confbridge_id, "extension": "9001"}, blocking=True
+        )
+        if received:
+            latencies.append(max(received) - started)
+        del expected[(confbridge_id, "ringing")]
+
+        await asyncio.sleep(hold)
+        await hass.services.async_call(
+            DOMAIN, "answered", {"confbridge": confbridge_id, "extension": "9001"}, blocking=True
+        )
+        await asyncio.sleep(hold)
+        await hass.services.async_call(DOMAIN, "terminate", {"confbridge": confbridge_id}, blocking=True)
+        await asyncio.sleep(hold)
+
+
+def fake_asterisk_and_clients(clients, ping_interval, conn):
+    """Child process: the fake Asterisk and the proxied SIP clients."""
+
+    async def asterisk(request):
+        ws = web.WebSocketResponse(protocols=["sip"])
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                await ws.send_str(msg.data)
+        return ws
+
+    async def client(session, url, index, stop):
+        async with session.ws_connect(url, protocols=["sip"]) as ws:
+            await ws.send_str(sip_request("REGISTER", index))
+            await ws.receive_str()
+            ready.release()
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), ping_interval)
+                except asyncio.TimeoutError:
+                    await ws.send_str(KEEPALIVE_PING)
+                    await ws.receive_str()
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/ws", asterisk)
+        runner, port = await start_site(app)
+        conn.send(port)
+        proxy_port = await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+
+        stop = asyncio.Event()
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            tasks = [
+                asyncio.create_task(client(session, f"ws://127.0.0.1:{proxy_port}/ws", index, stop))
+                for index in range(clients)
+            ]
+            for _ in range(clients):
+                await ready.acquire()
+            conn.send("connected")
+            await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+            stop.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await runner.cleanup()
+
+    ready = asyncio.Semaphore(0)
+    asyncio.run(main())
+
+
+def proxy_app(session, upstream_url):
+    """Minimal stand-in for AsteriskWebSocketProxyView using the same engine."""
+
+    async def handler(request):
+        ws_client = web.WebSocketResponse(protocols=["sip"])
+        await ws_client.prepare(request)
+        ws_upstream = await session.ws_connect(upstream_url, protocols=["sip"])
+        await async_pipe_websockets(ws_client, ws_upstream)
+        return ws_client
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    return app
+
+
+async def run(args):
+    hass = HomeAssistant(tempfile.mkdtemp())
+    services.COALESCE_WINDOW *= args.time_scale
+
+    # Each entry owns every --entries'th confbridge, like one entry per site
+    bridges = [f"door_{index}" for index in range(args.bridges)]
+    writes = [0]
+    hass.data[DOMAIN] = {}
+    for index in range(args.entries):
+        entry = SimpleNamespace(
+            entry_id=f"entry_{index}",
+            data={"confbridges": ",".join(bridges[index::args.entries])},
+            options={},
+        )
+        async_cache_settings(hass, entry)
+        coordinator = GlobalAsteriskCoordinator(hass)
+        count_sensor_writes(coordinator, writes)
+        hass.data[DOMAIN][entry.entry_id] = coordinator
+    if hasattr(services, "async_update_routes"):
+        services.async_update_routes(hass)
+    await async_setup_history(hass)
+    await services.async_setup_services(hass)
+
+    expected = {}
+    for index in range(args.subscribers):
+        connection = Subscriber(expected)
+        websocket_subscribe_state(hass, connection, {
+            "id": 1,
+            "type": "asterisk_doorbell/subscribe_state",
+            "entry_id": f"entry_{index % args.entries}",
+        })
+
+    # The proxied clients and the fake Asterisk live in a child process so
+    # tracemalloc only sees the proxy side of each connection
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    child = context.Process(
+        target=fake_asterisk_and_clients, args=(args.clients, args.ping_interval, child_conn)
+    )
+    child.start()
+    loop = asyncio.get_running_loop()
+    upstream_port = await loop.run_in_executor(None, parent_conn.recv)
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    proxy_runner, proxy_port = await start_site(proxy_app(session, f"ws://127.0.0.1:{upstream_port}/ws"))
+    parent_conn.send(proxy_port)
+    await loop.run_in_executor(None, parent_conn.recv)
+    gc.collect()
+    per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / max(args.clients, 1)
+    tracemalloc.stop()
+
+    latencies = []
+    writes[0] = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        ring_loop(
+            hass,
+            confbridge_id,
+            args.rings // args.bridges,
+            args.hold,
+            expected,
+            latencies,
+        )
+        for confbridge_id in bridges
+    ))
+    # Let the last coalescing windows close
+    await asyncio.sleep(services.COALESCE_WINDOW * 2)
+    elapsed = time.perf_counter() - started
+    rings = args.rings // args.bridges * args.bridges
+
+    parent_conn.send("stop")
+    await loop.run_in_executor(None, child.join)
+    await session.close()
+    await proxy_runner.cleanup()
+    await services.async_unload_services(hass)
+
+    results = {
+        "rings": rings,
+        "rings_seen": len(latencies),
+        "ring_to_state_p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "ring_to_state_p99_ms": percentile(latencies, 99) * 1000,
+        "state_writes_per_ring": writes[0] / rings if rings else None,
+        "bytes_per_proxied_connection": per_connection,
+    }
+
+    print(
+        f"setup:          {args.entries} entries, {args.subscribers} subscribers, "
+        f"{args.clients} proxied clients, {args.bridges} confbridges ringing concurrently"
+    )
+    print(
+        f"rings:          {rings} in {elapsed:.1f}s, {len(latencies)} seen by subscribers "
+        f"(time scale {args.time_scale})"
+    )
+    print(
+        f"ring to state:  p50 {results['ring_to_state_p50_ms']:.3f} ms   "
+        f"p99 {results['ring_to_state_p99_ms']:.3f} ms   (all subscribers sent ringing)"
+    )
+    print(f"state writes:   {results['state_writes_per_ring']:.1f} per ring (call, answered, terminate)")
+    print(f"memory:         {per_connection / 1024:.1f} KiB per proxied connection")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"args": vars(args), "results": results}, file, indent=2)
+
+    await hass.async_stop(force=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=20, help="dashboards subscribed to the state")
+    parser.add_argument("--clients", type=int, default=50, help="SIP clients on the proxy")
+    parser.add_argument("--rings", type=int, default=200)
+    parser.add_argument("--bridges", type=int, default=4, help="confbridges ringing concurrently")
+    parser.add_argument("--entries", type=int, default=1, help="config entries")
+    parser.add_argument("--hold", type=float, default=0.02, help="seconds between call, answered and terminate")
+    parser.add_argument("--ping-interval", type=float, default=1, help="seconds between client keepalives")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="factor applied to the gate's timings")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
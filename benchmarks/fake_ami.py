@@ -0,0 +1,170 @@
+"""Check the AMI listener against a small fake Asterisk Manager Interface.
+
+Runs AsteriskAmiListener on a bare Home Assistant core with the
+integration's services and one coordinator, against a fake AMI server on
+localhost that plays through:
+
+- login: a wrong secret is rejected and retried with back-off, the right
+  one is accepted
+- event parsing: ConfbridgeJoin of a visitor and of the admin (with the
+  ADMIN channel variable), ConfbridgeLeave and ConfbridgeEnd, with
+  unrelated events and messages in between
+- reconnect: the server drops the connection, the listener logs in again
+  and the next event still reaches the coordinator
+
+Prints how long each step took and exits non-zero if the coordinator
+didn't end up in the expected state.
+
+    python benchmarks/fake_ami.py
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import common  # noqa: F401  puts the integration on sys.path
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.asterisk_doorbell import GlobalAsteriskCoordinator, ami, services
+from custom_components.asterisk_doorbell.const import DOMAIN
+from custom_components.asterisk_doorbell.settings import async_cache_settings
+
+USERNAME = "doorbell"
+SECRET = "s3cret"
+
+
+class FakeAmi:
+    """Just enough of an AMI server to log in and stream ConfBridge events."""
+
+    def __init__(self, secret):
+        """Initialize the server; the first login is checked against secret."""
+        self.secret = secret
+        self.logins = []
+        self.sessions = asyncio.Queue()
+
+    async def handle(self, reader, writer):
+        """Serve one AMI connection."""
+        writer.write(b"Asterisk Call Manager/5.0.1\r\n")
+        action = {}
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            action[key.strip()] = value.strip()
+
+        accepted = action.get("Action") == "Login" and action.get("Secret") == self.secret
+        self.logins.append((time.monotonic(), accepted))
+        if not accepted:
+            writer.write(b"Response: Error\r\nMessage: Authentication failed\r\n\r\n")
+            await writer.drain()
+            writer.close()
+            return
+        writer.write(b"Response: Success\r\nMessage: Authentication accepted\r\n\r\n")
+        await writer.drain()
+        await self.sessions.put(writer)
+
+    @staticmethod
+    def event(writer, name, **fields):
+        """Send one event, with ChanVariable lines for chanvars."""
+        chanvars = fields.pop("chanvars", {})
+        lines = [f"Event: {name}"]
+        lines.extend(f"{key}: {value}" for key, value in fields.items())
+        lines.extend(f"ChanVariable: {key}={value}" for key, value in chanvars.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+
+
+async def wait_for_state(coordinator, confbridge_id, call_status, timeout=2):
+    """Wait until a confbridge has the given state; return how long it took."""
+    started = time.monotonic()
+    while coordinator.bridge_state(confbridge_id)["call_status"] != call_status:
+        if time.monotonic() - started > timeout:
+            raise AssertionError(
+                f"{confbridge_id} is {coordinator.bridge_state(confbridge_id)}, expected {call_status}"
+            )
+        await asyncio.sleep(0.001)
+    return time.monotonic() - started
+
+
+async def run(args):
+    hass = HomeAssistant(tempfile.mkdtemp())
+    ami.RECONNECT_MIN_DELAY *= args.time_scale
+    ami.RECONNECT_MAX_DELAY *= args.time_scale
+    services.COALESCE_WINDOW *= args.time_scale
+
+    entry = SimpleNamespace(entry_id="entry", data={"asterisk_host": "127.0.0.1"}, options={})
+    async_cache_settings(hass, entry)
+    coordinator = GlobalAsteriskCoordinator(hass)
+    hass.data[DOMAIN] = {entry.entry_id: coordinator}
+    services.async_update_routes(hass)
+    await services.async_setup_services(hass)
+
+    fake = FakeAmi("wrong secret")
+    server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    listener = ami.AsteriskAmiListener(hass, "127.0.0.1", port, USERNAME, SECRET)
+    started = time.monotonic()
+    listener.async_start()
+
+    # Login: rejected once, then accepted on the back-off retry
+    while not fake.logins:
+        await asyncio.sleep(0.001)
+    fake.secret = SECRET
+    writer = await asyncio.wait_for(fake.sessions.get(), 5)
+    login_s = time.monotonic() - started
+
+    # Event parsing
+    FakeAmi.event(writer, "FullyBooted", Status="Fully Booted")
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_1", Admin="No", CallerIDNum="100")
+    ringing_s = await wait_for_state(coordinator, "door_1", "ringing")
+    FakeAmi.event(writer, "Newchannel", Channel="PJSIP/200-00000001")
+    FakeAmi.event(
+        writer, "ConfbridgeJoin", Conference="door_1", Admin="Yes", CallerIDNum="200", chanvars={"ADMIN": "1001"}
+    )
+    await wait_for_state(coordinator, "door_1", "active")
+    extension = coordinator.bridge_state("door_1")["extension"]
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_2", Admin="No", CallerIDNum="101")
+    await wait_for_state(coordinator, "door_2", "ringing")
+    FakeAmi.event(writer, "ConfbridgeLeave", Conference="door_1", Admin="No", CallerIDNum="100")
+    await wait_for_state(coordinator, "door_1", "inactive")
+    await writer.drain()
+
+    # Reconnect: drop the session, the listener logs in again
+    dropped = time.monotonic()
+    writer.close()
+    writer = await asyncio.wait_for(fake.sessions.get(), 5)
+    reconnect_s = time.monotonic() - dropped
+    FakeAmi.event(writer, "ConfbridgeEnd", Conference="door_2")
+    await wait_for_state(coordinator, "door_2", "inactive")
+
+    await listener.async_stop()
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    await services.async_unload_services(hass)
+    await hass.async_stop(force=True)
+
+    print(f"logins:         {len(fake.logins)} ({sum(ok for _, ok in fake.logins)} accepted)")
+    print(f"login:          {login_s * 1000:.1f} ms including one rejected attempt")
+    print(f"join to state:  {ringing_s * 1000:.3f} ms")
+    print(f"admin join:     extension {extension!r} from the ADMIN channel variable")
+    print(f"reconnect:      {reconnect_s * 1000:.1f} ms after the connection dropped")
+
+    if extension != "1001" or [ok for _, ok in fake.logins] != [False, True, True]:
+        print("FAILED", file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--time-scale", type=float, default=0.05, help="factor applied to the back-off and gate timings")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Micro-benchmark for the SIP WebSocket proxy forwarding loop.
+
+Pumps SIP-sized frames from a client through the proxy to a local echo
+server standing in for Asterisk and back, and reports throughput and
+round-trip latency. With --track-dialogs every frame also passes through
+the proxy's per-client dialog tracker, to measure what it costs.
+
+    python benchmarks/proxy_throughput.py --messages 20000 --window 32
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from common import FRAME_MIX, echo_app, percentile, sip_request, start_site
+
+from custom_components.asterisk_doorbell.metrics import SipClientStats
+from custom_components.asterisk_doorbell.sip import DialogTracker
+from custom_components.asterisk_doorbell.websocket_proxy import (
+    DEFAULT_MAX_INFLIGHT,
+    async_pipe_websockets,
+)
+
+
+def proxy_app(session, upstream_url, max_inflight, track_dialogs):
+    """Minimal stand-in for AsteriskWebSocketProxyView using the same engine."""
+
+    async def handler(request):
+        ws_client = web.WebSocketResponse(protocols=["sip"])
+        await ws_client.prepare(request)
+        ws_upstream = await session.ws_connect(upstream_url, protocols=["sip"])
+        tracker = DialogTracker(SipClientStats()) if track_dialogs else None
+        await async_pipe_websockets(ws_client, ws_upstream, max_inflight, tracker=tracker)
+        return ws_client
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    return app
+
+
+async def run(messages, window, max_inflight, track_dialogs):
+    echo_runner, echo_port = await start_site(echo_app())
+    session = aiohttp.ClientSession()
+    proxy_runner, proxy_port = await start_site(
+        proxy_app(session, f"ws://127.0.0.1:{echo_port}/ws", max_inflight, track_dialogs)
+    )
+
+    frames = [
+        sip_request(method, seq, body)
+        for seq, (method, body) in enumerate(FRAME_MIX * (messages // len(FRAME_MIX) + 1))
+    ][:messages]
+    sent_at = [0.0] * messages
+    latencies = []
+
+    async with aiohttp.ClientSession() as client_session:
+        ws = await client_session.ws_connect(
+            f"ws://127.0.0.1:{proxy_port}/ws", protocols=["sip"]
+        )
+        credit = asyncio.Semaphore(window)
+
+        async def sender():
+            for index, frame in enumerate(frames):
+                await credit.acquire()
+                sent_at[index] = time.perf_counter()
+                await ws.send_str(frame)
+
+        started = time.perf_counter()
+        send_task = asyncio.create_task(sender())
+        for index in range(messages):
+            await ws.receive_str()
+            latencies.append(time.perf_counter() - sent_at[index])
+            credit.release()
+        elapsed = time.perf_counter() - started
+        await send_task
+        await ws.close()
+
+    await session.close()
+    await proxy_runner.cleanup()
+    await echo_runner.cleanup()
+
+    size = sum(len(frame) for frame in frames) / messages
+    print(
+        f"messages:       {messages} (avg {size:.0f} chars, window {window}, max_inflight {max_inflight}"
+        f"{', dialog tracking' if track_dialogs else ''})"
+    )
+    print(f"throughput:     {messages / elapsed:,.0f} msg/s round trip")
+    print(f"latency p50:    {percentile(latencies, 50) * 1000:.3f} ms")
+    print(f"latency p99:    {percentile(latencies, 99) * 1000:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=32, help="frames in flight from the client")
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT)
+    parser.add_argument("--track-dialogs", action="store_true", help="run frames through the dialog tracker")
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.window, args.max_inflight, args.track_dialogs))
+
+
+if __name__ == "__main__":
+    main()
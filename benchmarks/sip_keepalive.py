@@ -0,0 +1,200 @@
+"""Load test for the proxy's registration keepalive offload.
+
+Connects many idle JsSIP-like clients through the SIP WebSocket proxy to a
+stub registrar standing in for Asterisk. Each client registers, refreshes
+shortly before its registration expires and sends double-CRLF keepalives,
+which is all an idle dashboard does. The run is repeated with and without
+the offload and the frames that reached the registrar are compared.
+
+Times are scaled down so a run takes seconds rather than hours; the ratio
+between client expiry and upstream expiry is what matters.
+
+    python benchmarks/sip_keepalive.py --clients 100 --duration 20
+"""
+import argparse
+import asyncio
+
+import aiohttp
+from aiohttp import WSMsgType, web
+
+from common import sip_request, start_site
+
+from custom_components.asterisk_doorbell.sip import (
+    KEEPALIVE_PING,
+    KEEPALIVE_PONG,
+    RegistrationOffload,
+    parse_message,
+)
+from custom_components.asterisk_doorbell.websocket_proxy import async_pipe_websockets
+
+
+def registrar_app(stats, max_expires):
+    """WebSocket server that accepts every REGISTER, standing in for Asterisk."""
+
+    async def handler(request):
+        ws = web.WebSocketResponse(protocols=["sip"])
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            stats["frames"] += 1
+            if msg.data == KEEPALIVE_PING:
+                await ws.send_str(KEEPALIVE_PONG)
+                continue
+
+            message = parse_message(msg.data)
+            if message is None or message.method != "REGISTER":
+                continue
+            stats["registers"] += 1
+            granted = min(message.expires() or max_expires, max_expires)
+            contact = message.header("contact").split(";expires=")[0]
+            await ws.send_str(
+                "SIP/2.0 200 OK\r\n"
+                f"Via: {message.header('via')}\r\n"
+                f"From: {message.header('from')}\r\n"
+                f"To: {message.header('to')};tag=registrar\r\n"
+                f"Call-ID: {message.header('call-id')}\r\n"
+                f"CSeq: {message.header('cseq')}\r\n"
+                f"Contact: {contact};expires={granted}\r\n"
+                f"Expires: {granted}\r\n"
+                "Content-Length: 0\r\n"
+                "\r\n"
+            )
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    return app
+
+
+def proxy_app(session, upstream_url, offload, upstream_expires, refresh_margin):
+    """Minimal stand-in for AsteriskWebSocketProxyView using the same engine."""
+
+    async def handler(request):
+        ws_client = web.WebSocketResponse(protocols=["sip"])
+        await ws_client.prepare(request)
+        ws_upstream = await session.ws_connect(upstream_url, protocols=["sip"])
+        await async_pipe_websockets(
+            ws_client,
+            ws_upstream,
+            offload=RegistrationOffload(upstream_expires, refresh_margin) if offload else None,
+        )
+        return ws_client
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    return app
+
+
+async def idle_client(session, url, index, expires, ping_interval, stop):
+    """Register, keep the registration fresh and ping until told to stop."""
+    call_id = f"bench-{index:08d}"
+    seq = 0
+    async with session.ws_connect(url, protocols=["sip"]) as ws:
+
+        async def pinger():
+            while True:
+                await asyncio.sleep(ping_interval)
+                await ws.send_str(KEEPALIVE_PING)
+
+        async def reader():
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT or msg.data == KEEPALIVE_PONG:
+                    continue
+                response = parse_message(msg.data)
+                if response is not None and response.status == 200:
+                    granted.put_nowait(response.expires() or expires)
+
+        granted = asyncio.Queue()
+        tasks = [asyncio.create_task(reader())]
+        if ping_interval:
+            tasks.append(asyncio.create_task(pinger()))
+        try:
+            while not stop.is_set():
+                seq += 1
+                frame = sip_request("REGISTER", seq).replace(f"bench-{seq:08d}", call_id)
+                frame = frame.replace(";expires=120", f";expires={expires}")
+                await ws.send_str(frame)
+                lifetime = await granted.get()
+                # Like JsSIP, refresh a little before the registration expires
+                try:
+                    await asyncio.wait_for(stop.wait(), max(lifetime - 1, lifetime / 2))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def run_once(args, offload):
+    stats = {"frames": 0, "registers": 0}
+    registrar_runner, registrar_port = await start_site(registrar_app(stats, args.max_expires))
+    session = aiohttp.ClientSession()
+    proxy_runner, proxy_port = await start_site(proxy_app(
+        session,
+        f"ws://127.0.0.1:{registrar_port}/ws",
+        offload,
+        args.upstream_expires,
+        args.refresh_margin,
+    ))
+
+    stop = asyncio.Event()
+    async with aiohttp.ClientSession() as client_session:
+        clients = [
+            asyncio.create_task(idle_client(
+                client_session,
+                f"ws://127.0.0.1:{proxy_port}/ws",
+                index,
+                args.expires,
+                args.ping_interval,
+                stop,
+            ))
+            for index in range(args.clients)
+        ]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*clients, return_exceptions=True)
+        # Let the proxy finish closing so un-REGISTERs are counted too
+        await asyncio.sleep(0.5)
+
+    await session.close()
+    await proxy_runner.cleanup()
+    await registrar_runner.cleanup()
+    return stats
+
+
+async def run(args):
+    results = {}
+    for offload in (False, True):
+        results[offload] = await run_once(args, offload)
+
+    print(
+        f"clients:        {args.clients} idle for {args.duration}s "
+        f"(expires {args.expires}s, upstream {args.upstream_expires}s, ping every {args.ping_interval}s)"
+    )
+    for offload, label in ((False, "relay all"), (True, "offload")):
+        stats = results[offload]
+        print(
+            f"{label + ':':15} {stats['frames']:6d} upstream frames "
+            f"({stats['frames'] / args.duration:7.1f}/s), {stats['registers']} REGISTERs"
+        )
+    before, after = results[False]["frames"], results[True]["frames"]
+    if before:
+        print(f"reduction:      {100 * (before - after) / before:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per run")
+    parser.add_argument("--expires", type=int, default=4, help="expiry the clients ask for")
+    parser.add_argument("--upstream-expires", type=int, default=40, help="expiry the offload asks Asterisk for")
+    parser.add_argument("--refresh-margin", type=int, default=2)
+    parser.add_argument("--max-expires", type=int, default=7200, help="registrar's maximum expiry")
+    parser.add_argument("--ping-interval", type=float, default=2, help="0 disables keepalive pings")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Startup cost of the integration: module import and async_setup.
+
+Import time is measured in fresh interpreters that have already imported
+the parts of Home Assistant every integration loads with, so only what this
+integration adds is counted. Setup time is measured against a stub ``hass``
+that accepts registrations without doing anything with them; the first
+config entry's one-time setup is timed separately where the integration
+defers work to it.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from common import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules Home Assistant has loaded before it imports any custom integration
+PRELOADED = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.device_registry",
+)
+
+IMPORT_PROBE = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+for name in {PRELOADED!r}:
+    __import__(name)
+before = set(sys.modules)
+started = time.perf_counter()
+import custom_components.asterisk_doorbell
+elapsed = time.perf_counter() - started
+print(elapsed, len(set(sys.modules) - before))
+"""
+
+
+def measure_import(runs):
+    """Return import times in seconds and the number of modules the import added."""
+    times = []
+    added = 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE], check=True, capture_output=True, text=True
+        ).stdout.split()
+        times.append(float(output[0]))
+        added = int(output[1])
+    return times, added
+
+
+class StubHass:
+    """Just enough of HomeAssistant for the integration's setup to run."""
+
+    def __init__(self, config_dir):
+        # frontend's own setup creates these before any integration loads
+        self.data = {"frontend_extra_module_url": set(), "frontend_panels": {}}
+        self.loop = asyncio.get_running_loop()
+        self.config = SimpleNamespace(path=lambda *parts: os.path.join(config_dir, *parts), config_dir=config_dir)
+        self.http = SimpleNamespace(
+            register_view=lambda view: None,
+            async_register_static_paths=self._async_noop,
+        )
+        self.bus = SimpleNamespace(
+            async_listen_once=lambda event, listener: lambda: None,
+            async_listen=lambda event, listener: lambda: None,
+            async_fire=lambda *args, **kwargs: None,
+        )
+        self.services = SimpleNamespace(
+            async_register=lambda *args, **kwargs: None,
+            has_service=lambda domain, service: False,
+        )
+        self.state = None
+
+    @staticmethod
+    async def _async_noop(*args, **kwargs):
+        return None
+
+    def async_add_executor_job(self, target, *args):
+        return self.loop.run_in_executor(None, target, *args)
+
+    def async_create_task(self, target, *args, **kwargs):
+        return self.loop.create_task(target)
+
+    def async_create_background_task(self, target, name, *args, **kwargs):
+        return self.loop.create_task(target)
+
+
+async def measure_setup(runs):
+    """Return async_setup times and first-entry setup times in seconds."""
+    import custom_components.asterisk_doorbell as integration
+
+    # The card bundle is read from <config>/custom_components/asterisk_doorbell/dist
+    config_dir = tempfile.mkdtemp()
+    os.makedirs(os.path.join(config_dir, "custom_components"))
+    os.symlink(
+        os.path.join(REPO_ROOT, "custom_components", "asterisk_doorbell"),
+        os.path.join(config_dir, "custom_components", "asterisk_doorbell"),
+    )
+
+    first_entry = getattr(integration, "_async_setup_integration", None)
+    setup_times = []
+    entry_times = []
+    for _ in range(runs):
+        hass = StubHass(config_dir)
+        started = time.perf_counter()
+        await integration.async_setup(hass, {})
+        setup_times.append(time.perf_counter() - started)
+
+        if first_entry is not None:
+            started = time.perf_counter()
+            await first_entry(hass)
+            entry_times.append(time.perf_counter() - started)
+    return setup_times, entry_times
+
+
+def report(label, samples):
+    print(
+        f"{label:22} median {statistics.median(samples) * 1000:8.2f} ms   "
+        f"p90 {percentile(samples, 90) * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    import_times, added = measure_import(args.runs)
+    setup_times, entry_times = asyncio.run(measure_setup(args.runs))
+
+    print(f"runs:                  {args.runs}")
+    report("import", import_times)
+    print(f"{'modules added':22} {added}")
+    report("async_setup", setup_times)
+    if entry_times:
+        report("first entry setup", entry_times)
+
+
+if __name__ == "__main__":
+    main()
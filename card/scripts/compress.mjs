@@ -0,0 +1,27 @@
+// Writes .gz and .br siblings of every built script so the integration can
+// serve them pre-compressed instead of compressing on each request. The
+// manifest records which build of each script the siblings were made from.
+import { createHash } from 'crypto';
+import { readdirSync, readFileSync, writeFileSync } from 'fs';
+import { join } from 'path';
+import { brotliCompressSync, constants, gzipSync } from 'zlib';
+
+const distDir = new URL('../../custom_components/asterisk_doorbell/dist/', import.meta.url).pathname;
+const manifest = {};
+
+for (const name of readdirSync(distDir).sort()) {
+    if (!name.endsWith('.js')) continue;
+    const path = join(distDir, name);
+    const data = readFileSync(path);
+    writeFileSync(`${path}.gz`, gzipSync(data, { level: 9 }));
+    writeFileSync(`${path}.br`, brotliCompressSync(data, {
+        params: {
+            [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+            [constants.BROTLI_PARAM_SIZE_HINT]: data.length,
+        },
+    }));
+    manifest[name] = createHash('sha256').update(data).digest('hex');
+    console.log(`compressed ${name}`);
+}
+
+writeFileSync(join(distDir, 'compressed.json'), JSON.stringify(manifest, null, 2) + '\n');
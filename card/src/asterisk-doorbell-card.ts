@@ -1,4 +1,4 @@
-import { RTCSession } from 'jssip/lib/RTCSession';
+import type { RTCSession } from 'jssip/lib/RTCSession';
 
 import { html, LitElement, nothing, css } from 'lit';
 import { property, state } from 'lit/decorators';
@@ -6,13 +6,20 @@ import { property, state } from 'lit/decorators';
 import { HassEntity } from 'home-assistant-js-websocket';
 import { HomeAssistant, LovelaceCardConfig } from 'custom-card-helpers';
 
-import { SIPManager, SIPManagerEvent, SIPStatus } from './sip-manager';
+import { SIPManager, SIPManagerBootstrap, SIPManagerEvent, SIPStatus } from './sip-manager';
+
+// Tolerated difference between the tablet's clock and Home Assistant's when
+// deciding whether a snapshot belongs to the ring in progress
+const SNAPSHOT_CLOCK_SKEW_MS = 10000;
 
 interface Config extends LovelaceCardConfig {
     header?: string;
+    // Needed once several Asterisk Doorbell entries are set up
+    entry_id?: string;
     call_status_entity?: string;
     confbridge_id_entity?: string;
     extension_entity?: string;
+    snapshot_entity?: string;
     debug?: boolean;
     theme?: 'large' | 'small';
     labels?: {
@@ -30,6 +37,15 @@ export class AsteriskDoorbellCard extends LitElement {
     private _callStatusEntity: HassEntity | null = null;
     private _confbridgeIdEntity: HassEntity | null = null;
     private _extensionEntity: HassEntity | null = null;
+    // Pushed state from asterisk_doorbell/subscribe_state; while active the
+    // card no longer derives its state from hass.states.
+    private _stateUnsubscribe: Promise<() => void> | null = null;
+    private _stateSubscribed: boolean = false;
+    private _explicitEntities: boolean = false;
+    private _stateSubscriptionUnavailable: boolean = false;
+    // Entity IDs come from asterisk_doorbell/bootstrap; scanning hass.states
+    // is only the fallback for integrations without the command
+    private _bootstrap: 'none' | 'pending' | 'done' | 'unavailable' = 'none';
     @state() private _confbridgeId: string = '';
     @state() private _extension: string = '';
     @state() private _isMuted: boolean = false;
@@ -38,6 +54,7 @@ export class AsteriskDoorbellCard extends LitElement {
     @state() private _isConnecting: boolean = false;
     @state() private _hasPendingIncomingCall: boolean = false;
     @state() private _sipStatus: SIPStatus = 'not_initialized';
+    private _ringStartedAt: number = 0;
 
     // Media elements owned by this card (browser audio/video must live in the DOM)
     private _localStream: MediaStream | null = null;
@@ -95,6 +112,8 @@ export class AsteriskDoorbellCard extends LitElement {
             this._unsubscribe = null;
         }
 
+        this._unsubscribeState();
+
         // Clean up media elements we own
         this._cleanupMedia();
 
@@ -356,12 +375,53 @@ export class AsteriskDoorbellCard extends LitElement {
     setConfig(config: Config) {
         this._config = { ...config };
         this._header = config.header === '' ? nothing : config.header;
+        this._explicitEntities = !!(config.call_status_entity || config.confbridge_id_entity || config.extension_entity);
+        this._manager.setEntryId(config.entry_id);
 
         if (!this._config.call_status_entity || !this._config.confbridge_id_entity || !this._config.extension_entity) {
+            this._resolveSensors();
+        }
+    }
+
+    private _resolveSensors() {
+        if (this._bootstrap === 'unavailable') {
             this._autoDetectSensors();
+        } else if (this._bootstrap === 'none' && this.hass) {
+            this._loadBootstrap();
         }
     }
 
+    private async _loadBootstrap() {
+        this._bootstrap = 'pending';
+        this._manager.setHass(this.hass);
+        const bootstrap = await this._manager.fetchBootstrap();
+        if (!bootstrap) {
+            this._bootstrap = 'unavailable';
+            this._autoDetectSensors();
+            this._updateState();
+            return;
+        }
+
+        this._bootstrap = 'done';
+        this._applyBootstrap(bootstrap);
+    }
+
+    private _applyBootstrap(bootstrap: SIPManagerBootstrap) {
+        // Entities set in the card config win over the resolved ones
+        const newConfig = { ...this._config };
+        for (const [key, entityId] of Object.entries(bootstrap.entities)) {
+            if (entityId && !newConfig[key]) newConfig[key] = entityId;
+        }
+        this._config = newConfig;
+
+        // Show the current state right away instead of waiting for the
+        // subscription or the next hass update
+        if (!this._explicitEntities && !this._stateSubscribed) {
+            this._applyPushedState(bootstrap.state);
+        }
+        this._log('Bootstrapped from entry ' + bootstrap.entry_id);
+    }
+
     private _autoDetectSensors() {
         if (!this.hass) return;
         const newConfig = { ...this._config };
@@ -373,12 +433,22 @@ export class AsteriskDoorbellCard extends LitElement {
                 newConfig.confbridge_id_entity = entityId;
             } else if (entityId.includes('asterisk_doorbell_extension')) {
                 newConfig.extension_entity = entityId;
+            } else if (!newConfig.snapshot_entity && entityId.startsWith('image.') && entityId.includes('asterisk_doorbell_snapshot')) {
+                newConfig.snapshot_entity = entityId;
             }
         });
 
         this._config = newConfig;
     }
 
+    willUpdate(changedProps: any) {
+        // Before rendering, so the first ringing frame can't show the
+        // previous visitor's snapshot
+        if (changedProps.has('_callState') && this._callState === 'ringing') {
+            this._ringStartedAt = Date.now();
+        }
+    }
+
     updated(changedProps: any) {
         const previousCallState = changedProps.get('_callState');
 
@@ -394,7 +464,10 @@ export class AsteriskDoorbellCard extends LitElement {
                 });
             }
 
-            this._updateState();
+            this._subscribeState();
+            if (!this._stateSubscribed) {
+                this._updateState();
+            }
         }
 
         if (
@@ -424,11 +497,47 @@ export class AsteriskDoorbellCard extends LitElement {
         }
     }
 
+    private _subscribeState() {
+        // Cards pinned to specific entities keep following those entities
+        if (this._stateUnsubscribe || this._explicitEntities || this._stateSubscriptionUnavailable) return;
+        if (!this.hass?.connection) return;
+
+        this._stateUnsubscribe = this.hass.connection.subscribeMessage(
+            (state: any) => this._applyPushedState(state),
+            { type: 'asterisk_doorbell/subscribe_state', ...(this._config.entry_id ? { entry_id: this._config.entry_id } : {}) },
+        );
+        this._stateUnsubscribe
+            .then(() => {
+                this._stateSubscribed = true;
+                this._log('Subscribed to pushed doorbell state');
+            })
+            .catch((e) => {
+                // Older integration without the command: stay on hass.states
+                this._log('State subscription unavailable, using hass.states: ' + (e?.message || e), 'warning');
+                this._stateUnsubscribe = null;
+                this._stateSubscriptionUnavailable = true;
+            });
+    }
+
+    private _unsubscribeState() {
+        if (this._stateUnsubscribe) {
+            this._stateUnsubscribe.then((unsub) => unsub()).catch(() => {});
+            this._stateUnsubscribe = null;
+        }
+        this._stateSubscribed = false;
+    }
+
+    private _applyPushedState(state: { call_status: string; confbridge_id: string; extension: string }) {
+        if (state.confbridge_id !== this._confbridgeId) this._confbridgeId = state.confbridge_id;
+        if (state.extension !== this._extension) this._extension = state.extension;
+        if (state.call_status !== this._callState) this._callState = state.call_status;
+    }
+
     private _updateState() {
         if (!this.hass) return;
 
         if (!this._config.call_status_entity || !this._config.confbridge_id_entity || !this._config.extension_entity) {
-            this._autoDetectSensors();
+            this._resolveSensors();
         }
 
         if (this._config.call_status_entity) {
@@ -510,6 +619,17 @@ export class AsteriskDoorbellCard extends LitElement {
         }
     }
 
+    private _snapshotUrl(): string | null {
+        const entityId = this._config.snapshot_entity;
+        const entity = entityId ? this.hass.states[entityId] : undefined;
+        const picture = entity?.attributes?.entity_picture;
+        if (!picture || !entity!.state) return null;
+
+        // The image entity's state is the time its snapshot was taken
+        if (Date.parse(entity!.state) < this._ringStartedAt - SNAPSHOT_CLOCK_SKEW_MS) return null;
+        return `${picture}&t=${encodeURIComponent(entity!.state)}`;
+    }
+
     // ── Render (unchanged from original) ──────────────────────────────────
 
     render() {
@@ -521,6 +641,7 @@ export class AsteriskDoorbellCard extends LitElement {
         const shouldShowRinging = this._callState === 'ringing' || this._hasPendingIncomingCall;
         const isInCall = (this._callState === 'active' && hasSession) || (hasSession && !this._hasPendingIncomingCall && !this._isConnecting);
         const isLarge = this._config.theme !== 'small';
+        const snapshotUrl = shouldShowRinging && !hasSession ? this._snapshotUrl() : null;
 
         let callBtnIcon = 'mdi:phone-off';
         let callBtnLabel = this._getLabel('inactive');
@@ -550,6 +671,10 @@ export class AsteriskDoorbellCard extends LitElement {
         return html`
             <ha-card>
                 <div class="card-content">
+                    ${snapshotUrl ? html`
+                        <img class="snapshot" src="${snapshotUrl}" alt="Visitor at the door">
+                    ` : nothing}
+
                     ${isLarge ? html`
                         <button
                             class="${callBtnClass} pill"
@@ -622,7 +747,13 @@ export class AsteriskDoorbellCard extends LitElement {
         `;
     }
 
-    static getConfigElement() {
+    static async getConfigElement() {
+        // The editor is only needed while editing a dashboard, so it is
+        // fetched and registered the first time one is opened
+        const { AsteriskDoorbellEditor } = await import('./asterisk-doorbell-editor');
+        if (!customElements.get('asterisk-doorbell-editor')) {
+            customElements.define('asterisk-doorbell-editor', AsteriskDoorbellEditor);
+        }
         return document.createElement('asterisk-doorbell-editor');
     }
 
@@ -763,6 +894,13 @@ export class AsteriskDoorbellCard extends LitElement {
                     }
                 }
 
+                .snapshot {
+                    width: 100%;
+                    max-height: 300px;
+                    object-fit: contain;
+                    border-radius: 0.5rem;
+                }
+
                 .debug-panel {
                     margin-top: 0.5rem;
                     padding: 0.5rem;
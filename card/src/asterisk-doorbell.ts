@@ -1,7 +1,6 @@
 // @ts-ignore
 import { version } from '../package.json';
 import { AsteriskDoorbellCard } from './asterisk-doorbell-card';
-import { AsteriskDoorbellEditor } from './asterisk-doorbell-editor';
 import { SIPManager } from './sip-manager';
 
 declare global {
@@ -165,11 +164,6 @@ function registerElements() {
             customElements.define('asterisk-doorbell-card', AsteriskDoorbellCard);
         }
     } catch (e) {}
-    try {
-        if (!customElements.get('asterisk-doorbell-editor')) {
-            customElements.define('asterisk-doorbell-editor', AsteriskDoorbellEditor);
-        }
-    } catch (e) {}
 }
 
 registerElements();
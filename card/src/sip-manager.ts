@@ -1,6 +1,6 @@
-import { UA, WebSocketInterface } from 'jssip';
-import { RTCSessionEvent } from 'jssip/lib/UA';
-import { RTCSession } from 'jssip/lib/RTCSession';
+import type { UA } from 'jssip';
+import type { RTCSessionEvent } from 'jssip/lib/UA';
+import type { RTCSession } from 'jssip/lib/RTCSession';
 
 // ─── Types ────────────────────────────────────────────────────────────────────
 
@@ -20,6 +20,37 @@ export interface SIPManagerSettings {
     websocket_port: number;
 }
 
+/** Response of asterisk_doorbell/bootstrap. */
+export interface SIPManagerBootstrap {
+    entry_id: string;
+    settings: SIPManagerSettings;
+    entities: {
+        call_status_entity: string | null;
+        confbridge_id_entity: string | null;
+        extension_entity: string | null;
+        snapshot_entity: string | null;
+    };
+    proxy_path: string;
+    state: { call_status: string; confbridge_id: string; extension: string };
+}
+
+// ─── Lazy JsSIP ───────────────────────────────────────────────────────────────
+
+// JsSIP is most of the bundle. It is split into its own chunk and fetched
+// the first time a UA is created, so loading the card script on every
+// Home Assistant page stays cheap.
+let jssipModule: Promise<typeof import('jssip')> | null = null;
+
+function loadJsSIP(): Promise<typeof import('jssip')> {
+    if (!jssipModule) {
+        jssipModule = import('jssip').catch((error) => {
+            jssipModule = null;
+            throw error;
+        });
+    }
+    return jssipModule;
+}
+
 // ─── Singleton SIP Manager ────────────────────────────────────────────────────
 
 const MANAGER_KEY = '__asterisk_doorbell_sip_manager__';
@@ -30,6 +61,9 @@ export class SIPManager {
     private _status: SIPStatus = 'not_initialized';
     private _listeners: Set<SIPManagerListener> = new Set();
     private _settings: SIPManagerSettings | null = null;
+    private _bootstrap: Promise<SIPManagerBootstrap | null> | null = null;
+    private _proxyPath: string = '/api/asterisk_doorbell/ws';
+    private _entryId: string | null = null;
     private _retryTimeout: ReturnType<typeof setTimeout> | null = null;
     private _initPromise: Promise<void> | null = null;
     private _destroyed: boolean = false;
@@ -66,6 +100,35 @@ export class SIPManager {
         this._hass = hass;
     }
 
+    /**
+     * Choose the config entry the manager talks to. Only needed when
+     * several entries are set up; the integration refuses to guess then.
+     */
+    setEntryId(entryId?: string) {
+        const next = entryId || null;
+        if (next === this._entryId) return;
+        this._entryId = next;
+        this._bootstrap = null;
+    }
+
+    /**
+     * Fetch asterisk_doorbell/bootstrap once and share the response
+     * between the manager and every card on the page. Resolves to null
+     * if the integration doesn't have the command, so callers can fall
+     * back to the separate commands and hass.states.
+     */
+    fetchBootstrap(): Promise<SIPManagerBootstrap | null> {
+        if (!this._bootstrap) {
+            this._bootstrap = this._hass.callWS(this._forEntry({ type: 'asterisk_doorbell/bootstrap' })).catch((e: any) => {
+                this._log('Bootstrap unavailable: ' + (e?.message || e), 'warning');
+                // Ask again next time; the integration may still be starting
+                this._bootstrap = null;
+                return null;
+            });
+        }
+        return this._bootstrap!;
+    }
+
     /**
      * Subscribe to manager events. Returns an unsubscribe function.
      */
@@ -225,14 +288,29 @@ export class SIPManager {
         const haHost = window.location.hostname;
         const haPort = window.location.port || (window.location.protocol === 'https:' ? 443 : 80);
         const haProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const proxyUrl = `${haProtocol}//${haHost}:${haPort}/api/asterisk_doorbell/ws`;
+        const proxyBase = `${haProtocol}//${haHost}:${haPort}${this._proxyPath}`;
+
+        // The proxy only accepts sockets carrying a short-lived ticket;
+        // fetch a fresh one for every UA so retries never reuse an expired one
+        let ticket: string;
+        try {
+            ticket = await this._fetchProxyTicket();
+        } catch (error) {
+            this._log('Failed to get a proxy ticket: ' + error, 'error');
+            this._setStatus('not_initialized');
+            this._scheduleRetry();
+            throw error;
+        }
+        let proxyUrl = `${proxyBase}?ticket=${encodeURIComponent(ticket)}`;
+        if (this._entryId) proxyUrl += `&entry_id=${encodeURIComponent(this._entryId)}`;
 
-        this._log(`Connecting via HA WebSocket proxy: ${proxyUrl}`);
+        this._log(`Connecting via HA WebSocket proxy: ${proxyBase}`);
 
         try {
+            const { UA, WebSocketInterface } = await loadJsSIP();
             const socket = new WebSocketInterface(proxyUrl);
 
-            this._ua = new UA({
+            const ua = new UA({
                 sockets: [socket],
                 uri: `sip:homeassistant@${this._settings.asterisk_host}`,
                 authorization_user: 'homeassistant',
@@ -242,6 +320,7 @@ export class SIPManager {
                 session_timers: false,
                 user_agent: 'Asterisk Doorbell HA (SIPManager)',
             });
+            this._ua = ua;
 
             this._ua
                 .on('registered', () => {
@@ -257,8 +336,14 @@ export class SIPManager {
                     this._log('WebSocket connected');
                 })
                 .on('disconnected', () => {
+                    if (this._ua !== ua) return;
                     this._log('WebSocket disconnected', 'warning');
                     this._setStatus('disconnected');
+                    // JsSIP would reconnect with the same URL, whose ticket
+                    // expires; stop it and let the retry build a new UA
+                    // with a fresh ticket
+                    this._ua = null;
+                    try { ua.stop(); } catch (_) {}
                     this._scheduleRetry();
                 })
                 .on('newRTCSession', (event: RTCSessionEvent) => {
@@ -279,8 +364,14 @@ export class SIPManager {
     }
 
     private async _fetchSettings(): Promise<SIPManagerSettings> {
+        const bootstrap = await this.fetchBootstrap();
+        if (bootstrap?.settings?.asterisk_host && bootstrap.settings.websocket_port) {
+            if (bootstrap.proxy_path) this._proxyPath = bootstrap.proxy_path;
+            return bootstrap.settings;
+        }
+
         try {
-            const settings = await this._hass.callWS({ type: 'asterisk_doorbell/get_settings' });
+            const settings = await this._hass.callWS(this._forEntry({ type: 'asterisk_doorbell/get_settings' }));
             if (settings?.asterisk_host && settings?.websocket_port) {
                 return settings;
             }
@@ -294,6 +385,18 @@ export class SIPManager {
         }
     }
 
+    private _forEntry(message: Record<string, any>): Record<string, any> {
+        return this._entryId ? { ...message, entry_id: this._entryId } : message;
+    }
+
+    private async _fetchProxyTicket(): Promise<string> {
+        const result = await this._hass.callWS({ type: 'asterisk_doorbell/get_proxy_ticket' });
+        if (!result?.ticket) {
+            throw new Error('No ticket in response');
+        }
+        return result.ticket;
+    }
+
     private _handleNewRTCSession(event: RTCSessionEvent) {
         const session = event.session;
 
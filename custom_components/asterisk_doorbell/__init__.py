@@ -1,29 +1,69 @@
 """The Asterisk Doorbell integration."""
 import logging
-from typing import Dict
+from typing import Dict, List
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 import homeassistant.helpers.device_registry as dr
 import homeassistant.helpers.entity_registry as er
 
-from .const import DOMAIN, STATE_INACTIVE
-from .services import async_setup_services, async_unload_services
-from .view import async_setup_view
-from .websocket_api import async_register_websocket_commands
-from .websocket_proxy import setup_websocket_proxy
+from .const import (
+    DATA_DOOR_STATIONS,
+    DATA_NOTIFIERS,
+    DATA_SNAPSHOTS,
+    DOMAIN,
+    SIGNAL_COORDINATOR,
+    STATE_INACTIVE,
+)
+from .settings import AsteriskSettings, async_cache_settings, async_drop_settings, async_get_settings
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor"]
 
+# Task registering the views, commands and proxy shared by all entries
+DATA_SETUP = f"{DOMAIN}_setup"
+
 
 async def async_setup(hass: HomeAssistant, config: Dict) -> bool:
-    """Set up the Asterisk Doorbell integration."""
-    # Set up services (only once for all entries)
+    """Set up the Asterisk Doorbell integration.
+
+    Nothing is registered until the first config entry is set up, so an
+    installed but unconfigured integration costs Home Assistant's startup
+    next to nothing.
+    """
+    return True
+
+
+async def _async_setup_integration(hass: HomeAssistant) -> None:
+    """Register what all entries share, importing it only now it is needed."""
+    from .services import async_setup_services
+
+    # Services are removed with the last entry, so an entry added after
+    # that has to register them again
     await async_setup_services(hass)
 
+    # Entries are set up concurrently; the others wait for the first one's
+    # registration instead of racing it
+    setup = hass.data.get(DATA_SETUP)
+    if setup is None:
+        setup = hass.data[DATA_SETUP] = hass.async_create_task(_async_register_shared(hass))
+    await setup
+
+
+async def _async_register_shared(hass: HomeAssistant) -> None:
+    """Register the views, commands and proxy once for all entries."""
+    from .event_view import setup_event_view
+    from .history import async_setup_history
+    from .view import async_setup_view
+    from .websocket_api import async_register_websocket_commands
+    from .websocket_proxy import setup_websocket_proxy
+
+    # Load the call history before any event can arrive
+    await async_setup_history(hass)
+
     # Register websocket commands (only once for all entries)
     async_register_websocket_commands(hass)
 
@@ -33,36 +73,115 @@ async def async_setup(hass: HomeAssistant, config: Dict) -> bool:
     # Set up WebSocket proxy (only once for all entries)
     setup_websocket_proxy(hass)
 
-    return True
+    # Set up the direct event endpoint for Asterisk (only once for all entries)
+    setup_event_view(hass)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Asterisk Doorbell from a config entry."""
+    from .services import async_update_routes
+
     # Store an instance of the "module" that will be available to platforms
     hass.data.setdefault(DOMAIN, {})
 
+    # Resolve the entry's settings once; request handlers read this cache
+    settings = async_cache_settings(hass, entry)
+
+    await _async_setup_integration(hass)
+
     # Create simple coordinator (no confbridge configuration needed)
     coordinator = GlobalAsteriskCoordinator(hass)
 
-    # Store the coordinator
+    # Store the coordinator and route the entry's confbridges to it
     hass.data[DOMAIN][entry.entry_id] = coordinator
+    async_update_routes(hass)
+
+    # Subscriptions made before a reload follow the entry to its new coordinator
+    async_dispatcher_send(hass, SIGNAL_COORDINATOR.format(entry.entry_id), coordinator)
+
+    # Optionally take a snapshot from the door station whenever a call rings
+    if settings.snapshot_url:
+        from .snapshot import DoorCamera
+
+        camera = DoorCamera(hass, settings)
+        hass.data.setdefault(DATA_SNAPSHOTS, {})[entry.entry_id] = camera
+        entry.async_on_unload(camera.async_cancel)
+        entry.async_on_unload(lambda: hass.data[DATA_SNAPSHOTS].pop(entry.entry_id, None))
+
+    # Optionally hang up the door stations whenever a call ends
+    if settings.door_stations:
+        from .door_station import DoorStations
+
+        stations = DoorStations(hass, settings)
+        hass.data.setdefault(DATA_DOOR_STATIONS, {})[entry.entry_id] = stations
+        entry.async_on_unload(stations.async_stop)
+        entry.async_on_unload(lambda: hass.data[DATA_DOOR_STATIONS].pop(entry.entry_id, None))
 
-    # Set up all platforms
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # Optionally notify phones directly whenever a call rings
+    if settings.notify_targets:
+        from .notifier import RingNotifier
+
+        notifier = RingNotifier(hass, settings)
+        hass.data.setdefault(DATA_NOTIFIERS, {})[entry.entry_id] = notifier
+        entry.async_on_unload(notifier.async_stop)
+        entry.async_on_unload(lambda: hass.data[DATA_NOTIFIERS].pop(entry.entry_id, None))
+
+    # Set up the entry's platforms
+    await hass.config_entries.async_forward_entry_setups(entry, _platforms(settings))
 
     # Create a single device for the integration
     await _create_integration_device(hass, entry)
 
+    # Optionally listen for ConfBridge events over AMI instead of webhooks
+    if settings.ami_username:
+        from .ami import AsteriskAmiListener
+
+        listener = AsteriskAmiListener(
+            hass,
+            settings.asterisk_host,
+            settings.ami_port,
+            settings.ami_username,
+            settings.ami_secret,
+        )
+        listener.async_start()
+        entry.async_on_unload(listener.async_stop)
+
+    # Apply option changes without a restart
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     return True
 
 
+def _platforms(settings: AsteriskSettings) -> List[str]:
+    """Return the platforms an entry sets up; the image only with a snapshot URL."""
+    if settings.snapshot_url:
+        return [*PLATFORMS, "image"]
+    return PLATFORMS
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry so changed options are picked up."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    from .services import async_unload_services, async_update_routes
+    from .websocket_proxy import async_drain_proxy_sessions
+
+    # The settings the entry was set up with, so the same platforms unload
+    settings = async_get_settings(hass, entry.entry_id)
+    platforms = _platforms(settings) if settings is not None else PLATFORMS
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, platforms)
 
     # Clean up
     if unload_ok and entry.entry_id in hass.data[DOMAIN]:
         hass.data[DOMAIN].pop(entry.entry_id)
+        async_drop_settings(hass, entry.entry_id)
+        async_update_routes(hass)
+        async_dispatcher_send(hass, SIGNAL_COORDINATOR.format(entry.entry_id), None)
+        # Close the entry's proxied sockets instead of leaving them running
+        await async_drain_proxy_sessions(hass, entry.entry_id)
 
     # If this is the last config entry being removed, unload services
     if not hass.data[DOMAIN]:
@@ -119,27 +238,135 @@ async def _create_integration_device(hass, entry):
 
 
 class GlobalAsteriskCoordinator:
-    """Global coordinator for Asterisk doorbell that manages the three sensor states."""
+    """Global coordinator for Asterisk doorbell that manages the three sensor states.
+
+    Each confbridge has its own entry in ``bridges``; the three global values
+    are an aggregate view showing the most recently changed confbridge that
+    still has a call in progress.
+    """
+
+    # Order in which sensors are written during a transition. call_status is
+    # always written last because automations trigger on it.
+    FIELDS = ("confbridge_id", "extension", "call_status")
 
     def __init__(self, hass):
         """Initialize the coordinator."""
         self.hass = hass
         self._listeners = set()
+        self._field_listeners = {field: set() for field in self.FIELDS}
 
         # Initialize the three global state values
         self.call_status = STATE_INACTIVE
         self.confbridge_id = ""
         self.extension = ""
 
-    def async_add_listener(self, update_callback):
-        """Add a listener for state updates."""
-        self._listeners.add(update_callback)
+        # Per-confbridge state, ordered from least to most recently changed
+        self.bridges = {}
+        self._bridge_listeners = {}
+        self._new_bridge_callbacks = set()
 
-    def async_remove_listener(self, update_callback):
-        """Remove a listener."""
-        self._listeners.discard(update_callback)
+    def async_add_listener(self, update_callback, field=None):
+        """Add a listener for state updates.
+
+        A listener registered for a field is only called when that field
+        changes; a listener without a field is called once per transition.
+        """
+        if field is None:
+            self._listeners.add(update_callback)
+        else:
+            self._field_listeners[field].add(update_callback)
 
-    def async_update_listeners(self):
-        """Update all listeners."""
+    def async_remove_listener(self, update_callback, field=None):
+        """Remove a listener."""
+        if field is None:
+            self._listeners.discard(update_callback)
+        else:
+            self._field_listeners[field].discard(update_callback)
+
+    def async_add_bridge_listener(self, confbridge_id, update_callback):
+        """Add a listener for state updates of one confbridge."""
+        self._bridge_listeners.setdefault(confbridge_id, set()).add(update_callback)
+
+    def async_remove_bridge_listener(self, confbridge_id, update_callback):
+        """Remove a confbridge listener."""
+        self._bridge_listeners.get(confbridge_id, set()).discard(update_callback)
+
+    def async_add_new_bridge_callback(self, new_bridge_callback):
+        """Call new_bridge_callback(confbridge_id) the first time a confbridge is seen."""
+        self._new_bridge_callbacks.add(new_bridge_callback)
+
+    def async_remove_new_bridge_callback(self, new_bridge_callback):
+        """Remove a new confbridge callback."""
+        self._new_bridge_callbacks.discard(new_bridge_callback)
+
+    def async_apply_transition(self, call_status, confbridge_id, extension):
+        """Record the state of one confbridge and refresh the aggregate view.
+
+        Listeners of the confbridge and of each changed global value are
+        notified at most once. Returns True if anything changed.
+        """
+        if call_status == STATE_INACTIVE:
+            extension = ""
+
+        state = {"call_status": call_status, "extension": extension}
+        previous = self.bridges.get(confbridge_id)
+        if previous == state:
+            return False
+
+        # Re-insert so the most recently changed confbridge is last
+        self.bridges.pop(confbridge_id, None)
+        self.bridges[confbridge_id] = state
+
+        # A sensor restored from the entity registry already listens for a
+        # confbridge the coordinator hasn't seen yet, so listeners are always
+        # called; the new confbridge callbacks only create missing sensors
+        for update_callback in self._bridge_listeners.get(confbridge_id, ()):
+            update_callback()
+        if previous is None:
+            for new_bridge_callback in self._new_bridge_callbacks:
+                new_bridge_callback(confbridge_id)
+
+        self._async_update_aggregate()
+        return True
+
+    def _async_update_aggregate(self):
+        """Point the global values at the most recent confbridge with a call."""
+        for confbridge_id in reversed(self.bridges):
+            state = self.bridges[confbridge_id]
+            if state["call_status"] != STATE_INACTIVE:
+                return self._async_set_global(state["call_status"], confbridge_id, state["extension"])
+        return self._async_set_global(STATE_INACTIVE, "", "")
+
+    def _async_set_global(self, call_status, confbridge_id, extension):
+        """Set all three global values at once and notify each listener at most once."""
+        values = {
+            "confbridge_id": confbridge_id,
+            "extension": extension,
+            "call_status": call_status,
+        }
+        changed = [field for field in self.FIELDS if getattr(self, field) != values[field]]
+        if not changed:
+            return False
+
+        for field, value in values.items():
+            setattr(self, field, value)
+
+        for field in changed:
+            for update_callback in self._field_listeners[field]:
+                update_callback()
         for update_callback in self._listeners:
-            update_callback()
\ No newline at end of file
+            update_callback()
+
+        return True
+
+    def as_dict(self):
+        """Return the current state as a plain dict."""
+        return {
+            "call_status": self.call_status,
+            "confbridge_id": self.confbridge_id,
+            "extension": self.extension,
+        }
+
+    def bridge_state(self, confbridge_id):
+        """Return the state of one confbridge."""
+        return self.bridges.get(confbridge_id, {"call_status": STATE_INACTIVE, "extension": ""})
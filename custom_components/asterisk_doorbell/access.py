@@ -0,0 +1,118 @@
+"""Access control for the SIP WebSocket proxy."""
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+DATA_TICKET_SIGNER = f"{DOMAIN}_ticket_signer"
+
+# How long a ticket can be used to open proxy sockets. JsSIP's own reconnect
+# would reuse the URL after this, so the card drops a user agent whose socket
+# disconnects and creates a new one with a fresh ticket instead.
+TICKET_LIFETIME = 60
+
+# Per client IP: open proxied sockets, and a token bucket for new ones
+MAX_CONNECTIONS_PER_IP = 8
+CONNECT_RATE = 1.0
+CONNECT_BURST = 10
+
+# Client IPs tracked before idle ones are forgotten
+MAX_TRACKED_CLIENTS = 1024
+
+
+class ProxyTicketSigner:
+    """Issue and verify signed, short-lived proxy tickets.
+
+    A ticket is ``<expiry>.<user id>.<signature>``, signed with HMAC-SHA256
+    under a key that only lives in memory. Verifying one is a split, one
+    HMAC and a comparison: no user, token or config entry lookups, so a
+    reconnect storm costs next to nothing. Restarting Home Assistant
+    invalidates every ticket.
+    """
+
+    def __init__(self, key: bytes = None):
+        """Initialize the signer with a random key unless one is given."""
+        self._key = key or secrets.token_bytes(32)
+
+    def _sign(self, payload: str) -> str:
+        digest = hmac.new(self._key, payload.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def issue(self, user_id: str, now: float = None) -> str:
+        """Return a new ticket for a user."""
+        expires = int((now or time.time()) + TICKET_LIFETIME)
+        payload = f"{expires}.{user_id}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, ticket: str, now: float = None):
+        """Return the user id of a valid ticket, or None."""
+        payload, sep, signature = ticket.rpartition(".")
+        if not sep or not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+
+        expires, _, user_id = payload.partition(".")
+        if not expires.isdigit() or int(expires) < (now or time.time()):
+            return None
+        return user_id
+
+
+class ClientLimiter:
+    """Cap concurrent proxy sockets and the rate of new ones per client IP."""
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS_PER_IP,
+        rate: float = CONNECT_RATE,
+        burst: int = CONNECT_BURST,
+    ):
+        """Initialize the limiter."""
+        self._max_connections = max_connections
+        self._rate = rate
+        self._burst = burst
+        # ip -> [tokens, last refill (monotonic), open connections]
+        self._clients = {}
+
+    def try_acquire(self, ip: str, now: float = None) -> bool:
+        """Take a token and a connection slot for an IP; call release() later."""
+        now = now or time.monotonic()
+        client = self._clients.get(ip)
+        if client is None:
+            if len(self._clients) >= MAX_TRACKED_CLIENTS:
+                self._forget_idle(now)
+            client = self._clients[ip] = [float(self._burst), now, 0]
+        else:
+            client[0] = min(self._burst, client[0] + (now - client[1]) * self._rate)
+            client[1] = now
+
+        if client[0] < 1 or client[2] >= self._max_connections:
+            return False
+
+        client[0] -= 1
+        client[2] += 1
+        return True
+
+    def release(self, ip: str):
+        """Give back the connection slot of a closed socket."""
+        client = self._clients.get(ip)
+        if client is not None:
+            client[2] -= 1
+
+    def _forget_idle(self, now: float):
+        """Drop clients with no open sockets whose bucket has refilled."""
+        for ip, (tokens, last, connections) in list(self._clients.items()):
+            if not connections and tokens + (now - last) * self._rate >= self._burst:
+                del self._clients[ip]
+
+
+@callback
+def async_get_ticket_signer(hass: HomeAssistant) -> ProxyTicketSigner:
+    """Return the proxy ticket signer, creating it on first use."""
+    signer = hass.data.get(DATA_TICKET_SIGNER)
+    if signer is None:
+        signer = hass.data[DATA_TICKET_SIGNER] = ProxyTicketSigner()
+    return signer
@@ -0,0 +1,179 @@
+"""Asterisk Manager Interface listener for the Asterisk Doorbell integration.
+
+An alternative to the dialplan webhooks: one persistent AMI connection
+receives the ConfBridge events Asterisk already emits (the bridges in
+confbridge.conf set ``enable_events=yes``) and turns them into call,
+answered and terminate events.
+"""
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant
+
+from .services import SERVICE_ANSWERED, SERVICE_CALL, SERVICE_TERMINATE, async_dispatch_event
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_AMI_PORT = 5038
+CONNECT_TIMEOUT = 10
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+
+# Channel variable the sample dialplan sets to the answering extension on
+# both the visitor and the admin channel; exported via manager.conf channelvars.
+EXTENSION_VARIABLE = "ADMIN"
+
+
+class AmiError(Exception):
+    """Error to indicate the AMI server rejected us or spoke nonsense."""
+
+
+class AsteriskAmiListener:
+    """Hold one AMI connection open and feed ConfBridge events to the coordinators."""
+
+    def __init__(self, hass: HomeAssistant, host: str, port: int, username: str, secret: str):
+        """Initialize the listener."""
+        self.hass = hass
+        self._host = host
+        self._port = port
+        self._username = username
+        self._secret = secret
+        self._task = None
+        self.connected = False
+
+    def async_start(self):
+        """Start the connection loop in the background."""
+        self._task = self.hass.async_create_background_task(
+            self._async_run(), f"asterisk_doorbell AMI {self._host}:{self._port}"
+        )
+
+    async def async_stop(self):
+        """Stop the connection loop and close the connection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _async_run(self):
+        """Connect, listen, and reconnect with exponential back-off."""
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                await self._async_listen()
+            except (OSError, asyncio.TimeoutError, AmiError) as err:
+                _LOGGER.warning("AMI connection to %s:%s failed: %s", self._host, self._port, err)
+            except Exception:  # A bug handling one frame must not end the listener
+                _LOGGER.exception("Unexpected error on AMI connection to %s:%s", self._host, self._port)
+
+            if self.connected:
+                # We had a working session; start the back-off from scratch
+                delay = RECONNECT_MIN_DELAY
+            self.connected = False
+
+            _LOGGER.debug("Reconnecting to AMI in %s seconds", delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _async_listen(self):
+        """Run one AMI session until the connection drops."""
+        # asyncio.timeout rather than wait_for: on Python 3.11 wait_for drops
+        # a cancellation that arrives as the login reply does, and
+        # async_stop would then wait forever
+        async with asyncio.timeout(CONNECT_TIMEOUT):
+            reader, writer = await asyncio.open_connection(self._host, self._port)
+        try:
+            async with asyncio.timeout(CONNECT_TIMEOUT):
+                banner = await reader.readline()
+            if not banner.startswith(b"Asterisk Call Manager"):
+                raise AmiError(f"Unexpected banner {banner!r}")
+
+            writer.write(_format_action({
+                "Action": "Login",
+                "Username": self._username,
+                "Secret": self._secret,
+                "Events": "call",
+            }))
+            await writer.drain()
+
+            async with asyncio.timeout(CONNECT_TIMEOUT):
+                response = await _async_read_message(reader)
+            if response.get("Response") != "Success":
+                raise AmiError(f"Login failed: {response.get('Message', 'no reason given')}")
+
+            self.connected = True
+            _LOGGER.info("Listening for ConfBridge events on AMI %s:%s", self._host, self._port)
+
+            while True:
+                message = await _async_read_message(reader)
+                if "Event" in message:
+                    self._handle_event(message, time.monotonic())
+        finally:
+            writer.close()
+
+    def _handle_event(self, message, received):
+        """Translate a ConfBridge event into a doorbell event."""
+        event = message["Event"]
+        if event not in ("ConfbridgeJoin", "ConfbridgeLeave", "ConfbridgeEnd"):
+            return
+
+        confbridge = message.get("Conference", "")
+        if not confbridge:
+            return
+
+        # Present when manager.conf sets timestampevents=yes
+        try:
+            sent_at = float(message["Timestamp"])
+        except (KeyError, ValueError):
+            sent_at = None
+
+        if event == "ConfbridgeEnd":
+            async_dispatch_event(self.hass, SERVICE_TERMINATE, confbridge, received=received, sent_at=sent_at)
+            return
+
+        is_admin = message.get("Admin", "No") == "Yes"
+        extension = message.get("chanvars", {}).get(EXTENSION_VARIABLE) or message.get("CallerIDNum", "")
+
+        if event == "ConfbridgeJoin":
+            async_dispatch_event(
+                self.hass, SERVICE_ANSWERED if is_admin else SERVICE_CALL, confbridge, extension, received, sent_at
+            )
+        elif not is_admin:
+            # The visitor left, either unanswered or at the end of the call
+            async_dispatch_event(self.hass, SERVICE_TERMINATE, confbridge, received=received, sent_at=sent_at)
+
+
+def _format_action(fields) -> bytes:
+    """Encode an AMI action."""
+    return "".join(f"{key}: {value}\r\n" for key, value in fields.items()).encode() + b"\r\n"
+
+
+async def _async_read_message(reader: asyncio.StreamReader) -> dict:
+    """Read one blank-line terminated AMI message.
+
+    ``ChanVariable: NAME=value`` lines are collected into a ``chanvars`` dict.
+    """
+    message = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError("Connection closed by Asterisk")
+        line = line.rstrip(b"\r\n")
+        if not line:
+            if message:
+                return message
+            continue
+
+        key, sep, value = line.decode(errors="replace").partition(":")
+        if not sep:
+            continue
+        key = key.strip()
+        value = value.strip()
+        if key == "ChanVariable":
+            name, _, var_value = value.partition("=")
+            message.setdefault("chanvars", {})[name] = var_value
+        else:
+            message[key] = value
@@ -16,6 +16,21 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     {
         vol.Required("asterisk_host"): str,
         vol.Required("asterisk_websocket_port", default=8089): int,
+        vol.Optional("additional_upstreams", default=""): str,
+        vol.Optional("confbridges", default=""): str,
+        vol.Optional("event_secret", default=""): str,
+        vol.Optional("ami_port", default=5038): int,
+        vol.Optional("ami_username", default=""): str,
+        vol.Optional("ami_secret", default=""): str,
+        vol.Optional("keepalive_offload", default=False): bool,
+        vol.Optional("max_proxy_sessions", default=64): vol.All(int, vol.Range(min=1)),
+        vol.Optional("allow_ticketless_proxy", default=False): bool,
+        vol.Optional("dialog_tracking", default=False): bool,
+        vol.Optional("snapshot_url", default=""): str,
+        vol.Optional("door_stations", default=""): str,
+        vol.Optional("door_station_username", default=""): str,
+        vol.Optional("door_station_password", default=""): str,
+        vol.Optional("notify_targets", default=""): str,
     }
 )
 
@@ -64,10 +79,26 @@ class AsteriskDoorbellOptionsFlow(config_entries.OptionsFlow):
         """Manage the options."""
         errors = {}
 
-        # Set default values from current config
+        # Set default values from current config (options override data)
+        current = {**self.config_entry.data, **self.config_entry.options}
         default_values = {
-            "asterisk_host": self.config_entry.data.get("asterisk_host", ""),
-            "asterisk_websocket_port": self.config_entry.data.get("asterisk_websocket_port", 8089),
+            "asterisk_host": current.get("asterisk_host", ""),
+            "asterisk_websocket_port": current.get("asterisk_websocket_port", 8089),
+            "additional_upstreams": current.get("additional_upstreams", ""),
+            "confbridges": current.get("confbridges", ""),
+            "event_secret": current.get("event_secret", ""),
+            "ami_port": current.get("ami_port", 5038),
+            "ami_username": current.get("ami_username", ""),
+            "ami_secret": current.get("ami_secret", ""),
+            "keepalive_offload": current.get("keepalive_offload", False),
+            "max_proxy_sessions": current.get("max_proxy_sessions", 64),
+            "allow_ticketless_proxy": current.get("allow_ticketless_proxy", False),
+            "dialog_tracking": current.get("dialog_tracking", False),
+            "snapshot_url": current.get("snapshot_url", ""),
+            "door_stations": current.get("door_stations", ""),
+            "door_station_username": current.get("door_station_username", ""),
+            "door_station_password": current.get("door_station_password", ""),
+            "notify_targets": current.get("notify_targets", ""),
         }
 
         if user_input is not None:
@@ -82,6 +113,25 @@ class AsteriskDoorbellOptionsFlow(config_entries.OptionsFlow):
             {
                 vol.Required("asterisk_host", default=default_values["asterisk_host"]): str,
                 vol.Required("asterisk_websocket_port", default=default_values["asterisk_websocket_port"]): int,
+                vol.Optional("additional_upstreams", default=default_values["additional_upstreams"]): str,
+                vol.Optional("confbridges", default=default_values["confbridges"]): str,
+                vol.Optional("event_secret", default=default_values["event_secret"]): str,
+                vol.Optional("ami_port", default=default_values["ami_port"]): int,
+                vol.Optional("ami_username", default=default_values["ami_username"]): str,
+                vol.Optional("ami_secret", default=default_values["ami_secret"]): str,
+                vol.Optional("keepalive_offload", default=default_values["keepalive_offload"]): bool,
+                vol.Optional(
+                    "max_proxy_sessions", default=default_values["max_proxy_sessions"]
+                ): vol.All(int, vol.Range(min=1)),
+                vol.Optional(
+                    "allow_ticketless_proxy", default=default_values["allow_ticketless_proxy"]
+                ): bool,
+                vol.Optional("dialog_tracking", default=default_values["dialog_tracking"]): bool,
+                vol.Optional("snapshot_url", default=default_values["snapshot_url"]): str,
+                vol.Optional("door_stations", default=default_values["door_stations"]): str,
+                vol.Optional("door_station_username", default=default_values["door_station_username"]): str,
+                vol.Optional("door_station_password", default=default_values["door_station_password"]): str,
+                vol.Optional("notify_targets", default=default_values["notify_targets"]): str,
             }
         )
 
@@ -15,4 +15,14 @@ SERVICE_TERMINATE = "terminate"
 # State names
 STATE_ACTIVE = "active"
 STATE_INACTIVE = "inactive"
-STATE_RINGING = "ringing"
\ No newline at end of file
+STATE_RINGING = "ringing"
+
+# Dispatched with an entry's coordinator when the entry is set up, and with
+# None when it unloads; format with the entry_id
+SIGNAL_COORDINATOR = f"{DOMAIN}_coordinator_{{}}"
+
+# Per-entry helpers, keyed by entry_id; only present once an entry has
+# configured the matching option, so callers can skip importing the module
+DATA_DOOR_STATIONS = f"{DOMAIN}_door_stations"
+DATA_NOTIFIERS = f"{DOMAIN}_notifiers"
+DATA_SNAPSHOTS = f"{DOMAIN}_snapshots"
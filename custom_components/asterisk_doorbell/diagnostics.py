@@ -0,0 +1,38 @@
+"""Diagnostics support for the Asterisk Doorbell integration."""
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_SNAPSHOTS, DOMAIN
+from .metrics import async_get_metrics
+from .websocket_proxy import DATA_PROXY_SESSIONS
+
+TO_REDACT = {
+    "event_secret",
+    "ami_secret",
+    "door_station_username",
+    "door_station_password",
+    # Camera snapshot URLs often carry credentials or an access token
+    "snapshot_url",
+}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    registry = hass.data.get(DATA_PROXY_SESSIONS)
+    camera = hass.data.get(DATA_SNAPSHOTS, {}).get(entry.entry_id)
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "state": coordinator.as_dict() if coordinator else None,
+        "bridges": dict(coordinator.bridges) if coordinator else None,
+        "metrics": async_get_metrics(hass).as_dict(),
+        "proxy_sessions": registry.count(entry.entry_id) if registry else 0,
+        "snapshots": camera.cache.keys() if camera else None,
+    }
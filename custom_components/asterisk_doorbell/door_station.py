@@ -0,0 +1,113 @@
+"""Hang up door stations when a doorbell call ends."""
+import asyncio
+import logging
+import time
+
+import httpx
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.httpx_client import get_async_client
+
+from .const import DATA_DOOR_STATIONS, DOMAIN
+from .metrics import async_get_metrics
+from .settings import AsteriskSettings
+
+_LOGGER = logging.getLogger(__name__)
+
+# Dahua VTO request that ends the station's side of a call
+DAHUA_CANCEL_PATH = "/cgi-bin/phoneControl.cgi?action=cancel"
+
+# Applied to each station on its own, so one that is offline can't hold
+# up the others
+CANCEL_TIMEOUT = 3
+
+
+def door_station_url(station: str) -> str:
+    """Return the cancel URL of a configured station, given as a host or a full URL."""
+    if "://" in station:
+        return station
+    return f"http://{station}{DAHUA_CANCEL_PATH}"
+
+
+class DoorStation:
+    """One station and the digest credentials used with it."""
+
+    __slots__ = ("url", "auth")
+
+    def __init__(self, url: str, auth):
+        """Initialize the station."""
+        self.url = url
+        self.auth = auth
+
+
+class DoorStations:
+    """Cancel one entry's door stations concurrently when a call ends.
+
+    Every station is asked at once through Home Assistant's shared httpx
+    client, so hanging up takes one round trip to the slowest station
+    rather than the sum of all of them. Each station keeps its own
+    ``httpx.DigestAuth``, which remembers the station's last challenge;
+    after the first call requests are signed up front instead of costing
+    a 401 round trip.
+    """
+
+    def __init__(self, hass: HomeAssistant, settings: AsteriskSettings):
+        """Initialize the door stations of an entry."""
+        self.hass = hass
+        self._stations = [
+            DoorStation(
+                door_station_url(station),
+                httpx.DigestAuth(settings.door_station_username, settings.door_station_password)
+                if settings.door_station_username else None,
+            )
+            for station in settings.door_stations
+        ]
+        self._task = None
+
+    @callback
+    def async_cancel_calls(self):
+        """Start cancelling the call on every station without waiting for it."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = self.hass.async_create_background_task(
+            self._async_cancel_all(), f"{DOMAIN} cancel door stations"
+        )
+
+    async def _async_cancel_all(self):
+        """Cancel the call on every station at once."""
+        metrics = async_get_metrics(self.hass)
+        started = time.monotonic()
+        results = await asyncio.gather(*(self._async_cancel(station) for station in self._stations))
+        metrics.door_station_cancels += results.count(True)
+        metrics.door_station_failures += results.count(False)
+        metrics.door_station_cancel_ms.observe((time.monotonic() - started) * 1000)
+
+    async def _async_cancel(self, station: DoorStation) -> bool:
+        """Cancel the call on one station; return whether it accepted."""
+        try:
+            # Door stations use self-signed certificates
+            response = await get_async_client(self.hass, verify_ssl=False).get(
+                station.url, auth=station.auth, timeout=CANCEL_TIMEOUT
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as err:
+            _LOGGER.warning("Cancelling the call on %s failed: %r", station.url, err)
+            return False
+        return True
+
+    @callback
+    def async_stop(self):
+        """Stop a cancel round that is still running."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+@callback
+def async_cancel_door_stations(hass: HomeAssistant, entry_ids):
+    """Hang up the door stations of the entries owning a confbridge."""
+    door_stations = hass.data.get(DATA_DOOR_STATIONS, {})
+    for entry_id in entry_ids:
+        stations = door_stations.get(entry_id)
+        if stations is not None:
+            stations.async_cancel_calls()
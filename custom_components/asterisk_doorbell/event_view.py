@@ -0,0 +1,107 @@
+"""HTTP endpoint that lets Asterisk report call events directly."""
+import hmac
+import logging
+import time
+from http import HTTPStatus
+
+import voluptuous as vol
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .services import EVENT_SCHEMAS, async_dispatch_event
+from .settings import async_all_settings
+
+_LOGGER = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Asterisk-Doorbell-Secret"
+
+
+class AsteriskEventView(HomeAssistantView):
+    """Accept call/answered/terminate events from Asterisk.
+
+    Requests are authenticated with the shared secret configured on the
+    integration instead of a Home Assistant token, so the dialplan can post
+    with a single CURL() call. The body is either form data for one event
+    (``event=call&confbridge=...&extension=...&secret=...``) or JSON holding
+    one event, a list of events, or ``{"secret": ..., "events": [...]}``.
+    """
+
+    url = "/api/asterisk_doorbell/event"
+    name = "api:asterisk_doorbell:event"
+    requires_auth = False
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the event view."""
+        self.hass = hass
+
+    async def post(self, request):
+        """Validate and apply a single event or a batch of events."""
+        started = time.monotonic()
+
+        secrets = self._configured_secrets()
+        if not secrets:
+            return web.Response(text="Event endpoint is not enabled", status=HTTPStatus.NOT_FOUND)
+
+        if request.content_type == "application/json":
+            try:
+                payload = await request.json()
+            except ValueError:
+                return web.Response(text="Invalid JSON", status=HTTPStatus.BAD_REQUEST)
+        else:
+            payload = dict(await request.post())
+
+        provided = request.headers.get(SECRET_HEADER)
+        if provided is None and isinstance(payload, dict):
+            provided = payload.get("secret")
+        if not isinstance(provided, str) or not _secret_matches(provided, secrets):
+            return web.Response(text="Invalid secret", status=HTTPStatus.UNAUTHORIZED)
+
+        events = payload.get("events", payload) if isinstance(payload, dict) else payload
+        if isinstance(events, dict):
+            events = [events]
+        if not isinstance(events, list):
+            return web.Response(text="Expected an event or a list of events", status=HTTPStatus.BAD_REQUEST)
+
+        # Validate the whole batch before applying any of it
+        validated = []
+        for item in events:
+            try:
+                event = item["event"]
+                data = EVENT_SCHEMAS[event](
+                    {key: item[key] for key in ("confbridge", "extension", "timestamp") if key in item}
+                )
+            except (KeyError, TypeError, vol.Invalid) as err:
+                return web.Response(text=f"Invalid event: {err}", status=HTTPStatus.BAD_REQUEST)
+            validated.append((event, data))
+
+        for event, data in validated:
+            async_dispatch_event(
+                self.hass, event, data["confbridge"], data["extension"], started, data.get("timestamp")
+            )
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Event endpoint applied %d event(s) in %.2f ms",
+                len(validated),
+                (time.monotonic() - started) * 1000,
+            )
+
+        return self.json({"accepted": len(validated)})
+
+    def _configured_secrets(self):
+        """Return the event secrets of all loaded entries, as bytes."""
+        return [settings.event_secret for settings in async_all_settings(self.hass) if settings.event_secret]
+
+
+def _secret_matches(provided: str, secrets) -> bool:
+    """Compare the provided secret against each configured one in constant time."""
+    provided = provided.encode()
+    return any(hmac.compare_digest(provided, secret) for secret in secrets)
+
+
+def setup_event_view(hass: HomeAssistant):
+    """Set up the event endpoint."""
+    hass.http.register_view(AsteriskEventView(hass))
+    _LOGGER.info("Event endpoint registered at %s", AsteriskEventView.url)
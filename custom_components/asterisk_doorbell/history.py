@@ -0,0 +1,156 @@
+"""Call history for the Asterisk Doorbell integration."""
+import logging
+import time
+from bisect import bisect_left, bisect_right
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STATE_ACTIVE, STATE_INACTIVE, STATE_RINGING
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_HISTORY = f"{DOMAIN}_history"
+
+STORAGE_KEY = f"{DOMAIN}.history"
+STORAGE_VERSION = 1
+
+# Writes are coalesced: at most one save per SAVE_DELAY seconds, always
+# scheduled after the transition has been applied to the sensors.
+SAVE_DELAY = 30
+
+MAX_CALLS = 1000
+MAX_AGE = 30 * 24 * 3600
+
+# A call that rang this long ago without being answered lost its terminate
+# (a restart, or Asterisk never sent it). It is left without an end time and
+# the next ring on its confbridge starts a new call. Answered calls can last
+# any length; they end with their terminate or the next ring.
+STALE_CALL = 3600
+
+# Each call is stored as a list to keep the file small:
+# [rang_at, answered_at, ended_at, confbridge, extension]
+RANG_AT, ANSWERED_AT, ENDED_AT, CONFBRIDGE, EXTENSION = range(5)
+
+
+class CallHistory:
+    """Ring, answer and end times of recent calls, oldest first."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the call history."""
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._calls = []
+        self._ring_times = []
+        self._open = {}
+
+    async def async_load(self):
+        """Load the stored calls."""
+        data = await self._store.async_load()
+        if data:
+            self._calls = data.get("calls", [])
+            self._ring_times = [call[RANG_AT] for call in self._calls]
+            now = time.time()
+            self._open = {
+                call[CONFBRIDGE]: call for call in self._calls
+                if call[ENDED_AT] is None and not _is_stale(call, now)
+            }
+        _LOGGER.debug("Loaded %d calls from history", len(self._calls))
+
+    @callback
+    def async_record(self, call_status: str, confbridge_id: str, extension: str, now: float):
+        """Record a transition of one confbridge.
+
+        Only touches memory; the store is written later by a single delayed save.
+        """
+        now = round(now, 3)
+        call = self._open.get(confbridge_id)
+
+        # A ring after an answer is a new call, so the terminate in between
+        # was lost; so was that of a call gone quiet for too long
+        if call is not None and (
+            (call_status == STATE_RINGING and call[ANSWERED_AT] is not None) or _is_stale(call, now)
+        ):
+            del self._open[confbridge_id]
+            call = None
+
+        if call_status == STATE_INACTIVE:
+            if call is None:
+                return
+            call[ENDED_AT] = now
+            del self._open[confbridge_id]
+        elif call is None:
+            # An answer we never saw ring still counts, ringing for zero seconds
+            call = [now, None, None, confbridge_id, extension]
+            self._open[confbridge_id] = call
+            self._append(call, now)
+            if call_status == STATE_ACTIVE:
+                call[ANSWERED_AT] = now
+        elif call_status == STATE_ACTIVE and call[ANSWERED_AT] is None:
+            call[ANSWERED_AT] = now
+            call[EXTENSION] = extension
+        elif call_status == STATE_RINGING and extension and not call[EXTENSION]:
+            call[EXTENSION] = extension
+        else:
+            return
+
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def _append(self, call, now):
+        """Add a new call and drop the ones past the retention limits."""
+        self._calls.append(call)
+        self._ring_times.append(now)
+
+        expired = bisect_left(self._ring_times, now - MAX_AGE)
+        expired = max(expired, len(self._calls) - MAX_CALLS)
+        if expired > 0:
+            del self._calls[:expired]
+            del self._ring_times[:expired]
+
+    @callback
+    def _data_to_save(self):
+        """Return the data to store."""
+        return {"calls": self._calls}
+
+    @callback
+    def async_query(self, start_time=None, end_time=None, confbridge_id=None, limit=None):
+        """Return the calls that rang within the given range, newest first."""
+        first = 0 if start_time is None else bisect_left(self._ring_times, start_time)
+        last = len(self._calls) if end_time is None else bisect_right(self._ring_times, end_time)
+
+        results = []
+        for index in range(last - 1, first - 1, -1):
+            call = self._calls[index]
+            if confbridge_id is not None and call[CONFBRIDGE] != confbridge_id:
+                continue
+            results.append(_call_as_dict(call))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+def _is_stale(call, now):
+    """Return whether an open call rang more than STALE_CALL ago and was never answered."""
+    return call[ANSWERED_AT] is None and now - call[RANG_AT] > STALE_CALL
+
+
+def _call_as_dict(call):
+    """Return a stored call as plain data."""
+    rang_at, answered_at, ended_at, confbridge_id, extension = call
+    return {
+        "confbridge": confbridge_id,
+        "extension": extension,
+        "rang_at": rang_at,
+        "answered_at": answered_at,
+        "ended_at": ended_at,
+        "ring_to_answer": None if answered_at is None else round(answered_at - rang_at, 3),
+        "answered": answered_at is not None,
+    }
+
+
+async def async_setup_history(hass: HomeAssistant) -> CallHistory:
+    """Load the call history and make it available to the event pipeline."""
+    history = CallHistory(hass)
+    await history.async_load()
+    hass.data[DATA_HISTORY] = history
+    return history
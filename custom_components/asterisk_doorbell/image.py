@@ -0,0 +1,75 @@
+"""Image platform for Asterisk Doorbell integration."""
+import logging
+
+from homeassistant.components.image import ImageEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+import homeassistant.util.dt as dt_util
+
+from .const import DATA_SNAPSHOTS, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the snapshot image if the entry has a door camera."""
+    camera = hass.data.get(DATA_SNAPSHOTS, {}).get(config_entry.entry_id)
+    if camera is None:
+        return
+    async_add_entities([AsteriskSnapshotImage(hass, camera, config_entry.entry_id)])
+
+
+class AsteriskSnapshotImage(ImageEntity):
+    """The door camera snapshot taken when the last call started ringing."""
+
+    def __init__(self, hass, camera, entry_id):
+        """Initialize the image."""
+        super().__init__(hass)
+        self.camera = camera
+        self._entry_id = entry_id
+
+        self._attr_name = "Asterisk Doorbell Snapshot"
+        self._attr_unique_id = f"{entry_id}_snapshot"
+        self._attr_icon = "mdi:doorbell-video"
+
+        # Link to the device created in __init__.py
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry_id)},
+        }
+        self._async_update_from_camera()
+
+    async def async_added_to_hass(self):
+        """Register with the camera when added to hass."""
+        await super().async_added_to_hass()
+        self.camera.async_add_listener(self._async_snapshot_taken)
+
+    async def async_will_remove_from_hass(self):
+        """Unregister from the camera when removed from hass."""
+        await super().async_will_remove_from_hass()
+        self.camera.async_remove_listener(self._async_snapshot_taken)
+
+    @callback
+    def _async_update_from_camera(self):
+        """Point the entity at the camera's latest snapshot."""
+        snapshot = self.camera.latest
+        if snapshot is None:
+            return
+        self._attr_content_type = snapshot.content_type
+        self._attr_image_last_updated = dt_util.utc_from_timestamp(snapshot.captured_at)
+        self._attr_extra_state_attributes = {"confbridge_id": snapshot.confbridge_id}
+
+    @callback
+    def _async_snapshot_taken(self):
+        """Write the new snapshot's time; the frontend then fetches the image."""
+        self._async_update_from_camera()
+        self.async_write_ha_state()
+
+    async def async_image(self):
+        """Return the latest snapshot."""
+        snapshot = self.camera.latest
+        return snapshot.content if snapshot else None
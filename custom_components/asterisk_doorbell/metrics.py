@@ -0,0 +1,221 @@
+"""Low-overhead counters and histograms for the Asterisk Doorbell integration."""
+from bisect import bisect_left
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+DATA_METRICS = f"{DOMAIN}_metrics"
+
+# Bucket upper bounds in milliseconds
+CONNECT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+EVENT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)
+# Includes someone walking up to the tablet and pressing answer
+ANSWER_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000)
+
+# Bucket upper bounds in seconds
+DURATION_BUCKETS_S = (10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# SIP clients kept in the metrics; the least recently connected are dropped
+MAX_SIP_CLIENTS = 64
+
+
+class Histogram:
+    """Fixed-bucket histogram; observing a value is one bisect and two adds."""
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds):
+        """Initialize the histogram with sorted bucket upper bounds."""
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        """Record one value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float):
+        """Return the upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def as_dict(self):
+        """Return the histogram as plain data."""
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class DirectionCounters:
+    """Frames and payload size (characters for text frames) forwarded in one proxy direction.
+
+    ``offloaded`` counts frames the proxy answered itself instead of forwarding.
+    """
+
+    __slots__ = ("frames", "bytes", "offloaded")
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.frames = 0
+        self.bytes = 0
+        self.offloaded = 0
+
+
+class SipClientStats:
+    """Calls and registrations of one proxied SIP client, across its sockets."""
+
+    __slots__ = (
+        "connections", "invites", "answered", "active_dialogs", "answer_ms", "bye_ms",
+        "call_s", "registers", "register_interval_s", "failures",
+    )
+
+    def __init__(self):
+        """Initialize the stats."""
+        self.connections = 0
+        self.invites = 0
+        self.answered = 0
+        self.active_dialogs = 0
+        self.answer_ms = Histogram(ANSWER_BUCKETS_MS)
+        self.bye_ms = Histogram(CONNECT_BUCKETS_MS)
+        self.call_s = Histogram(DURATION_BUCKETS_S)
+        self.registers = 0
+        self.register_interval_s = Histogram(DURATION_BUCKETS_S)
+        self.failures = {}
+
+    def as_dict(self):
+        """Return the stats as plain data."""
+        return {
+            "connections": self.connections,
+            "invites": self.invites,
+            "answered": self.answered,
+            "active_dialogs": self.active_dialogs,
+            "answer_ms": self.answer_ms.as_dict(),
+            "bye_ms": self.bye_ms.as_dict(),
+            "call_s": self.call_s.as_dict(),
+            "registers": self.registers,
+            "register_interval_s": self.register_interval_s.as_dict(),
+            "failures": {str(status): count for status, count in sorted(self.failures.items())},
+        }
+
+
+class AsteriskMetrics:
+    """All metrics of the integration, shared by every config entry."""
+
+    def __init__(self):
+        """Initialize the metrics."""
+        self.proxy_connections_total = 0
+        self.proxy_connections_active = 0
+        self.proxy_upstream_failures = 0
+        self.proxy_rejected = 0
+        self.client_to_asterisk = DirectionCounters()
+        self.asterisk_to_client = DirectionCounters()
+        self.upstream_connect_ms = Histogram(CONNECT_BUCKETS_MS)
+
+        self.events_total = 0
+        self.events_dropped = 0
+        self.events_coalesced = 0
+        self.event_to_state_ms = Histogram(EVENT_BUCKETS_MS)
+
+        self.snapshots_total = 0
+        self.snapshots_failed = 0
+        self.snapshot_fetch_ms = Histogram(CONNECT_BUCKETS_MS)
+
+        self.door_station_cancels = 0
+        self.door_station_failures = 0
+        self.door_station_cancel_ms = Histogram(CONNECT_BUCKETS_MS)
+
+        self.notifications_sent = 0
+        self.notifications_failed = 0
+        self.notifications_cleared = 0
+        self.notify_ms = {}
+
+        self.sip_clients = {}
+
+    def notify_target_ms(self, target: str) -> Histogram:
+        """Return the ring delivery time histogram of one notify target."""
+        histogram = self.notify_ms.get(target)
+        if histogram is None:
+            histogram = self.notify_ms[target] = Histogram(CONNECT_BUCKETS_MS)
+        return histogram
+
+    def sip_client(self, client: str) -> SipClientStats:
+        """Return the stats of a SIP client, most recently connected last."""
+        stats = self.sip_clients.pop(client, None)
+        if stats is None:
+            stats = SipClientStats()
+            if len(self.sip_clients) >= MAX_SIP_CLIENTS:
+                del self.sip_clients[next(iter(self.sip_clients))]
+        self.sip_clients[client] = stats
+        return stats
+
+    def as_dict(self):
+        """Return all metrics as plain data."""
+        return {
+            "proxy": {
+                "connections_total": self.proxy_connections_total,
+                "connections_active": self.proxy_connections_active,
+                "upstream_failures": self.proxy_upstream_failures,
+                "rejected": self.proxy_rejected,
+                "client_to_asterisk": {
+                    "frames": self.client_to_asterisk.frames,
+                    "bytes": self.client_to_asterisk.bytes,
+                    "offloaded": self.client_to_asterisk.offloaded,
+                },
+                "asterisk_to_client": {
+                    "frames": self.asterisk_to_client.frames,
+                    "bytes": self.asterisk_to_client.bytes,
+                },
+                "upstream_connect_ms": self.upstream_connect_ms.as_dict(),
+            },
+            "events": {
+                "total": self.events_total,
+                "dropped": self.events_dropped,
+                "coalesced": self.events_coalesced,
+                "event_to_state_ms": self.event_to_state_ms.as_dict(),
+            },
+            "snapshots": {
+                "total": self.snapshots_total,
+                "failed": self.snapshots_failed,
+                "fetch_ms": self.snapshot_fetch_ms.as_dict(),
+            },
+            "door_stations": {
+                "cancels": self.door_station_cancels,
+                "failures": self.door_station_failures,
+                "cancel_ms": self.door_station_cancel_ms.as_dict(),
+            },
+            "notifications": {
+                "sent": self.notifications_sent,
+                "failed": self.notifications_failed,
+                "cleared": self.notifications_cleared,
+                "delivery_ms": {
+                    target: histogram.as_dict() for target, histogram in self.notify_ms.items()
+                },
+            },
+            "sip_clients": {client: stats.as_dict() for client, stats in self.sip_clients.items()},
+        }
+
+
+@callback
+def async_get_metrics(hass: HomeAssistant) -> AsteriskMetrics:
+    """Return the integration's metrics, creating them on first use."""
+    metrics = hass.data.get(DATA_METRICS)
+    if metrics is None:
+        metrics = hass.data[DATA_METRICS] = AsteriskMetrics()
+    return metrics
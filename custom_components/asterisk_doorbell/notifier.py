@@ -0,0 +1,162 @@
+"""Phone notifications sent when a doorbell call rings."""
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_NOTIFIERS, DOMAIN
+from .metrics import async_get_metrics
+from .settings import AsteriskSettings
+
+_LOGGER = logging.getLogger(__name__)
+
+NOTIFY_DOMAIN = "notify"
+
+# Applied to each target on its own, so one slow push service can't hold
+# up the others
+NOTIFY_TIMEOUT = 5
+
+RING_TITLE = "Doorbell"
+RING_MESSAGE = "Someone is at the door"
+
+# Understood by the companion apps: replaces the ring notification with nothing
+CLEAR_MESSAGE = "clear_notification"
+
+
+def notification_tag(confbridge_id: str) -> str:
+    """Return the tag shared by a confbridge's ring notification and its clear."""
+    return f"{DOMAIN}_{confbridge_id}"
+
+
+class _Ring:
+    """A ring notification that may still have to be cleared."""
+
+    __slots__ = ("task", "targets")
+
+    def __init__(self, targets):
+        """Initialize the ring; every target is assumed to get it until a send fails."""
+        self.task = None
+        self.targets = set(targets)
+
+
+class RingNotifier:
+    """Notify one entry's notify targets concurrently when a call rings.
+
+    Every target is called at once, each with its own timeout, in the
+    background once the sensors show the ring, so a phone learns about
+    the call after one round trip to its push service instead of after
+    every automation and target before it. When the call is answered or
+    ends, a ring still being sent is cancelled and the notification is
+    cleared on every phone that may have shown it.
+    """
+
+    def __init__(self, hass: HomeAssistant, settings: AsteriskSettings):
+        """Initialize the notifier of an entry."""
+        self.hass = hass
+        self._targets = settings.notify_targets
+        self._rings = {}
+        self._clears = set()
+
+    @callback
+    def async_notify_ring(self, confbridge_id: str, extension: str):
+        """Start notifying every target of a ring without waiting for it."""
+        # The extension can change while a call rings; that is still one ring
+        if confbridge_id in self._rings:
+            return
+        ring = self._rings[confbridge_id] = _Ring(self._targets)
+        data = {
+            "tag": notification_tag(confbridge_id),
+            # Delivered right away instead of batched by the phone's power saving
+            "ttl": 0,
+            "priority": "high",
+            "push": {"interruption-level": "time-sensitive"},
+            "confbridge_id": confbridge_id,
+            "extension": extension,
+        }
+        ring.task = self.hass.async_create_background_task(
+            self._async_send_all(ring, RING_MESSAGE, data, True),
+            f"{DOMAIN} notify ring {confbridge_id}",
+        )
+
+    @callback
+    def async_clear(self, confbridge_id: str):
+        """Stop notifying a ring and clear it on the phones that may show it."""
+        ring = self._rings.pop(confbridge_id, None)
+        if ring is None:
+            return
+        ring.task.cancel()
+        if not ring.targets:
+            return
+        clear = _Ring(ring.targets)
+        clear.task = self.hass.async_create_background_task(
+            self._async_send_all(clear, CLEAR_MESSAGE, {"tag": notification_tag(confbridge_id)}, False),
+            f"{DOMAIN} clear notifications {confbridge_id}",
+        )
+        self._clears.add(clear.task)
+        clear.task.add_done_callback(self._clears.discard)
+
+    async def _async_send_all(self, ring: _Ring, message: str, data: dict, is_ring: bool):
+        """Send one message to all of a ring's targets at once."""
+        await asyncio.gather(*(
+            self._async_send(ring, target, message, data, is_ring) for target in list(ring.targets)
+        ))
+
+    async def _async_send(self, ring: _Ring, target: str, message: str, data: dict, is_ring: bool):
+        """Send one message to one target and record how long delivery took."""
+        metrics = async_get_metrics(self.hass)
+        started = time.monotonic()
+        service_data = {"message": message, "data": data}
+        if is_ring:
+            service_data["title"] = RING_TITLE
+        try:
+            await asyncio.wait_for(
+                self.hass.services.async_call(NOTIFY_DOMAIN, target, service_data, blocking=True),
+                NOTIFY_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            metrics.notifications_failed += 1
+            ring.targets.discard(target)
+            _LOGGER.warning("Notifying %s timed out after %ss", target, NOTIFY_TIMEOUT)
+            return
+        except Exception as err:  # A broken notify integration must not stop the others
+            metrics.notifications_failed += 1
+            ring.targets.discard(target)
+            _LOGGER.warning("Notifying %s failed: %r", target, err)
+            return
+
+        if is_ring:
+            metrics.notifications_sent += 1
+            metrics.notify_target_ms(target).observe((time.monotonic() - started) * 1000)
+        else:
+            metrics.notifications_cleared += 1
+
+    @callback
+    def async_stop(self):
+        """Cancel notifications that are still being sent."""
+        for ring in self._rings.values():
+            ring.task.cancel()
+        self._rings.clear()
+        for task in self._clears:
+            task.cancel()
+        self._clears.clear()
+
+
+@callback
+def async_notify_ring(hass: HomeAssistant, entry_ids, confbridge_id: str, extension: str):
+    """Notify the targets of the entries owning a confbridge of a ring."""
+    notifiers = hass.data.get(DATA_NOTIFIERS, {})
+    for entry_id in entry_ids:
+        notifier = notifiers.get(entry_id)
+        if notifier is not None:
+            notifier.async_notify_ring(confbridge_id, extension)
+
+
+@callback
+def async_clear_ring_notifications(hass: HomeAssistant, entry_ids, confbridge_id: str):
+    """Clear a confbridge's ring notification on its entries' targets."""
+    notifiers = hass.data.get(DATA_NOTIFIERS, {})
+    for entry_id in entry_ids:
+        notifier = notifiers.get(entry_id)
+        if notifier is not None:
+            notifier.async_clear(confbridge_id)
@@ -1,22 +1,46 @@
 """Sensor platform for Asterisk Doorbell integration."""
 import logging
+from datetime import timedelta
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+import homeassistant.helpers.entity_registry as er
 
 from .const import DOMAIN, STATE_INACTIVE
+from .metrics import async_get_metrics
 
 _LOGGER = logging.getLogger(__name__)
 
+# Only the diagnostic metric sensors poll; the call state sensors are pushed
+SCAN_INTERVAL = timedelta(seconds=30)
+
+# key, name, unit, state class, value function. Counters restart from zero
+# with Home Assistant, which TOTAL_INCREASING treats as a reset.
+METRIC_SENSORS = (
+    ("proxy_connections_active", "Proxied Connections", None, SensorStateClass.MEASUREMENT,
+     lambda metrics: metrics.proxy_connections_active),
+    ("proxy_connections_total", "Proxied Connections Total", None, SensorStateClass.TOTAL_INCREASING,
+     lambda metrics: metrics.proxy_connections_total),
+    ("proxy_frames_to_asterisk", "Proxied Frames To Asterisk", None, SensorStateClass.TOTAL_INCREASING,
+     lambda metrics: metrics.client_to_asterisk.frames),
+    ("proxy_frames_to_client", "Proxied Frames To Clients", None, SensorStateClass.TOTAL_INCREASING,
+     lambda metrics: metrics.asterisk_to_client.frames),
+    ("upstream_connect_p99", "Upstream Connect Time p99", UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT,
+     lambda metrics: metrics.upstream_connect_ms.quantile(0.99)),
+    ("event_to_state_p99", "Event To State Latency p99", UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT,
+     lambda metrics: metrics.event_to_state_ms.quantile(0.99)),
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    """Set up the three global sensors."""
+    """Set up the three global sensors and one sensor per confbridge."""
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
     # Create the three global sensors
@@ -26,12 +50,51 @@ async def async_setup_entry(
         AsteriskExtensionSensor(coordinator, config_entry.entry_id),
     ]
 
+    # The metrics are shared by all entries, so their sensors go on the
+    # device of the oldest entry, whatever order the entries load in
+    if hass.config_entries.async_entries(DOMAIN)[0].entry_id == config_entry.entry_id:
+        metrics = async_get_metrics(hass)
+        entities.extend(
+            AsteriskMetricSensor(metrics, config_entry.entry_id, key, name, unit, state_class, value_fn)
+            for key, name, unit, state_class, value_fn in METRIC_SENSORS
+        )
+
     async_add_entities(entities)
 
+    # Recreate sensors for confbridges seen before a restart, then add new
+    # ones as soon as the coordinator reports a confbridge it hasn't seen.
+    bridge_prefix = f"{config_entry.entry_id}_bridge_"
+    known_bridges = {
+        entity.unique_id[len(bridge_prefix):]
+        for entity in er.async_entries_for_config_entry(er.async_get(hass), config_entry.entry_id)
+        if entity.domain == "sensor" and entity.unique_id.startswith(bridge_prefix)
+    }
+    known_bridges.update(coordinator.bridges)
+
+    async_add_entities(
+        AsteriskConfbridgeSensor(coordinator, config_entry.entry_id, confbridge_id)
+        for confbridge_id in known_bridges
+    )
+
+    @callback
+    def _async_add_bridge_sensor(confbridge_id):
+        """Add a sensor for a newly seen confbridge."""
+        if confbridge_id in known_bridges:
+            return
+        known_bridges.add(confbridge_id)
+        async_add_entities([AsteriskConfbridgeSensor(coordinator, config_entry.entry_id, confbridge_id)])
+
+    coordinator.async_add_new_bridge_callback(_async_add_bridge_sensor)
+    config_entry.async_on_unload(
+        lambda: coordinator.async_remove_new_bridge_callback(_async_add_bridge_sensor)
+    )
+
 
 class AsteriskCallStatusSensor(SensorEntity):
     """Sensor for call status (updated last to avoid race conditions)."""
 
+    _attr_should_poll = False
+
     def __init__(self, coordinator, entry_id):
         """Initialize the sensor."""
         self.coordinator = coordinator
@@ -48,12 +111,12 @@ class AsteriskCallStatusSensor(SensorEntity):
     async def async_added_to_hass(self):
         """Register with coordinator when added to hass."""
         await super().async_added_to_hass()
-        self.coordinator.async_add_listener(self.async_write_ha_state)
+        self.coordinator.async_add_listener(self.async_write_ha_state, "call_status")
 
     async def async_will_remove_from_hass(self):
         """Unregister from coordinator when removed from hass."""
         await super().async_will_remove_from_hass()
-        self.coordinator.async_remove_listener(self.async_write_ha_state)
+        self.coordinator.async_remove_listener(self.async_write_ha_state, "call_status")
 
     @property
     def native_value(self):
@@ -74,6 +137,8 @@ class AsteriskCallStatusSensor(SensorEntity):
 class AsteriskConfbridgeIdSensor(SensorEntity):
     """Sensor for confbridge ID."""
 
+    _attr_should_poll = False
+
     def __init__(self, coordinator, entry_id):
         """Initialize the sensor."""
         self.coordinator = coordinator
@@ -90,12 +155,12 @@ class AsteriskConfbridgeIdSensor(SensorEntity):
     async def async_added_to_hass(self):
         """Register with coordinator when added to hass."""
         await super().async_added_to_hass()
-        self.coordinator.async_add_listener(self.async_write_ha_state)
+        self.coordinator.async_add_listener(self.async_write_ha_state, "confbridge_id")
 
     async def async_will_remove_from_hass(self):
         """Unregister from coordinator when removed from hass."""
         await super().async_will_remove_from_hass()
-        self.coordinator.async_remove_listener(self.async_write_ha_state)
+        self.coordinator.async_remove_listener(self.async_write_ha_state, "confbridge_id")
 
     @property
     def native_value(self):
@@ -111,6 +176,8 @@ class AsteriskConfbridgeIdSensor(SensorEntity):
 class AsteriskExtensionSensor(SensorEntity):
     """Sensor for extension."""
 
+    _attr_should_poll = False
+
     def __init__(self, coordinator, entry_id):
         """Initialize the sensor."""
         self.coordinator = coordinator
@@ -127,12 +194,12 @@ class AsteriskExtensionSensor(SensorEntity):
     async def async_added_to_hass(self):
         """Register with coordinator when added to hass."""
         await super().async_added_to_hass()
-        self.coordinator.async_add_listener(self.async_write_ha_state)
+        self.coordinator.async_add_listener(self.async_write_ha_state, "extension")
 
     async def async_will_remove_from_hass(self):
         """Unregister from coordinator when removed from hass."""
         await super().async_will_remove_from_hass()
-        self.coordinator.async_remove_listener(self.async_write_ha_state)
+        self.coordinator.async_remove_listener(self.async_write_ha_state, "extension")
 
     @property
     def native_value(self):
@@ -142,4 +209,85 @@ class AsteriskExtensionSensor(SensorEntity):
     @property
     def icon(self):
         """Return the icon to use in the frontend."""
-        return "mdi:phone-dial"
\ No newline at end of file
+        return "mdi:phone-dial"
+
+
+class AsteriskConfbridgeSensor(SensorEntity):
+    """Sensor for the call status of a single confbridge."""
+
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, entry_id, confbridge_id):
+        """Initialize the sensor."""
+        self.coordinator = coordinator
+        self._entry_id = entry_id
+        self._confbridge_id = confbridge_id
+
+        self._attr_name = f"Asterisk Doorbell {confbridge_id} Call Status"
+        self._attr_unique_id = f"{entry_id}_bridge_{confbridge_id}"
+
+        # Link to the device created in __init__.py
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry_id)},
+        }
+
+    async def async_added_to_hass(self):
+        """Register with coordinator when added to hass."""
+        await super().async_added_to_hass()
+        self.coordinator.async_add_bridge_listener(self._confbridge_id, self.async_write_ha_state)
+
+    async def async_will_remove_from_hass(self):
+        """Unregister from coordinator when removed from hass."""
+        await super().async_will_remove_from_hass()
+        self.coordinator.async_remove_bridge_listener(self._confbridge_id, self.async_write_ha_state)
+
+    @property
+    def native_value(self):
+        """Return the call status of the confbridge."""
+        return self.coordinator.bridge_state(self._confbridge_id)["call_status"]
+
+    @property
+    def extra_state_attributes(self):
+        """Return the confbridge and its extension."""
+        return {
+            "confbridge_id": self._confbridge_id,
+            "extension": self.coordinator.bridge_state(self._confbridge_id)["extension"],
+        }
+
+    @property
+    def icon(self):
+        """Return the icon to use in the frontend."""
+        call_status = self.native_value
+        if call_status == "active":
+            return "mdi:phone-in-talk"
+        elif call_status == "ringing":
+            return "mdi:phone-ring"
+        return "mdi:phone-off"
+
+
+class AsteriskMetricSensor(SensorEntity):
+    """Diagnostic sensor exposing one integration metric."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:chart-line"
+
+    def __init__(self, metrics, entry_id, key, name, unit, state_class, value_fn):
+        """Initialize the sensor."""
+        self._metrics = metrics
+        self._value_fn = value_fn
+
+        self._attr_name = f"Asterisk Doorbell {name}"
+        self._attr_unique_id = f"{entry_id}_metric_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+
+        # Link to the device created in __init__.py
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry_id)},
+        }
+
+    @property
+    def native_value(self):
+        """Return the current metric value."""
+        value = self._value_fn(self._metrics)
+        return None if value == float("inf") else value
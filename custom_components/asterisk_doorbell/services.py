@@ -1,15 +1,40 @@
 """Services for the Asterisk Doorbell integration."""
 import logging
+import time
+from collections import deque
 import voluptuous as vol
-import traceback
 
 from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.helpers import config_validation as cv
 
-from .const import DOMAIN, STATE_RINGING, STATE_INACTIVE, STATE_ACTIVE
+from .const import (
+    DATA_DOOR_STATIONS,
+    DATA_NOTIFIERS,
+    DATA_SNAPSHOTS,
+    DOMAIN,
+    STATE_RINGING,
+    STATE_INACTIVE,
+    STATE_ACTIVE,
+)
+from .history import DATA_HISTORY
+from .metrics import async_get_metrics
+from .settings import async_get_settings
 
 _LOGGER = logging.getLogger(__name__)
 
+# Most recent transitions kept in memory for asterisk_doorbell/get_transitions
+DATA_TRANSITIONS = f"{DOMAIN}_transitions"
+TRANSITION_LOG_SIZE = 50
+
+DATA_GATE = f"{DOMAIN}_gate"
+
+# (entry ids by owned confbridge, ids of the entries owning none)
+DATA_ROUTES = f"{DOMAIN}_routes"
+
+# Events for a confbridge arriving within this many seconds of the last
+# applied one are folded into a single trailing transition.
+COALESCE_WINDOW = 0.25
+
 SERVICE_CALL = "call"
 SERVICE_ANSWERED = "answered"
 SERVICE_TERMINATE = "terminate"
@@ -18,6 +43,7 @@ CALL_SCHEMA = vol.Schema(
     {
         vol.Required("confbridge"): cv.string,
         vol.Required("extension"): cv.string,
+        vol.Optional("timestamp"): vol.Coerce(float),
     }
 )
 
@@ -25,6 +51,7 @@ ANSWERED_SCHEMA = vol.Schema(
     {
         vol.Required("confbridge"): cv.string,
         vol.Required("extension"): cv.string,
+        vol.Optional("timestamp"): vol.Coerce(float),
     }
 )
 
@@ -32,192 +59,328 @@ TERMINATE_SCHEMA = vol.Schema(
     {
         vol.Required("confbridge"): cv.string,
         vol.Optional("extension", default=""): cv.string,  # Make extension optional with default
+        vol.Optional("timestamp"): vol.Coerce(float),
     }
 )
 
-
-async def async_setup_services(hass: HomeAssistant) -> None:
-    """Set up services for the Asterisk Doorbell integration."""
-
-    _LOGGER.info("Setting up Asterisk Doorbell services...")
-    _LOGGER.debug("DOMAIN: %s", DOMAIN)
-    _LOGGER.debug("Available data keys: %s", list(hass.data.get(DOMAIN, {}).keys()))
+# Schema and resulting call status for each event Asterisk can report
+EVENT_SCHEMAS = {
+    SERVICE_CALL: CALL_SCHEMA,
+    SERVICE_ANSWERED: ANSWERED_SCHEMA,
+    SERVICE_TERMINATE: TERMINATE_SCHEMA,
+}
+
+EVENT_STATES = {
+    SERVICE_CALL: STATE_RINGING,
+    SERVICE_ANSWERED: STATE_ACTIVE,
+    SERVICE_TERMINATE: STATE_INACTIVE,
+}
+
+
+class _BridgeGate:
+    """What the gate knows about one confbridge."""
+
+    __slots__ = ("event", "extension", "ended_at", "pending", "timer")
+
+    def __init__(self):
+        """Initialize a confbridge no event has been applied to yet."""
+        # Not SERVICE_TERMINATE: after a restart mid-call the first terminate
+        # still has to reach the door stations and notifications
+        self.event = None
+        self.extension = ""
+        self.ended_at = None
+        self.pending = None
+        self.timer = None
+
+
+class EventGate:
+    """Number, deduplicate and coalesce call events per confbridge.
+
+    Asterisk can report the same event more than once (the hangup handler
+    and the timeout watchdog both send terminate, res_curl retries call)
+    and events can overtake each other. Every event gets a sequence number;
+    duplicates and events that would move a call backwards are dropped.
+    The first event after a quiet period is applied immediately, later ones
+    within COALESCE_WINDOW only update a pending event that is applied once
+    the window closes, so a burst costs at most two state writes.
+
+    A call or answered event that Asterisk timestamped before the last
+    terminate is a retry of the call that ended and is dropped as stale;
+    a new call is applied however soon it follows. Events without a
+    timestamp can't be told apart and are always accepted.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the gate."""
+        self.hass = hass
+        self.sequence = 0
+        self._bridges = {}
 
     @callback
-    def handle_call(call: ServiceCall) -> None:
-        """Handle the call service call when someone joins a confbridge."""
-        try:
-            _LOGGER.info("=== CALL SERVICE HANDLER STARTED ===")
-            _LOGGER.debug("Raw service call object: %s", call)
-            _LOGGER.debug("Service call data type: %s", type(call.data))
-            _LOGGER.debug("Service call data: %s", call.data)
-            _LOGGER.debug("Service call context: %s", call.context)
-
-            # Check if required fields exist
-            if "confbridge" not in call.data:
-                _LOGGER.error("Missing 'confbridge' field in service call data")
-                return
-            if "extension" not in call.data:
-                _LOGGER.error("Missing 'extension' field in service call data")
-                return
-
-            confbridge_id = call.data["confbridge"]
-            extension = call.data["extension"]
-
-            _LOGGER.info("Extracted confbridge_id: '%s' (type: %s)", confbridge_id, type(confbridge_id))
-            _LOGGER.info("Extracted extension: '%s' (type: %s)", extension, type(extension))
-
-            _LOGGER.debug("Call notification: extension %s joined confbridge %s", extension, confbridge_id)
-
-            # Check if DOMAIN exists in hass.data
-            if DOMAIN not in hass.data:
-                _LOGGER.error("DOMAIN '%s' not found in hass.data", DOMAIN)
-                _LOGGER.debug("Available domains in hass.data: %s", list(hass.data.keys()))
-                return
-
-            coordinators = hass.data[DOMAIN]
-            _LOGGER.debug("Found %d coordinators", len(coordinators))
-
-            # Update all coordinators in the correct order to avoid race conditions
-            # 1. Set confbridge_id first
-            # 2. Set extension second
-            # 3. Set call_status last (automations trigger on this)
-            for entry_id, coordinator in coordinators.items():
-                _LOGGER.debug("Updating coordinator for entry_id: %s", entry_id)
-
-                coordinator.confbridge_id = confbridge_id
-                _LOGGER.debug("Set confbridge_id to: %s", coordinator.confbridge_id)
-                coordinator.async_update_listeners()  # Update confbridge_id sensor
-
-                coordinator.extension = extension
-                _LOGGER.debug("Set extension to: %s", coordinator.extension)
-                coordinator.async_update_listeners()  # Update extension sensor
-
-                coordinator.call_status = STATE_RINGING
-                _LOGGER.debug("Set call_status to: %s", coordinator.call_status)
-                coordinator.async_update_listeners()  # Update call_status sensor last
-
-                _LOGGER.info("Updated state to ringing: confbridge=%s, extension=%s", confbridge_id, extension)
-
-            _LOGGER.info("=== CALL SERVICE HANDLER COMPLETED ===")
-
-        except Exception as e:
-            _LOGGER.error("Exception in handle_call: %s", str(e))
-            _LOGGER.error("Traceback: %s", traceback.format_exc())
+    def async_submit(
+        self, event: str, confbridge_id: str, extension: str, received: float = None, sent_at: float = None
+    ) -> None:
+        """Number an event and apply, defer or drop it."""
+        self.sequence += 1
+        metrics = async_get_metrics(self.hass)
+        metrics.events_total += 1
+
+        bridge = self._bridges.get(confbridge_id)
+        if bridge is None:
+            bridge = self._bridges[confbridge_id] = _BridgeGate()
+
+        if bridge.pending is not None:
+            latest_event, latest_extension = bridge.pending[1], bridge.pending[3]
+        else:
+            latest_event, latest_extension = bridge.event, bridge.extension
+
+        reason = self._drop_reason(bridge, latest_event, latest_extension, event, extension, sent_at)
+        if reason is not None:
+            metrics.events_dropped += 1
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "Dropped event seq=%d event=%s confbridge=%s extension=%s reason=%s",
+                    self.sequence, event, confbridge_id, extension, reason,
+                )
+            return
+
+        if event == SERVICE_TERMINATE:
+            bridge.ended_at = sent_at
+
+        if bridge.timer is not None:
+            if bridge.pending is not None:
+                metrics.events_coalesced += 1
+            bridge.pending = (self.sequence, event, confbridge_id, extension, received)
+            return
+
+        self._async_apply(bridge, (self.sequence, event, confbridge_id, extension, received))
+
+    def _drop_reason(self, bridge, latest_event, latest_extension, event, extension, sent_at):
+        """Return why an event should be dropped, or None to keep it."""
+        if event == latest_event and (event == SERVICE_TERMINATE or extension == latest_extension):
+            return "duplicate"
+        if event == SERVICE_CALL and latest_event == SERVICE_ANSWERED:
+            return "stale"
+        if (
+            latest_event == SERVICE_TERMINATE
+            and bridge.ended_at is not None
+            and sent_at is not None
+            and sent_at < bridge.ended_at
+        ):
+            return "stale"
+        return None
 
     @callback
-    def handle_answered(call: ServiceCall) -> None:
-        """Handle the answered service call when a call is answered."""
-        try:
-            _LOGGER.info("=== ANSWERED SERVICE HANDLER STARTED ===")
-            _LOGGER.debug("Raw service call object: %s", call)
-            _LOGGER.debug("Service call data: %s", call.data)
-
-            confbridge_id = call.data["confbridge"]
-            extension = call.data["extension"]
-
-            _LOGGER.debug("Answered notification: confbridge %s answered by extension %s", confbridge_id, extension)
-
-            # Update all coordinators in the correct order
-            for entry_id, coordinator in hass.data[DOMAIN].items():
-                coordinator.confbridge_id = confbridge_id
-                coordinator.async_update_listeners()  # Update confbridge_id sensor
-
-                coordinator.extension = extension
-                coordinator.async_update_listeners()  # Update extension sensor
-
-                coordinator.call_status = STATE_ACTIVE
-                coordinator.async_update_listeners()  # Update call_status sensor last
-
-                _LOGGER.info("Updated state to active: confbridge=%s, extension=%s", confbridge_id, extension)
-
-            _LOGGER.info("=== ANSWERED SERVICE HANDLER COMPLETED ===")
-
-        except Exception as e:
-            _LOGGER.error("Exception in handle_answered: %s", str(e))
-            _LOGGER.error("Traceback: %s", traceback.format_exc())
+    def _async_apply(self, bridge: _BridgeGate, pending) -> None:
+        """Apply an event and open a coalescing window behind it."""
+        sequence, event, confbridge_id, extension, received = pending
+        bridge.event = event
+        bridge.extension = extension
+        bridge.pending = None
+        bridge.timer = self.hass.loop.call_later(COALESCE_WINDOW, self._async_close_window, confbridge_id)
+        _async_apply_event(self.hass, sequence, event, confbridge_id, extension, received)
 
     @callback
-    def handle_terminate(call: ServiceCall) -> None:
-        """Handle the terminate service call when a confbridge is ended."""
-        try:
-            _LOGGER.info("=== TERMINATE SERVICE HANDLER STARTED ===")
-            _LOGGER.debug("Raw service call object: %s", call)
-            _LOGGER.debug("Service call data: %s", call.data)
-
-            confbridge_id = call.data["confbridge"]
-
-            _LOGGER.debug("Terminate notification: confbridge %s ended", confbridge_id)
+    def _async_close_window(self, confbridge_id: str) -> None:
+        """Apply the event that arrived last during the window, if any."""
+        bridge = self._bridges[confbridge_id]
+        bridge.timer = None
+        if bridge.pending is None:
+            return
+        if bridge.pending[1] == bridge.event and bridge.pending[3] == bridge.extension:
+            # The burst ended where it started
+            bridge.pending = None
+            return
+        self._async_apply(bridge, bridge.pending)
 
-            # Update all coordinators in the correct order
-            for entry_id, coordinator in hass.data[DOMAIN].items():
-                coordinator.confbridge_id = ""
-                coordinator.async_update_listeners()  # Update confbridge_id sensor
+    @callback
+    def async_cancel(self) -> None:
+        """Cancel open windows and forget pending events."""
+        for bridge in self._bridges.values():
+            if bridge.timer is not None:
+                bridge.timer.cancel()
+                bridge.timer = None
+            bridge.pending = None
+
+
+@callback
+def async_dispatch_event(
+    hass: HomeAssistant,
+    event: str,
+    confbridge_id: str,
+    extension: str = "",
+    received: float = None,
+    sent_at: float = None,
+) -> None:
+    """Hand a call, answered or terminate event to the gate.
+
+    This is the single entry point for call events, whether they arrive as
+    service calls, through the event endpoint or over AMI. ``received`` is
+    the time.monotonic() at which the event reached the integration; the
+    time from then until every sensor has been written is recorded.
+    ``sent_at`` is the Unix time at which Asterisk saw the event, if it
+    said so, and orders a retried call against the terminate after it.
+    """
+    gate = hass.data.get(DATA_GATE)
+    if gate is None:
+        _async_apply_event(hass, None, event, confbridge_id, extension, received)
+    else:
+        gate.async_submit(event, confbridge_id, extension, received, sent_at)
+
+
+@callback
+def _async_apply_event(
+    hass: HomeAssistant,
+    sequence: int,
+    event: str,
+    confbridge_id: str,
+    extension: str,
+    received: float,
+) -> None:
+    """Apply an event that passed the gate to the entries owning the confbridge."""
+    call_status = EVENT_STATES[event]
+    coordinators = hass.data.get(DOMAIN, {})
+    routes = hass.data.get(DATA_ROUTES)
+    if routes is None:
+        entry_ids = tuple(coordinators)
+    else:
+        owned, unclaimed = routes
+        entry_ids = owned.get(confbridge_id, unclaimed)
+    changed = 0
+    for entry_id in entry_ids:
+        changed += coordinators[entry_id].async_apply_transition(call_status, confbridge_id, extension)
+
+    latency_ms = None
+    if received is not None:
+        metrics = async_get_metrics(hass)
+        latency_ms = (time.monotonic() - received) * 1000
+        metrics.event_to_state_ms.observe(latency_ms)
+
+    now = time.time()
+
+    # Fetched and sent in the background once every sensor already shows the ring.
+    # The helpers are imported here, and only once an entry has configured them,
+    # so that loading the services doesn't pull in httpx and the rest.
+    if DATA_NOTIFIERS in hass.data:
+        from .notifier import async_clear_ring_notifications, async_notify_ring
+
+        if call_status == STATE_RINGING and changed:
+            async_notify_ring(hass, entry_ids, confbridge_id, extension)
+        elif call_status != STATE_RINGING:
+            async_clear_ring_notifications(hass, entry_ids, confbridge_id)
+    if DATA_SNAPSHOTS in hass.data and call_status == STATE_RINGING and changed:
+        from .snapshot import async_capture_snapshots
+
+        async_capture_snapshots(hass, entry_ids, confbridge_id, now)
+
+    # Hang up the door stations in one concurrent round, also in the background
+    if DATA_DOOR_STATIONS in hass.data and event == SERVICE_TERMINATE:
+        from .door_station import async_cancel_door_stations
+
+        async_cancel_door_stations(hass, entry_ids)
+
+    history = hass.data.get(DATA_HISTORY)
+    if history is not None:
+        history.async_record(call_status, confbridge_id, extension, now)
+
+    # One record per transition; nothing is formatted unless someone reads it
+    transitions = hass.data.get(DATA_TRANSITIONS)
+    if transitions is not None:
+        transitions.append(
+            (now, sequence, event, confbridge_id, extension, latency_ms, len(entry_ids), changed)
+        )
 
-                coordinator.extension = ""
-                coordinator.async_update_listeners()  # Update extension sensor
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        _LOGGER.debug(
+            "Transition seq=%s event=%s confbridge=%s extension=%s latency_ms=%s entries=%d changed=%d",
+            sequence,
+            event,
+            confbridge_id,
+            extension,
+            None if latency_ms is None else round(latency_ms, 3),
+            len(entry_ids),
+            changed,
+        )
 
-                coordinator.call_status = STATE_INACTIVE
-                coordinator.async_update_listeners()  # Update call_status sensor last
 
-                _LOGGER.info("Updated state to inactive: confbridge=%s", confbridge_id)
+@callback
+def async_update_routes(hass: HomeAssistant) -> None:
+    """Rebuild the index of which entries receive which confbridge.
+
+    Entries that list their confbridges only receive events for those;
+    entries that list none receive every confbridge no entry claims. Run
+    when an entry is set up or unloaded, so dispatching an event is one
+    dict lookup however many entries there are.
+    """
+    owned = {}
+    unclaimed = []
+    for entry_id in hass.data.get(DOMAIN, {}):
+        settings = async_get_settings(hass, entry_id)
+        if settings is None or not settings.confbridges:
+            unclaimed.append(entry_id)
+            continue
+        for confbridge_id in settings.confbridges:
+            owned.setdefault(confbridge_id, []).append(entry_id)
+
+    hass.data[DATA_ROUTES] = (
+        {confbridge_id: tuple(entry_ids) for confbridge_id, entry_ids in owned.items()},
+        tuple(unclaimed),
+    )
+    _LOGGER.debug("Routing %d confbridges, %d entries take the rest", len(owned), len(unclaimed))
+
+
+@callback
+def async_get_transitions(hass: HomeAssistant):
+    """Return the recorded transitions, oldest first."""
+    return [
+        {
+            "time": timestamp,
+            "sequence": sequence,
+            "event": event,
+            "confbridge": confbridge_id,
+            "extension": extension,
+            "latency_ms": latency_ms,
+            "entries": entries,
+            "changed": changed,
+        }
+        for timestamp, sequence, event, confbridge_id, extension, latency_ms, entries, changed
+        in hass.data.get(DATA_TRANSITIONS, ())
+    ]
 
-            _LOGGER.info("=== TERMINATE SERVICE HANDLER COMPLETED ===")
 
-        except Exception as e:
-            _LOGGER.error("Exception in handle_terminate: %s", str(e))
-            _LOGGER.error("Traceback: %s", traceback.format_exc())
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Set up services for the Asterisk Doorbell integration."""
+    hass.data.setdefault(DATA_TRANSITIONS, deque(maxlen=TRANSITION_LOG_SIZE))
+    hass.data.setdefault(DATA_GATE, EventGate(hass))
 
-    # Register the services
-    _LOGGER.info("Registering service: %s.%s", DOMAIN, SERVICE_CALL)
-    try:
-        hass.services.async_register(
-            DOMAIN,
-            SERVICE_CALL,
-            handle_call,
-            schema=CALL_SCHEMA,
-        )
-        _LOGGER.info("Successfully registered %s.%s", DOMAIN, SERVICE_CALL)
-    except Exception as e:
-        _LOGGER.error("Failed to register %s.%s: %s", DOMAIN, SERVICE_CALL, str(e))
-
-    _LOGGER.info("Registering service: %s.%s", DOMAIN, SERVICE_ANSWERED)
-    try:
-        hass.services.async_register(
-            DOMAIN,
-            SERVICE_ANSWERED,
-            handle_answered,
-            schema=ANSWERED_SCHEMA,
-        )
-        _LOGGER.info("Successfully registered %s.%s", DOMAIN, SERVICE_ANSWERED)
-    except Exception as e:
-        _LOGGER.error("Failed to register %s.%s: %s", DOMAIN, SERVICE_ANSWERED, str(e))
-
-    _LOGGER.info("Registering service: %s.%s", DOMAIN, SERVICE_TERMINATE)
-    try:
-        hass.services.async_register(
-            DOMAIN,
-            SERVICE_TERMINATE,
-            handle_terminate,
-            schema=TERMINATE_SCHEMA,
+    @callback
+    def handle_event(call: ServiceCall) -> None:
+        """Handle a call, answered or terminate notification from Asterisk."""
+        # The service schemas guarantee confbridge and extension are present
+        async_dispatch_event(
+            hass,
+            call.service,
+            call.data["confbridge"],
+            call.data["extension"],
+            time.monotonic(),
+            call.data.get("timestamp"),
         )
-        _LOGGER.info("Successfully registered %s.%s", DOMAIN, SERVICE_TERMINATE)
-    except Exception as e:
-        _LOGGER.error("Failed to register %s.%s: %s", DOMAIN, SERVICE_TERMINATE, str(e))
 
-    _LOGGER.info("All services registered successfully")
+    for service, schema in EVENT_SCHEMAS.items():
+        hass.services.async_register(DOMAIN, service, handle_event, schema=schema)
+
+    _LOGGER.debug("Registered services: %s", ", ".join(EVENT_SCHEMAS))
 
 
 async def async_unload_services(hass: HomeAssistant) -> None:
     """Unload Asterisk Doorbell services."""
-    _LOGGER.info("Unloading Asterisk Doorbell services...")
-
-    services_to_remove = [SERVICE_CALL, SERVICE_ANSWERED, SERVICE_TERMINATE]
+    # A reloaded entry starts with a fresh gate instead of the old calls' state
+    gate = hass.data.pop(DATA_GATE, None)
+    if gate is not None:
+        gate.async_cancel()
 
-    for service in services_to_remove:
+    for service in EVENT_SCHEMAS:
         if hass.services.has_service(DOMAIN, service):
-            _LOGGER.debug("Removing service: %s.%s", DOMAIN, service)
             hass.services.async_remove(DOMAIN, service)
-            _LOGGER.info("Successfully removed service: %s.%s", DOMAIN, service)
-        else:
-            _LOGGER.warning("Service %s.%s not found for removal", DOMAIN, service)
\ No newline at end of file
+
+    _LOGGER.debug("Removed services: %s", ", ".join(EVENT_SCHEMAS))
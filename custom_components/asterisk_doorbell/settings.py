@@ -0,0 +1,131 @@
+"""Resolved settings cache for the Asterisk Doorbell integration."""
+import logging
+from typing import Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SETTINGS = f"{DOMAIN}_settings"
+
+
+class AsteriskSettings:
+    """Settings of one config entry, with its options applied on top of its data.
+
+    Built once when the entry is set up so request handlers never have to
+    look up config entries or assemble URLs themselves.
+    """
+
+    def __init__(self, entry: ConfigEntry):
+        """Resolve the settings of a config entry."""
+        config = {**entry.data, **entry.options}
+
+        self.entry_id = entry.entry_id
+        self.asterisk_host = config.get("asterisk_host", "")
+        self.websocket_port = config.get("asterisk_websocket_port", 8089)
+        self.event_secret = config.get("event_secret", "").encode()
+        self.ami_port = config.get("ami_port", 5038)
+        self.ami_username = config.get("ami_username", "")
+        self.ami_secret = config.get("ami_secret", "")
+        self.keepalive_offload = config.get("keepalive_offload", False)
+        self.max_proxy_sessions = config.get("max_proxy_sessions", 64)
+        self.allow_ticketless_proxy = config.get("allow_ticketless_proxy", False)
+        self.dialog_tracking = config.get("dialog_tracking", False)
+        self.snapshot_url = config.get("snapshot_url", "")
+        self.door_station_username = config.get("door_station_username", "")
+        self.door_station_password = config.get("door_station_password", "")
+        self.confbridges = [
+            confbridge_id.strip()
+            for confbridge_id in config.get("confbridges", "").split(",")
+            if confbridge_id.strip()
+        ]
+        self.door_stations = [
+            station.strip()
+            for station in config.get("door_stations", "").split(",")
+            if station.strip()
+        ]
+
+        # Names of notify services, with or without the notify. prefix
+        self.notify_targets = [
+            target.strip().removeprefix("notify.")
+            for target in config.get("notify_targets", "").split(",")
+            if target.strip()
+        ]
+
+        self.upstream_url = (
+            f"ws://{self.asterisk_host}:{self.websocket_port}/ws" if self.asterisk_host else None
+        )
+
+        # Primary upstream first, then any additional Asterisk servers
+        self.upstream_urls = [self.upstream_url] if self.upstream_url else []
+        for upstream in config.get("additional_upstreams", "").split(","):
+            upstream = upstream.strip()
+            if not upstream:
+                continue
+            if ":" not in upstream:
+                upstream = f"{upstream}:{self.websocket_port}"
+            url = f"ws://{upstream}/ws"
+            if url not in self.upstream_urls:
+                self.upstream_urls.append(url)
+
+        # Payload for asterisk_doorbell/get_settings
+        self.frontend = {
+            "asterisk_host": self.asterisk_host,
+            "websocket_port": self.websocket_port,
+        }
+
+
+@callback
+def async_cache_settings(hass: HomeAssistant, entry: ConfigEntry) -> AsteriskSettings:
+    """Resolve and cache the settings of a config entry."""
+    settings = AsteriskSettings(entry)
+    hass.data.setdefault(DATA_SETTINGS, {})[entry.entry_id] = settings
+    _LOGGER.debug("Cached settings for %s: upstream %s", entry.entry_id, settings.upstream_url)
+    return settings
+
+
+@callback
+def async_drop_settings(hass: HomeAssistant, entry_id: str) -> None:
+    """Forget the cached settings of an unloaded config entry."""
+    hass.data.get(DATA_SETTINGS, {}).pop(entry_id, None)
+
+
+@callback
+def async_get_settings(hass: HomeAssistant, entry_id: Optional[str] = None) -> Optional[AsteriskSettings]:
+    """Return the settings of an entry, or None.
+
+    Without an entry_id this is the only loaded entry. With several loaded
+    the choice would be arbitrary, so None is returned; callers explain
+    why with async_settings_error.
+    """
+    cache = hass.data.get(DATA_SETTINGS, {})
+    if entry_id is not None:
+        return cache.get(entry_id)
+    if len(cache) == 1:
+        return next(iter(cache.values()))
+    return None
+
+
+@callback
+def async_settings_error(hass: HomeAssistant, entry_id: Optional[str] = None) -> str:
+    """Return why async_get_settings found no settings for entry_id."""
+    if entry_id is not None:
+        return f"No loaded Asterisk Doorbell entry {entry_id}"
+    if hass.data.get(DATA_SETTINGS):
+        return "Several Asterisk Doorbell entries are loaded; pass entry_id to choose one"
+    return "Asterisk Doorbell is not set up"
+
+
+@callback
+def async_is_ambiguous(hass: HomeAssistant, entry_id: Optional[str] = None) -> bool:
+    """Return whether entry_id is missing while several entries are loaded."""
+    return entry_id is None and len(hass.data.get(DATA_SETTINGS, {})) > 1
+
+
+@callback
+def async_all_settings(hass: HomeAssistant):
+    """Return the settings of every loaded entry."""
+    return hass.data.get(DATA_SETTINGS, {}).values()
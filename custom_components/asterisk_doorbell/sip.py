@@ -0,0 +1,454 @@
+"""Just enough SIP for the WebSocket proxy to look inside the frames it relays."""
+import re
+import secrets
+import time
+
+# RFC 5626 keep-alive over a stream transport: the client sends a double
+# CRLF and expects a single CRLF back.
+KEEPALIVE_PING = "\r\n\r\n"
+KEEPALIVE_PONG = "\r\n"
+
+# Expiry requested from Asterisk for registrations the proxy keeps alive.
+# Asterisk clamps it to the AOR's maximum_expiration (7200 by default).
+UPSTREAM_REGISTER_EXPIRES = 600
+
+# A refresh is only answered locally if the upstream binding outlives the
+# client's next refresh by at least this many seconds.
+REFRESH_MARGIN = 30
+
+COMPACT_HEADERS = {
+    "i": "call-id",
+    "m": "contact",
+    "v": "via",
+    "f": "from",
+    "t": "to",
+    "l": "content-length",
+}
+
+_EXPIRES_PARAM = re.compile(r";\s*expires\s*=\s*\d+", re.IGNORECASE)
+_BRANCH_PARAM = re.compile(r"branch=z9hG4bK[^;,\s]*", re.IGNORECASE)
+
+
+class SipMessage:
+    """A parsed SIP request or response.
+
+    Headers keep their original names and order so that a message that is
+    only inspected can be relayed exactly as it arrived.
+    """
+
+    __slots__ = ("start_line", "headers", "body")
+
+    def __init__(self, start_line: str, headers, body: str):
+        """Initialize the message."""
+        self.start_line = start_line
+        self.headers = headers
+        self.body = body
+
+    @property
+    def method(self):
+        """Return the method of a request, or None for a response."""
+        if self.start_line.startswith("SIP/2.0 "):
+            return None
+        return self.start_line.partition(" ")[0]
+
+    @property
+    def status(self):
+        """Return the status code of a response, or None for a request."""
+        if not self.start_line.startswith("SIP/2.0 "):
+            return None
+        code = self.start_line[8:11]
+        return int(code) if code.isdigit() else None
+
+    def header(self, name: str, default=None):
+        """Return the first value of a header, matching compact forms too."""
+        name = name.lower()
+        for key, value in self.headers:
+            key = key.lower()
+            if COMPACT_HEADERS.get(key, key) == name:
+                return value
+        return default
+
+    def set_header(self, name: str, value: str):
+        """Replace every occurrence of a header with a single value."""
+        lower = name.lower()
+        headers = []
+        replaced = False
+        for key, old in self.headers:
+            key_lower = key.lower()
+            if COMPACT_HEADERS.get(key_lower, key_lower) != lower:
+                headers.append((key, old))
+            elif not replaced:
+                headers.append((key, value))
+                replaced = True
+        if not replaced:
+            headers.append((name, value))
+        self.headers = headers
+
+    def cseq(self):
+        """Return the CSeq number and method."""
+        number, _, method = self.header("cseq", "0 ").partition(" ")
+        return int(number) if number.isdigit() else 0, method.strip()
+
+    def expires(self):
+        """Return the expiry the message asks for or grants, or None."""
+        contact = self.header("contact", "")
+        match = _EXPIRES_PARAM.search(contact)
+        if match:
+            return int(match.group().rpartition("=")[2])
+        value = self.header("expires")
+        return int(value) if value and value.strip().isdigit() else None
+
+    def set_expires(self, expires: int):
+        """Set the expiry in the Expires header and on the Contact."""
+        contact = self.header("contact")
+        if contact is not None and _EXPIRES_PARAM.search(contact):
+            self.set_header("Contact", _EXPIRES_PARAM.sub(f";expires={expires}", contact))
+        if self.header("expires") is not None or contact is None:
+            self.set_header("Expires", str(expires))
+
+    def to_text(self) -> str:
+        """Serialize the message."""
+        lines = [self.start_line]
+        lines.extend(f"{key}: {value}" for key, value in self.headers)
+        return "\r\n".join(lines) + "\r\n\r\n" + self.body
+
+
+def parse_message(text: str):
+    """Parse a SIP message, or return None if the frame isn't one."""
+    head, sep, body = text.partition("\r\n\r\n")
+    if not sep:
+        return None
+    lines = head.split("\r\n")
+    start_line = lines[0]
+    if not start_line.startswith("SIP/2.0 ") and not start_line.endswith(" SIP/2.0"):
+        return None
+
+    headers = []
+    for line in lines[1:]:
+        if line[:1] in (" ", "\t") and headers:
+            # Folded continuation of the previous header
+            key, value = headers[-1]
+            headers[-1] = (key, f"{value} {line.strip()}")
+            continue
+        key, sep, value = line.partition(":")
+        if sep:
+            headers.append((key.strip(), value.strip()))
+    return SipMessage(start_line, headers, body)
+
+
+def _contact_uri(contact: str) -> str:
+    """Return the URI of a Contact value."""
+    if "<" in contact:
+        return contact[contact.find("<") + 1:contact.find(">")]
+    return contact.partition(";")[0].strip()
+
+
+class RegistrationOffload:
+    """Keep one client's registration alive in Asterisk with fewer refreshes.
+
+    The proxy registers the client for UPSTREAM_REGISTER_EXPIRES seconds but
+    tells the client it got the expiry it asked for. Refreshes that arrive
+    while the upstream binding still comfortably outlives them are answered
+    with a locally built 200 OK instead of being relayed; double-CRLF pings
+    are answered locally as well. When the client goes away the binding is
+    removed with an un-REGISTER so Asterisk doesn't ring a dead contact.
+
+    Only registrations are offloaded: calls, OPTIONS and everything else are
+    relayed unchanged, and each client keeps its own socket and contact.
+    """
+
+    def __init__(
+        self,
+        upstream_expires: int = UPSTREAM_REGISTER_EXPIRES,
+        refresh_margin: int = REFRESH_MARGIN,
+    ):
+        """Initialize the offload for one proxied socket."""
+        self._upstream_expires = upstream_expires
+        self._refresh_margin = refresh_margin
+        self._pending = {}
+        self._register = None
+        self._call_id = None
+        self._contact = None
+        self._cseq = 0
+        self._expires_at = 0.0
+        self._to = None
+        self.answered = 0
+
+    def client_frame(self, text: str):
+        """Inspect a frame from the client.
+
+        Returns the text to relay to Asterisk and the reply to send back to
+        the client instead, either of which may be None.
+        """
+        if text == KEEPALIVE_PING:
+            self.answered += 1
+            return None, KEEPALIVE_PONG
+
+        if not text.startswith("REGISTER "):
+            return text, None
+        message = parse_message(text)
+        if message is None:
+            return text, None
+
+        call_id = message.header("call-id")
+        contact = _contact_uri(message.header("contact", ""))
+        requested = message.expires()
+        cseq, _ = message.cseq()
+        self._cseq = max(self._cseq, cseq)
+
+        if (
+            requested
+            and call_id == self._call_id
+            and contact == self._contact
+            and self._expires_at - time.monotonic() > requested + self._refresh_margin
+        ):
+            self.answered += 1
+            return None, self._local_ok(message, requested)
+
+        if requested and requested < self._upstream_expires:
+            message.set_expires(self._upstream_expires)
+        self._pending[(call_id, cseq)] = requested
+        self._register = message
+        return message.to_text(), None
+
+    def upstream_frame(self, text: str):
+        """Inspect a frame from Asterisk.
+
+        Returns the text to relay to the client; nothing is ever answered
+        on the client's behalf in this direction, so the reply is None.
+        """
+        if not self._pending or not text.startswith("SIP/2.0 "):
+            return text, None
+        message = parse_message(text)
+        if message is None:
+            return text, None
+
+        cseq, method = message.cseq()
+        status = message.status
+        if method != "REGISTER" or status is None or status < 200:
+            return text, None
+
+        requested = self._pending.pop((message.header("call-id"), cseq), None)
+        if requested is None or status >= 300:
+            return text, None
+
+        granted = message.expires()
+        if granted is None:
+            granted = self._upstream_expires if requested else 0
+        if not requested or not granted:
+            self._call_id = self._contact = None
+            self._expires_at = 0.0
+            return text, None
+
+        self._call_id = message.header("call-id")
+        self._contact = _contact_uri(self._register.header("contact", ""))
+        self._expires_at = time.monotonic() + granted
+        self._to = message.header("to")
+
+        message.set_expires(min(requested, granted))
+        return message.to_text(), None
+
+    def _local_ok(self, request: SipMessage, expires: int) -> str:
+        """Build the 200 OK Asterisk would have sent for a refresh."""
+        headers = [(key, value) for key, value in request.headers if key.lower() in ("via", "v")]
+        headers.extend((
+            ("From", request.header("from", "")),
+            ("To", self._to or request.header("to", "")),
+            ("Call-ID", request.header("call-id", "")),
+            ("CSeq", request.header("cseq", "")),
+            ("Contact", _EXPIRES_PARAM.sub("", request.header("contact", "")) + f";expires={expires}"),
+            ("Expires", str(expires)),
+            ("Content-Length", "0"),
+        ))
+        return SipMessage("SIP/2.0 200 OK", headers, "").to_text()
+
+    def unregister_frame(self):
+        """Return an un-REGISTER for the current binding, or None if there is none.
+
+        The proxy can't answer a digest challenge, so the client's last
+        Authorization is sent again. Its response covers the method and
+        Request-URI, which an un-REGISTER shares with the REGISTER it came
+        from, so Asterisk accepts it while the nonce is still fresh. If the
+        nonce went stale the challenge goes unanswered and the binding
+        lapses after UPSTREAM_REGISTER_EXPIRES.
+        """
+        if self._register is None or self._expires_at <= time.monotonic():
+            return None
+
+        message = SipMessage(self._register.start_line, list(self._register.headers), "")
+        self._cseq += 1
+        message.set_header("CSeq", f"{self._cseq} REGISTER")
+        message.set_expires(0)
+        message.set_header("Via", _BRANCH_PARAM.sub(
+            f"branch=z9hG4bK{secrets.token_hex(8)}", message.header("via", "")
+        ))
+        message.set_header("Content-Length", "0")
+        self._expires_at = 0.0
+        return message.to_text()
+
+
+def _header_value(text: str, prefix: str, end: int):
+    """Return the value of the header line starting with prefix, or None."""
+    start = text.find(prefix, 0, end)
+    if start < 0:
+        return None
+    start += len(prefix)
+    line_end = text.find("\r\n", start, end)
+    return text[start:line_end if line_end >= 0 else end].strip()
+
+
+def peek_message(text: str):
+    """Return the start line, Call-ID and CSeq of a SIP message, or None.
+
+    Cheaper than parse_message: the header names JsSIP and Asterisk send
+    are found with two substring searches, other spellings by looking at
+    header lines only until both are found, and the body is never touched.
+    """
+    end = text.find("\r\n\r\n")
+    if end < 0:
+        return None
+    start = text.find("\r\n", 0, end)
+    start_line = text[:start] if start >= 0 else text[:end]
+    if not start_line.startswith("SIP/2.0 ") and not start_line.endswith(" SIP/2.0"):
+        return None
+
+    call_id = _header_value(text, "\r\nCall-ID:", end)
+    cseq = _header_value(text, "\r\nCSeq:", end)
+    while start >= 0 and (call_id is None or cseq is None):
+        line_end = text.find("\r\n", start + 2, end)
+        line = text[start + 2:line_end if line_end >= 0 else end]
+        start = line_end
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        key = key.strip().lower()
+        if call_id is None and (key == "call-id" or key == "i"):
+            call_id = value.strip()
+        elif cseq is None and key == "cseq":
+            cseq = value.strip()
+    return start_line, call_id, cseq
+
+
+class DialogTracker:
+    """Time the calls and registrations of one proxied client.
+
+    Watches the frames relayed for a client without changing them:
+    INVITE to final response (the client's answer latency for calls from
+    Asterisk), BYE round trips, REGISTER refresh intervals and failure
+    responses are recorded on ``stats``, a SipClientStats shared by every
+    socket from the same client. Only requests and responses of those
+    methods are looked at past their first few bytes, and at most
+    MAX_TRACKED transactions and dialogs are remembered per socket.
+    """
+
+    TRACKED_REQUESTS = ("INVITE ", "BYE ", "REGISTER ")
+
+    # Challenges are part of authenticating, not failures
+    IGNORED_STATUSES = (401, 407)
+
+    MAX_TRACKED = 16
+
+    def __init__(self, stats, clock=time.monotonic):
+        """Initialize the tracker for one proxied socket."""
+        self.stats = stats
+        self._clock = clock
+        self._transactions = {}
+        self._dialogs = {}
+        self._last_register = None
+
+    def client_frame(self, text: str):
+        """Inspect a frame from the client."""
+        self._frame(text)
+
+    def upstream_frame(self, text: str):
+        """Inspect a frame from Asterisk."""
+        self._frame(text)
+
+    def _frame(self, text: str):
+        """Record what a frame means for the client's calls and registration."""
+        if text.startswith("SIP/2.0 "):
+            self._response(text)
+        elif text.startswith(self.TRACKED_REQUESTS):
+            self._request(text)
+
+    def _request(self, text: str):
+        """Start timing an INVITE or BYE, or count a REGISTER."""
+        peeked = peek_message(text)
+        if peeked is None:
+            return
+        start_line, call_id, cseq = peeked
+        if call_id is None or cseq is None:
+            return
+        method = start_line.partition(" ")[0]
+        now = self._clock()
+        stats = self.stats
+
+        if method == "REGISTER":
+            stats.registers += 1
+            if self._last_register is not None:
+                stats.register_interval_s.observe(now - self._last_register)
+            self._last_register = now
+            return
+
+        if method == "INVITE":
+            # A re-INVITE within a dialog isn't a new call
+            if call_id in self._dialogs:
+                return
+            stats.invites += 1
+        elif method == "BYE":
+            answered_at = self._dialogs.pop(call_id, None)
+            if answered_at is not None:
+                stats.active_dialogs -= 1
+                stats.call_s.observe(now - answered_at)
+        self._remember(self._transactions, (call_id, cseq), now)
+
+    def _response(self, text: str):
+        """Finish timing an INVITE or BYE and count failures."""
+        status = text[8:11]
+        if not status.isdigit() or status[0] == "1":
+            return
+        status = int(status)
+        stats = self.stats
+
+        if status >= 300 and status not in self.IGNORED_STATUSES:
+            stats.failures[status] = stats.failures.get(status, 0) + 1
+        if not self._transactions:
+            return
+
+        peeked = peek_message(text)
+        if peeked is None:
+            return
+        _, call_id, cseq = peeked
+        if call_id is None or cseq is None:
+            return
+        started = self._transactions.pop((call_id, cseq), None)
+        if started is None or status >= 300:
+            return
+
+        now = self._clock()
+        if cseq.endswith("INVITE"):
+            stats.answered += 1
+            stats.answer_ms.observe((now - started) * 1000)
+            if self._remember(self._dialogs, call_id, now):
+                stats.active_dialogs += 1
+        else:
+            stats.bye_ms.observe((now - started) * 1000)
+
+    def _remember(self, tracked: dict, key, value) -> bool:
+        """Remember a transaction or dialog, forgetting the oldest beyond the limit.
+
+        Returns True if the key is new.
+        """
+        new = key not in tracked
+        tracked[key] = value
+        if len(tracked) > self.MAX_TRACKED:
+            del tracked[next(iter(tracked))]
+            if tracked is self._dialogs:
+                self.stats.active_dialogs -= 1
+        return new
+
+    def close(self):
+        """Forget the dialogs of a socket that went away."""
+        self.stats.active_dialogs -= len(self._dialogs)
+        self._dialogs.clear()
+        self._transactions.clear()
@@ -0,0 +1,160 @@
+"""Door camera snapshots captured when a call starts ringing."""
+import logging
+import time
+from collections import OrderedDict
+
+import httpx
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.httpx_client import get_async_client
+
+from .const import DATA_SNAPSHOTS, DOMAIN
+from .metrics import async_get_metrics
+from .settings import AsteriskSettings
+
+_LOGGER = logging.getLogger(__name__)
+
+# Snapshots kept in memory per entry; a JPEG from a door station is
+# typically 50-300 KB, and anything larger than MAX_SNAPSHOT_SIZE is dropped.
+MAX_SNAPSHOTS = 20
+MAX_SNAPSHOT_SIZE = 2 * 1024 * 1024
+
+# Door stations answer within a second; a ring outlives a slow one anyway
+SNAPSHOT_TIMEOUT = 5
+
+
+class Snapshot:
+    """One image taken from the door camera."""
+
+    __slots__ = ("confbridge_id", "captured_at", "content_type", "content")
+
+    def __init__(self, confbridge_id: str, captured_at: float, content_type: str, content: bytes):
+        """Initialize the snapshot."""
+        self.confbridge_id = confbridge_id
+        self.captured_at = captured_at
+        self.content_type = content_type
+        self.content = content
+
+
+class SnapshotCache:
+    """Recent snapshots keyed by confbridge and ring time, least recently used first."""
+
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS):
+        """Initialize the cache."""
+        self._snapshots = OrderedDict()
+        self._max_snapshots = max_snapshots
+
+    def __len__(self):
+        """Return the number of cached snapshots."""
+        return len(self._snapshots)
+
+    def add(self, snapshot: Snapshot):
+        """Store a snapshot, evicting the least recently used ones."""
+        key = (snapshot.confbridge_id, snapshot.captured_at)
+        self._snapshots[key] = snapshot
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self._max_snapshots:
+            self._snapshots.popitem(last=False)
+
+    def get(self, confbridge_id: str, captured_at: float):
+        """Return a snapshot, or None if it was never taken or has been evicted."""
+        snapshot = self._snapshots.get((confbridge_id, captured_at))
+        if snapshot is not None:
+            self._snapshots.move_to_end((confbridge_id, captured_at))
+        return snapshot
+
+    def keys(self):
+        """Return the confbridge and ring time of every cached snapshot."""
+        return list(self._snapshots)
+
+
+class DoorCamera:
+    """Take snapshots from one entry's door station when a call rings.
+
+    Requests go through Home Assistant's shared httpx client, so
+    connections to the door station are pooled between rings. The digest
+    credentials are kept in one ``httpx.DigestAuth``, which remembers the
+    last challenge; after the first snapshot requests are signed up front
+    instead of costing a 401 round trip each.
+    """
+
+    def __init__(self, hass: HomeAssistant, settings: AsteriskSettings):
+        """Initialize the camera."""
+        self.hass = hass
+        self._url = settings.snapshot_url
+        self._auth = (
+            httpx.DigestAuth(settings.door_station_username, settings.door_station_password)
+            if settings.door_station_username else None
+        )
+        self.cache = SnapshotCache()
+        self.latest = None
+        self._listeners = set()
+        self._pending = {}
+
+    def async_add_listener(self, update_callback):
+        """Call update_callback whenever a new snapshot is stored."""
+        self._listeners.add(update_callback)
+
+    def async_remove_listener(self, update_callback):
+        """Remove a listener."""
+        self._listeners.discard(update_callback)
+
+    @callback
+    def async_capture(self, confbridge_id: str, rang_at: float):
+        """Start fetching a snapshot for a ring without waiting for it."""
+        if confbridge_id in self._pending:
+            return
+        self._pending[confbridge_id] = self.hass.async_create_background_task(
+            self._async_fetch(confbridge_id, rang_at),
+            f"{DOMAIN} snapshot {confbridge_id}",
+        )
+
+    async def _async_fetch(self, confbridge_id: str, rang_at: float):
+        """Fetch one snapshot and store it."""
+        metrics = async_get_metrics(self.hass)
+        started = time.monotonic()
+        try:
+            # Door stations use self-signed certificates
+            response = await get_async_client(self.hass, verify_ssl=False).get(
+                self._url, auth=self._auth, timeout=SNAPSHOT_TIMEOUT
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as err:
+            metrics.snapshots_failed += 1
+            _LOGGER.warning("Snapshot for %s failed: %r", confbridge_id, err)
+            return
+        finally:
+            self._pending.pop(confbridge_id, None)
+
+        content = response.content
+        if len(content) > MAX_SNAPSHOT_SIZE:
+            metrics.snapshots_failed += 1
+            _LOGGER.warning("Snapshot for %s is too large: %d bytes", confbridge_id, len(content))
+            return
+
+        metrics.snapshots_total += 1
+        metrics.snapshot_fetch_ms.observe((time.monotonic() - started) * 1000)
+
+        content_type = response.headers.get("content-type", "image/jpeg").partition(";")[0].strip()
+        snapshot = Snapshot(confbridge_id, rang_at, content_type, content)
+        self.cache.add(snapshot)
+        self.latest = snapshot
+        for update_callback in self._listeners:
+            update_callback()
+
+    @callback
+    def async_cancel(self):
+        """Cancel snapshots still being fetched."""
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+
+
+@callback
+def async_capture_snapshots(hass: HomeAssistant, entry_ids, confbridge_id: str, rang_at: float):
+    """Take a snapshot with the door cameras of the entries owning a confbridge."""
+    cameras = hass.data.get(DATA_SNAPSHOTS, {})
+    for entry_id in entry_ids:
+        camera = cameras.get(entry_id)
+        if camera is not None:
+            camera.async_capture(confbridge_id, rang_at)
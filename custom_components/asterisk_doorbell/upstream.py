@@ -0,0 +1,142 @@
+"""Upstream selection for the SIP WebSocket proxy."""
+import asyncio
+import logging
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+
+from .settings import async_all_settings
+
+_LOGGER = logging.getLogger(__name__)
+
+# Per-attempt connect timeout; short so failing over to the next upstream
+# happens well inside the client's own connection timeout.
+UPSTREAM_ATTEMPT_TIMEOUT = 5
+PROBE_TIMEOUT = 5
+
+
+class Upstream:
+    """Health and load of one Asterisk WebSocket endpoint."""
+
+    __slots__ = ("url", "healthy", "active")
+
+    def __init__(self, url: str):
+        """Initialize the upstream."""
+        self.url = url
+        self.healthy = True
+        self.active = 0
+
+
+class UpstreamPool:
+    """Choose upstreams by health, then least active connections."""
+
+    def __init__(self, hass: HomeAssistant, session_factory):
+        """Initialize the pool.
+
+        ``session_factory`` creates the shared session the first time an
+        upstream is actually connected to, not when the proxy is set up.
+        """
+        self.hass = hass
+        self._session_factory = session_factory
+        self._session = None
+        self._upstreams = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the shared upstream session, creating it on first use."""
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    async def async_close(self):
+        """Close the shared session if it was ever created."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get(self, url: str) -> Upstream:
+        upstream = self._upstreams.get(url)
+        if upstream is None:
+            upstream = self._upstreams[url] = Upstream(url)
+        return upstream
+
+    def candidates(self, urls):
+        """Return upstreams in the order they should be tried.
+
+        Healthy upstreams come first, least loaded first; ties keep the
+        configured order. Unhealthy ones are still tried as a last resort.
+        """
+        upstreams = [self._get(url) for url in urls]
+        return sorted(upstreams, key=lambda upstream: (not upstream.healthy, upstream.active))
+
+    async def async_connect(self, urls):
+        """Connect to the best upstream, failing over to the next one on error.
+
+        Returns ``(websocket, upstream)``; call ``release(upstream)`` once the
+        websocket is closed.
+        """
+        last_error = None
+        for upstream in self.candidates(urls):
+            try:
+                async with asyncio.timeout(UPSTREAM_ATTEMPT_TIMEOUT):
+                    ws = await self.session.ws_connect(upstream.url, protocols=["sip"])
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as err:
+                if upstream.healthy:
+                    _LOGGER.warning("Upstream %s failed, trying the next one: %s", upstream.url, err)
+                upstream.healthy = False
+                last_error = err
+                continue
+
+            upstream.healthy = True
+            upstream.active += 1
+            return ws, upstream
+
+        raise last_error or aiohttp.ClientError("No upstream configured")
+
+    def release(self, upstream: Upstream):
+        """Record that a connection to the upstream was closed."""
+        upstream.active -= 1
+
+    async def async_probe(self, _now=None):
+        """Check every configured upstream with a WebSocket handshake.
+
+        Only runs when at least one entry has more than one upstream; with a
+        single upstream there is nothing to choose between.
+        """
+        urls = set()
+        multiple = False
+        for settings in async_all_settings(self.hass):
+            urls.update(settings.upstream_urls)
+            multiple = multiple or len(settings.upstream_urls) > 1
+
+        # Forget upstreams that are no longer configured and not in use
+        for url in list(self._upstreams):
+            if url not in urls and not self._upstreams[url].active:
+                del self._upstreams[url]
+
+        if multiple:
+            await asyncio.gather(*(self._async_probe_one(self._get(url)) for url in urls))
+
+    async def _async_probe_one(self, upstream: Upstream):
+        """Open and immediately close a WebSocket to the upstream."""
+        try:
+            async with asyncio.timeout(PROBE_TIMEOUT):
+                ws = await self.session.ws_connect(upstream.url, protocols=["sip"])
+                await ws.close()
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as err:
+            if upstream.healthy:
+                _LOGGER.warning("Upstream %s is unhealthy: %s", upstream.url, err)
+            upstream.healthy = False
+            return
+
+        if not upstream.healthy:
+            _LOGGER.info("Upstream %s is healthy again", upstream.url)
+        upstream.healthy = True
+
+    def as_dict(self):
+        """Return the state of every known upstream."""
+        return {
+            url: {"healthy": upstream.healthy, "active": upstream.active}
+            for url, upstream in self._upstreams.items()
+        }
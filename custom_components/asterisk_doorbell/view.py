@@ -1,23 +1,193 @@
+import gzip
+import hashlib
+import json
 import logging
+import os
+import re
+
+from aiohttp import web
 
 from homeassistant.components.frontend import add_extra_js_url, async_register_built_in_panel
-from homeassistant.components.http import StaticPathConfig
+from homeassistant.components.http import HomeAssistantView, StaticPathConfig
 
 from .const import (
     COMPONENT_NAME,
     COMPONENT_PATH,
+    DOMAIN,
     FRONTEND_SCRIPT_URL,
     SETTINGS_PANEL_URL,
     SETTINGS_SCRIPT_URL,
     VERSION,
 )
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 _LOGGER = logging.getLogger(__name__)
 
+BUNDLE_URL = f"/{DOMAIN}/static"
+COMPRESSED_MANIFEST = "compressed.json"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Chunk names Parcel already gives a content hash, e.g. editor.1a2b3c4d.js
+_HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.js$")
+
+
+class FrontendFile:
+    """A built script held in memory with its pre-compressed variants."""
+
+    __slots__ = ("etag", "cache_control", "variants")
+
+    def __init__(self, etag: str, cache_control: str, variants):
+        """Initialize the file."""
+        self.etag = etag
+        self.cache_control = cache_control
+        self.variants = variants
+
+
+def _gzip(data: bytes) -> bytes:
+    """Compress a script the way the card build does."""
+    return gzip.compress(data, 9, mtime=0)
+
+
+# Encodings a script can be compressed to on demand
+COMPRESSORS = {"gzip": _gzip}
+if brotli is not None:
+    COMPRESSORS["br"] = brotli.compress
+
+
+def _load_variants(path: str, data: bytes, prebuilt: bool):
+    """Return the encodings a script can be served in right away.
+
+    The .gz and .br siblings written by the card build are used when
+    ``prebuilt`` says they were made from this build of the script. Any
+    other encoding is compressed the first time a client asks for it.
+    """
+    variants = {"identity": data}
+
+    if prebuilt:
+        for encoding, suffix in (("gzip", ".gz"), ("br", ".br")):
+            try:
+                with open(path + suffix, "rb") as file:
+                    variants[encoding] = file.read()
+            except OSError:
+                pass
+
+    return variants
+
+
+def _load_frontend_files(dist_path: str):
+    """Read every built script.
+
+    Returns the files by URL name and the hashed name of each script.
+    """
+    files = {}
+    entries = {}
+    if not os.path.isdir(dist_path):
+        return files, entries
+
+    try:
+        with open(os.path.join(dist_path, COMPRESSED_MANIFEST), encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = {}
+
+    for name in sorted(os.listdir(dist_path)):
+        if not name.endswith(".js"):
+            continue
+        path = os.path.join(dist_path, name)
+        with open(path, "rb") as file:
+            data = file.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        digest = sha256[:16]
+        variants = _load_variants(path, data, manifest.get(name) == sha256)
+
+        # Entry scripts are referenced by a content-hashed name so they can
+        # be cached forever; the plain name stays available for chunks
+        # that refer to it relatively.
+        hashed_name = f"{name[:-3]}.{digest}.js"
+        entries[name] = hashed_name
+        files[hashed_name] = FrontendFile(digest, IMMUTABLE_CACHE, variants)
+        files[name] = FrontendFile(
+            digest, IMMUTABLE_CACHE if _HASHED_NAME.search(name) else REVALIDATE_CACHE, variants
+        )
+
+    return files, entries
+
+
+def _accepted_encodings(header: str):
+    """Return the content codings an Accept-Encoding header allows."""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        params = params.strip().replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class AsteriskFrontendView(HomeAssistantView):
+    """Serve the card and panel scripts pre-compressed with long-lived caching."""
+
+    url = BUNDLE_URL + "/{filename}"
+    name = "asterisk_doorbell:static"
+    requires_auth = False
+
+    def __init__(self, hass, files):
+        """Initialize the view with the files loaded at startup."""
+        self.hass = hass
+        self._files = files
+
+    async def get(self, request, filename):
+        """Return a script in the best encoding the client accepts."""
+        file = self._files.get(filename)
+        if file is None:
+            return web.Response(status=404)
+
+        headers = {
+            "Cache-Control": file.cache_control,
+            "ETag": f'"{file.etag}"',
+            "Vary": "Accept-Encoding",
+        }
+        if request.headers.get("If-None-Match") == headers["ETag"]:
+            return web.Response(status=304, headers=headers)
+
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        for encoding in ("br", "gzip"):
+            if encoding not in accepted:
+                continue
+            body = file.variants.get(encoding)
+            if body is None and encoding in COMPRESSORS:
+                # Kept for every later request; the hashed and plain names
+                # share one set of variants
+                body = file.variants[encoding] = await self.hass.async_add_executor_job(
+                    COMPRESSORS[encoding], file.variants["identity"]
+                )
+            if body is not None:
+                headers["Content-Encoding"] = encoding
+                break
+        else:
+            body = file.variants["identity"]
+
+        return web.Response(body=body, content_type="application/javascript", headers=headers)
+
+
 async def async_setup_view(hass):
-    _LOGGER.debug(hass.config.path(f"{COMPONENT_PATH}/dist/{FRONTEND_SCRIPT_URL}"))
+    dist_path = hass.config.path(f"{COMPONENT_PATH}/dist")
+    _LOGGER.debug(dist_path)
+
+    # Load the built scripts once, off the event loop, and serve them from memory
+    files, entries = await hass.async_add_executor_job(_load_frontend_files, dist_path)
+    hass.http.register_view(AsteriskFrontendView(hass, files))
 
-    # Load the Lovelace card and panel scripts
+    # Plain paths stay registered for dashboards that list them as resources
     await hass.http.async_register_static_paths(
         [
             StaticPathConfig(
@@ -33,7 +203,16 @@ async def async_setup_view(hass):
         ]
     )
 
-    add_extra_js_url(hass, f"/{FRONTEND_SCRIPT_URL}?v={VERSION}")
+    if FRONTEND_SCRIPT_URL in entries:
+        add_extra_js_url(hass, f"{BUNDLE_URL}/{entries[FRONTEND_SCRIPT_URL]}")
+    else:
+        add_extra_js_url(hass, f"/{FRONTEND_SCRIPT_URL}?v={VERSION}")
+
+    # The panel script is only fetched when the panel is opened
+    if SETTINGS_SCRIPT_URL in entries:
+        settings_script_url = f"{BUNDLE_URL}/{entries[SETTINGS_SCRIPT_URL]}"
+    else:
+        settings_script_url = f"/{SETTINGS_SCRIPT_URL}?v={VERSION}"
 
     # Check if panel is already registered to prevent "Overwriting panel" error
     if SETTINGS_PANEL_URL not in hass.data.get("frontend_panels", {}):
@@ -48,7 +227,7 @@ async def async_setup_view(hass):
                 config={
                     "_panel_custom": {
                         "name": "asterisk-doorbell-panel",
-                        "js_url": f"/{SETTINGS_SCRIPT_URL}?v={VERSION}"
+                        "js_url": settings_script_url
                     }
                 }
             )
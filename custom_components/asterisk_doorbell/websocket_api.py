@@ -5,21 +5,54 @@ from typing import Dict, Any
 
 from homeassistant.components import websocket_api
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+import homeassistant.helpers.entity_registry as er
 from homeassistant.components.websocket_api import async_register_command
 
-from .const import DOMAIN
+from .access import TICKET_LIFETIME, async_get_ticket_signer
+from .const import DOMAIN, SIGNAL_COORDINATOR
+from .history import DATA_HISTORY
+from .metrics import async_get_metrics
+from .services import async_get_transitions
+from .settings import async_get_settings, async_is_ambiguous, async_settings_error
+from .websocket_proxy import AsteriskWebSocketProxyView
 
 _LOGGER = logging.getLogger(__name__)
 
+DATA_BOOTSTRAP = f"{DOMAIN}_bootstrap"
+
+# Entities the card looks for, by the suffix of their unique ID
+BOOTSTRAP_ENTITIES = {
+    "call_status_entity": ("sensor", "call_status"),
+    "confbridge_id_entity": ("sensor", "confbridge_id"),
+    "extension_entity": ("sensor", "extension"),
+    "snapshot_entity": ("image", "snapshot"),
+}
+
 @callback
 def async_register_websocket_commands(hass: HomeAssistant) -> None:
     """Register websocket commands."""
     async_register_command(hass, websocket_get_settings)
     async_register_command(hass, websocket_get_current_state)
+    async_register_command(hass, websocket_subscribe_state)
+    async_register_command(hass, websocket_get_metrics)
+    async_register_command(hass, websocket_get_transitions)
+    async_register_command(hass, websocket_history)
+    async_register_command(hass, websocket_get_proxy_ticket)
+    async_register_command(hass, websocket_bootstrap)
+
+    @callback
+    def _async_entity_registry_updated(event):
+        """Resolve the entity IDs again after any of them may have been renamed."""
+        hass.data.get(DATA_BOOTSTRAP, {}).clear()
+
+    hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, _async_entity_registry_updated)
 
 
 @websocket_api.websocket_command({
-    vol.Required("type"): "asterisk_doorbell/get_settings"
+    vol.Required("type"): "asterisk_doorbell/get_settings",
+    vol.Optional("entry_id"): str,
 })
 @callback
 def websocket_get_settings(
@@ -30,33 +63,26 @@ def websocket_get_settings(
     """Handle get settings command."""
     _LOGGER.debug("WebSocket: Get settings")
 
-    # Initialize settings dict with correct defaults
-    settings = {
-        "asterisk_host": "",
-        "websocket_port": 8089,
-    }
-
-    # Find available entry configurations
-    entries = hass.config_entries.async_entries(DOMAIN)
-
-    if entries:
-        # Get first entry as default
-        entry = entries[0]
-        entry_data = entry.data
-
-        # Update settings from entry data
-        settings.update({
-            "asterisk_host": entry_data.get("asterisk_host", ""),
-            "websocket_port": entry_data.get("asterisk_websocket_port", 8089),
-        })
+    cached = async_get_settings(hass, msg.get("entry_id"))
+    if cached is None and async_is_ambiguous(hass, msg.get("entry_id")):
+        connection.send_error(msg["id"], websocket_api.ERR_INVALID_FORMAT, async_settings_error(hass))
+        return
+    if cached is not None:
+        settings = cached.frontend
+    else:
+        settings = {
+            "asterisk_host": "",
+            "websocket_port": 8089,
+        }
 
-        _LOGGER.debug(f"WebSocket API returning settings: {settings}")
+    _LOGGER.debug("WebSocket API returning settings: %s", settings)
 
     connection.send_result(msg["id"], settings)
 
 
 @websocket_api.websocket_command({
-    vol.Required("type"): "asterisk_doorbell/get_current_state"
+    vol.Required("type"): "asterisk_doorbell/get_current_state",
+    vol.Optional("entry_id"): str,
 })
 @callback
 def websocket_get_current_state(
@@ -71,15 +97,218 @@ def websocket_get_current_state(
         "call_status": "inactive",
         "confbridge_id": "",
         "extension": "",
+        "bridges": {},
     }
 
-    # Get state from the first coordinator (there should only be one per entry)
-    for entry_id, coordinator in hass.data.get(DOMAIN, {}).items():
+    settings = async_get_settings(hass, msg.get("entry_id"))
+    if settings is None and async_is_ambiguous(hass, msg.get("entry_id")):
+        connection.send_error(msg["id"], websocket_api.ERR_INVALID_FORMAT, async_settings_error(hass))
+        return
+
+    coordinator = hass.data.get(DOMAIN, {}).get(settings.entry_id) if settings else None
+    if coordinator is not None:
         current_state = {
             "call_status": getattr(coordinator, 'call_status', 'inactive'),
             "confbridge_id": getattr(coordinator, 'confbridge_id', ''),
             "extension": getattr(coordinator, 'extension', ''),
+            "bridges": dict(coordinator.bridges),
         }
-        break  # Only need the first one since there's one global state
 
-    connection.send_result(msg["id"], current_state)
\ No newline at end of file
+    connection.send_result(msg["id"], current_state)
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "asterisk_doorbell/subscribe_state",
+    vol.Optional("entry_id"): str,
+})
+@callback
+def websocket_subscribe_state(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any]
+) -> None:
+    """Push the doorbell state now and whenever a transition changes it.
+
+    The subscription belongs to the entry rather than to its coordinator:
+    when the entry is reloaded, for example after its options change, it
+    moves to the new coordinator and the current state is pushed again.
+    """
+    settings, coordinator = _async_resolve_entry(hass, connection, msg)
+    if coordinator is None:
+        return
+    entry_id = settings.entry_id
+
+    attached = [coordinator]
+
+    @callback
+    def forward_state():
+        """Send the coordinator state to the subscriber."""
+        connection.send_message(websocket_api.event_message(msg["id"], attached[0].as_dict()))
+
+    @callback
+    def coordinator_replaced(new_coordinator):
+        """Follow the entry to its new coordinator, or wait while it is unloaded."""
+        if attached[0] is not None:
+            attached[0].async_remove_listener(forward_state)
+        attached[0] = new_coordinator
+        if new_coordinator is not None:
+            new_coordinator.async_add_listener(forward_state)
+            forward_state()
+
+    unsubscribe_dispatcher = async_dispatcher_connect(
+        hass, SIGNAL_COORDINATOR.format(entry_id), coordinator_replaced
+    )
+
+    @callback
+    def unsubscribe():
+        """Stop forwarding state updates."""
+        unsubscribe_dispatcher()
+        if attached[0] is not None:
+            attached[0].async_remove_listener(forward_state)
+
+    coordinator.async_add_listener(forward_state)
+    connection.subscriptions[msg["id"]] = unsubscribe
+
+    connection.send_result(msg["id"])
+    forward_state()
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "asterisk_doorbell/get_metrics"
+})
+@callback
+def websocket_get_metrics(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any]
+) -> None:
+    """Return proxy and event pipeline metrics."""
+    connection.send_result(msg["id"], async_get_metrics(hass).as_dict())
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "asterisk_doorbell/get_transitions"
+})
+@callback
+def websocket_get_transitions(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any]
+) -> None:
+    """Return the most recent call state transitions, oldest first."""
+    connection.send_result(msg["id"], async_get_transitions(hass))
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "asterisk_doorbell/history",
+    vol.Optional("start_time"): cv.datetime,
+    vol.Optional("end_time"): cv.datetime,
+    vol.Optional("confbridge"): str,
+    vol.Optional("limit"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+})
+@callback
+def websocket_history(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any]
+) -> None:
+    """Return recorded calls, newest first."""
+    history = hass.data.get(DATA_HISTORY)
+    if history is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Call history is not loaded")
+        return
+
+    start_time = msg.get("start_time")
+    end_time = msg.get("end_time")
+    connection.send_result(msg["id"], history.async_query(
+        start_time=start_time.timestamp() if start_time else None,
+        end_time=end_time.timestamp() if end_time else None,
+        confbridge_id=msg.get("confbridge"),
+        limit=msg.get("limit"),
+    ))
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "asterisk_doorbell/get_proxy_ticket"
+})
+@callback
+def websocket_get_proxy_ticket(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any]
+) -> None:
+    """Issue a short-lived ticket for opening the SIP WebSocket proxy."""
+    connection.send_result(msg["id"], {
+        "ticket": async_get_ticket_signer(hass).issue(connection.user.id),
+        "expires_in": TICKET_LIFETIME,
+    })
+
+
+@callback
+def _async_resolve_entry(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]):
+    """Return the settings and coordinator of the entry a command is for.
+
+    Sends an error and returns (None, None) when the entry isn't loaded, or
+    when no entry_id was given while several entries are loaded.
+    """
+    entry_id = msg.get("entry_id")
+    settings = async_get_settings(hass, entry_id)
+    coordinator = hass.data.get(DOMAIN, {}).get(settings.entry_id) if settings else None
+    if coordinator is None:
+        code = websocket_api.ERR_INVALID_FORMAT if async_is_ambiguous(hass, entry_id) else websocket_api.ERR_NOT_FOUND
+        connection.send_error(msg["id"], code, async_settings_error(hass, entry_id))
+        return None, None
+    return settings, coordinator
+
+
+@callback
+def _async_bootstrap_payload(hass: HomeAssistant, settings) -> Dict[str, Any]:
+    """Return the part of the bootstrap response that only changes with the entry.
+
+    Built once per loaded entry and kept until the entry is reloaded or the
+    entity registry changes, so a tablet loading the card costs a few
+    registry lookups at most rather than a scan of every entity.
+    """
+    cache = hass.data.setdefault(DATA_BOOTSTRAP, {})
+    cached = cache.get(settings.entry_id)
+    # A reloaded entry has new settings, which makes the old payload stale
+    if cached is not None and cached[0] is settings:
+        return cached[1]
+
+    registry = er.async_get(hass)
+    payload = {
+        "entry_id": settings.entry_id,
+        "settings": settings.frontend,
+        "entities": {
+            key: registry.async_get_entity_id(domain, DOMAIN, f"{settings.entry_id}_{suffix}")
+            for key, (domain, suffix) in BOOTSTRAP_ENTITIES.items()
+        },
+        "proxy_path": AsteriskWebSocketProxyView.url,
+    }
+    cache[settings.entry_id] = (settings, payload)
+    return payload
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): "asterisk_doorbell/bootstrap",
+    vol.Optional("entry_id"): str,
+})
+@callback
+def websocket_bootstrap(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any]
+) -> None:
+    """Return everything the card needs to start in one response.
+
+    Combines get_settings and get_current_state with the entity IDs of the
+    entry's sensors and the proxy path.
+    """
+    settings, coordinator = _async_resolve_entry(hass, connection, msg)
+    if coordinator is None:
+        return
+
+    connection.send_result(msg["id"], {
+        **_async_bootstrap_payload(hass, settings),
+        "state": coordinator.as_dict(),
+    })
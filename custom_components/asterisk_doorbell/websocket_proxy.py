@@ -1,155 +1,492 @@
 """WebSocket proxy for Asterisk Doorbell integration."""
 import logging
 import asyncio
+import time
 import aiohttp
-from aiohttp import web, WSMsgType
-from typing import Optional
+from aiohttp import web, WSCloseCode, WSMessage, WSMsgType
 
+from datetime import timedelta
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import HomeAssistant
 from homeassistant.components.http import HomeAssistantView
+from homeassistant.helpers.event import async_track_time_interval
 
+from .access import ClientLimiter, ProxyTicketSigner, async_get_ticket_signer
 from .const import DOMAIN
+from .metrics import AsteriskMetrics, DirectionCounters, async_get_metrics
+from .settings import async_get_settings, async_is_ambiguous, async_settings_error
+from .sip import DialogTracker, RegistrationOffload
+from .upstream import UpstreamPool
 
 _LOGGER = logging.getLogger(__name__)
 
+# Upstream connection tuning. Each proxied socket holds its own upstream
+# connection, so the connector is unbounded; what is shared between tablets
+# is the session, the resolver cache and any idle keep-alive connections.
+UPSTREAM_DNS_CACHE_TTL = 300
+UPSTREAM_KEEPALIVE_TIMEOUT = 60
+UPSTREAM_CONNECT_TIMEOUT = 10
+
+# How often upstream health is probed when more than one is configured
+UPSTREAM_PROBE_INTERVAL = timedelta(seconds=30)
+
+# Frames buffered per direction before the proxy stops reading from the
+# sending side.
+DEFAULT_MAX_INFLIGHT = 64
+
+# Proxied sessions allowed per config entry unless configured otherwise
+DEFAULT_MAX_SESSIONS = 64
+
+# How long unloading or stopping waits for sessions to close before their
+# handlers are cancelled
+DRAIN_TIMEOUT = 5
+
+DATA_PROXY_SESSIONS = f"{DOMAIN}_proxy_sessions"
+
+_CLOSE_TYPES = (WSMsgType.CLOSE, WSMsgType.CLOSING, WSMsgType.CLOSED)
+
+
+class ProxySession:
+	"""One proxied client socket and the handler task serving it."""
+
+	__slots__ = ("entry_id", "task", "ws_client", "ws_upstream")
+
+	def __init__(self, entry_id: str, task: asyncio.Task):
+		"""Initialize the session."""
+		self.entry_id = entry_id
+		self.task = task
+		self.ws_client = None
+		self.ws_upstream = None
+
+	async def async_close(self, message: str):
+		"""Close both sockets, telling the client the server is going away."""
+		for ws in (self.ws_client, self.ws_upstream):
+			if ws is not None and not ws.closed:
+				await ws.close(code=WSCloseCode.GOING_AWAY, message=message)
+
+
+class ProxySessionRegistry:
+	"""Every live proxied session, grouped by config entry.
+
+	Caps the number of sessions per entry and closes them deterministically
+	when an entry unloads or Home Assistant stops: sockets are closed with
+	1001 Going Away, and handlers that haven't finished by the deadline
+	are cancelled and awaited.
+	"""
+
+	def __init__(self):
+		"""Initialize the registry."""
+		self._sessions = {}
+		self.closed = False
+
+	def count(self, entry_id: str = None) -> int:
+		"""Return the number of live sessions, for one entry or in total."""
+		if entry_id is not None:
+			return len(self._sessions.get(entry_id, ()))
+		return sum(len(sessions) for sessions in self._sessions.values())
+
+	def try_add(self, entry_id: str, max_sessions: int):
+		"""Register the current handler as a session, or return None if full."""
+		sessions = self._sessions.setdefault(entry_id, set())
+		if self.closed or len(sessions) >= max_sessions:
+			return None
+		session = ProxySession(entry_id, asyncio.current_task())
+		sessions.add(session)
+		return session
+
+	def discard(self, session: ProxySession):
+		"""Forget a finished session."""
+		sessions = self._sessions.get(session.entry_id)
+		if sessions is not None:
+			sessions.discard(session)
+			if not sessions:
+				del self._sessions[session.entry_id]
+
+	async def async_drain(self, entry_id: str = None, timeout: float = DRAIN_TIMEOUT):
+		"""Close the sessions of one entry, or all of them, within timeout seconds."""
+		if entry_id is None:
+			sessions = [session for group in self._sessions.values() for session in group]
+		else:
+			sessions = list(self._sessions.get(entry_id, ()))
+		if not sessions:
+			return
+
+		_LOGGER.debug("Draining %d proxied session(s)", len(sessions))
+		tasks = [session.task for session in sessions if session.task is not None]
+		try:
+			async with asyncio.timeout(timeout):
+				await asyncio.gather(
+					*(session.async_close("Home Assistant is going away") for session in sessions),
+					return_exceptions=True,
+				)
+				await asyncio.wait(tasks)
+		except asyncio.TimeoutError:
+			pass
+
+		pending = [task for task in tasks if not task.done()]
+		if pending:
+			_LOGGER.warning("Cancelling %d proxied session(s) that did not close in time", len(pending))
+			for task in pending:
+				task.cancel()
+			await asyncio.gather(*pending, return_exceptions=True)
+
+		for session in sessions:
+			self.discard(session)
+
 
 class AsteriskWebSocketProxyView(HomeAssistantView):
 	"""WebSocket proxy to forward connections to Asterisk server."""
 
 	url = "/api/asterisk_doorbell/ws"
 	name = "api:asterisk_doorbell:websocket_proxy"
-	requires_auth = False  # We'll validate through other means if needed
+	# Browsers can't send headers on a WebSocket upgrade, so clients
+	# authenticate with a ticket from asterisk_doorbell/get_proxy_ticket
+	# passed as ?ticket=. Cards built before tickets existed send none and
+	# are refused unless the entry has allow_ticketless_proxy switched on.
+	requires_auth = False
 
-	def __init__(self, hass: HomeAssistant):
+	def __init__(
+		self,
+		hass: HomeAssistant,
+		pool: UpstreamPool,
+		metrics: AsteriskMetrics,
+		signer: ProxyTicketSigner,
+		limiter: ClientLimiter,
+		registry: ProxySessionRegistry,
+		max_inflight: int = DEFAULT_MAX_INFLIGHT,
+	):
 		"""Initialize the proxy view."""
 		self.hass = hass
+		self._pool = pool
+		self._metrics = metrics
+		self._signer = signer
+		self._limiter = limiter
+		self._registry = registry
+		self._max_inflight = max_inflight
 
 	async def get(self, request):
 		"""Handle WebSocket upgrade and proxy to Asterisk."""
-		# Get Asterisk configuration from integration settings
-		asterisk_config = await self._get_asterisk_config()
-		if not asterisk_config:
-			return web.Response(text="Asterisk configuration not found", status=503)
+		# Cheapest checks first: the rate limit is a dict lookup, the
+		# ticket one HMAC; neither touches the auth provider
+		remote = request.remote
+		if not self._limiter.try_acquire(remote):
+			self._metrics.proxy_rejected += 1
+			return web.Response(text="Too many connections", status=429)
 
-		asterisk_host = asterisk_config.get("asterisk_host")
-		asterisk_port = asterisk_config.get("asterisk_websocket_port", 8089)
+		try:
+			return await self._async_handle(request)
+		finally:
+			self._limiter.release(remote)
 
-		if not asterisk_host:
-			return web.Response(text="Asterisk host not configured", status=503)
+	async def _async_handle(self, request):
+		"""Authenticate the client, then proxy it to Asterisk."""
+		ticket = request.query.get("ticket")
+		if ticket is not None and self._signer.verify(ticket) is None:
+			self._metrics.proxy_rejected += 1
+			return web.Response(text="Invalid or expired proxy ticket", status=401)
 
-		# Upgrade to WebSocket
-		ws_client = web.WebSocketResponse(protocols=['sip'])
-		await ws_client.prepare(request)
+		# Resolved settings are cached per entry; ?entry_id= picks one and
+		# is required once there are several
+		entry_id = request.query.get("entry_id")
+		settings = async_get_settings(self.hass, entry_id)
+
+		# Without a ticket only an entry that opted in lets the client through
+		if ticket is None:
+			if settings is None or not settings.allow_ticketless_proxy:
+				self._metrics.proxy_rejected += 1
+				return web.Response(text="Missing proxy ticket", status=401)
+			_LOGGER.warning(
+				"WebSocket proxy: Accepted a connection from %s without a ticket; "
+				"update the card and turn off allow_ticketless_proxy",
+				request.remote,
+			)
 
-		_LOGGER.debug(f"WebSocket proxy: Client connected, forwarding to ws://{asterisk_host}:{asterisk_port}/ws")
+		if settings is None:
+			status = 400 if async_is_ambiguous(self.hass, entry_id) else 503
+			return web.Response(text=async_settings_error(self.hass, entry_id), status=status)
+
+		if not settings.upstream_urls:
+			return web.Response(text="Asterisk host not configured", status=503)
 
-		# Connect to Asterisk WebSocket (insecure)
-		asterisk_url = f"ws://{asterisk_host}:{asterisk_port}/ws"
+		session = self._registry.try_add(settings.entry_id, settings.max_proxy_sessions)
+		if session is None:
+			self._metrics.proxy_rejected += 1
+			return web.Response(text="Too many proxied sessions", status=503)
 
 		try:
-			session = aiohttp.ClientSession()
-			ws_asterisk = await session.ws_connect(
-				asterisk_url,
-				protocols=['sip'],
-				timeout=aiohttp.ClientTimeout(total=10)
-			)
+			return await self._async_proxy(request, settings, session)
+		finally:
+			self._registry.discard(session)
 
-			_LOGGER.debug(f"WebSocket proxy: Connected to Asterisk at {asterisk_url}")
+	async def _async_proxy(self, request, settings, session: ProxySession):
+		"""Upgrade the client socket and relay it to an upstream."""
+		# Upgrade to WebSocket
+		ws_client = session.ws_client = web.WebSocketResponse(protocols=['sip'])
+		await ws_client.prepare(request)
 
-			# Start bidirectional forwarding
-			await self._proxy_websocket_messages(ws_client, ws_asterisk, session)
+		_LOGGER.debug("WebSocket proxy: Client connected")
+		metrics = self._metrics
+		metrics.proxy_connections_total += 1
 
+		# Connect to an Asterisk WebSocket (insecure), failing over between
+		# upstreams before giving up on the client
+		connect_started = time.monotonic()
+		try:
+			ws_asterisk, upstream = await self._pool.async_connect(settings.upstream_urls)
 		except Exception as e:
+			metrics.proxy_upstream_failures += 1
 			_LOGGER.error(f"WebSocket proxy: Failed to connect to Asterisk: {e}")
 			await ws_client.close(code=1011, message=f"Upstream connection failed: {e}")
+			return ws_client
+		metrics.upstream_connect_ms.observe((time.monotonic() - connect_started) * 1000)
+		session.ws_upstream = ws_asterisk
 
-		return ws_client
+		_LOGGER.debug("WebSocket proxy: Connected to Asterisk at %s", upstream.url)
+
+		# Optionally answer registration refreshes without bothering Asterisk
+		offload = RegistrationOffload() if settings.keepalive_offload else None
+
+		# Optionally time the calls and registrations of this client
+		tracker = None
+		if settings.dialog_tracking:
+			stats = metrics.sip_client(request.remote)
+			stats.connections += 1
+			tracker = DialogTracker(stats)
 
-	async def _get_asterisk_config(self) -> Optional[dict]:
-		"""Get Asterisk configuration from integration."""
+		metrics.proxy_connections_active += 1
 		try:
-			# Find the first asterisk_doorbell config entry
-			entries = self.hass.config_entries.async_entries(DOMAIN)
-			if entries:
-				entry = entries[0]
-				return entry.data
-			return None
-		except Exception as e:
-			_LOGGER.error(f"Failed to get Asterisk config: {e}")
-			return None
+			# Start bidirectional forwarding
+			await self._proxy_websocket_messages(ws_client, ws_asterisk, offload, tracker)
+		finally:
+			metrics.proxy_connections_active -= 1
+			self._pool.release(upstream)
+			if tracker is not None:
+				tracker.close()
 
-	async def _proxy_websocket_messages(self, ws_client, ws_asterisk, session):
-		"""Bidirectionally proxy messages between client and Asterisk."""
+		return ws_client
 
-		async def forward_client_to_asterisk():
-			"""Forward messages from client to Asterisk."""
-			try:
-				async for msg in ws_client:
-					if msg.type == WSMsgType.TEXT:
-						_LOGGER.debug(f"Proxy C→A: {msg.data[:100]}...")
-						await ws_asterisk.send_str(msg.data)
-					elif msg.type == WSMsgType.BINARY:
-						_LOGGER.debug("Proxy C→A: Binary message")
-						await ws_asterisk.send_bytes(msg.data)
-					elif msg.type == WSMsgType.ERROR:
-						_LOGGER.error(f"WebSocket client error: {ws_client.exception()}")
-						break
-					elif msg.type == WSMsgType.CLOSE:
-						_LOGGER.debug("Client WebSocket closed")
-						break
-			except Exception as e:
-				_LOGGER.error(f"Error forwarding client→asterisk: {e}")
-			finally:
-				if not ws_asterisk.closed:
-					await ws_asterisk.close()
-
-		async def forward_asterisk_to_client():
-			"""Forward messages from Asterisk to client."""
-			try:
-				async for msg in ws_asterisk:
-					if msg.type == WSMsgType.TEXT:
-						_LOGGER.debug(f"Proxy A→C: {msg.data[:100]}...")
-						await ws_client.send_str(msg.data)
-					elif msg.type == WSMsgType.BINARY:
-						_LOGGER.debug("Proxy A→C: Binary message")
-						await ws_client.send_bytes(msg.data)
-					elif msg.type == WSMsgType.ERROR:
-						_LOGGER.error(f"WebSocket Asterisk error: {ws_asterisk.exception()}")
-						break
-					elif msg.type == WSMsgType.CLOSE:
-						_LOGGER.debug("Asterisk WebSocket closed")
-						break
-			except Exception as e:
-				_LOGGER.error(f"Error forwarding asterisk→client: {e}")
-			finally:
-				if not ws_client.closed:
-					await ws_client.close()
-
-		# Run both forwarding tasks concurrently
+	async def _proxy_websocket_messages(self, ws_client, ws_asterisk, offload=None, tracker=None):
+		"""Bidirectionally proxy messages between client and Asterisk."""
 		try:
-			await asyncio.gather(
-				forward_client_to_asterisk(),
-				forward_asterisk_to_client(),
-				return_exceptions=True
+			await async_pipe_websockets(
+				ws_client,
+				ws_asterisk,
+				self._max_inflight,
+				(self._metrics.client_to_asterisk, self._metrics.asterisk_to_client),
+				offload,
+				tracker,
 			)
 		except Exception as e:
 			_LOGGER.error(f"WebSocket proxy error: {e}")
 		finally:
-			# Cleanup
-			try:
-				if not ws_client.closed:
-					await ws_client.close()
-				if not ws_asterisk.closed:
-					await ws_asterisk.close()
-				await session.close()
-			except Exception as e:
-				_LOGGER.error(f"Error during WebSocket cleanup: {e}")
-
 			_LOGGER.debug("WebSocket proxy: Connection closed")
 
 
+async def async_pipe_websockets(
+	ws_client,
+	ws_upstream,
+	max_inflight: int = DEFAULT_MAX_INFLIGHT,
+	counters=None,
+	offload: RegistrationOffload = None,
+	tracker: DialogTracker = None,
+):
+	"""Forward frames in both directions until either side goes away.
+
+	Each direction reads into a queue of at most ``max_inflight`` frames that
+	a separate task drains into the other socket. When the queue is full the
+	reader stops reading, so a slow peer pushes back on the sender instead of
+	growing a buffer in Home Assistant.
+
+	``counters`` is an optional (client→upstream, upstream→client) pair of
+	DirectionCounters to account forwarded frames to. With an ``offload``,
+	text frames pass through it and may be answered without reaching
+	Asterisk. A ``tracker`` sees every text frame as it arrived, before the
+	offload, and never changes it.
+	"""
+	debug = _LOGGER.isEnabledFor(logging.DEBUG)
+	to_upstream, to_client = counters or (DirectionCounters(), DirectionCounters())
+	upstream_queue = asyncio.Queue(max_inflight)
+	client_queue = asyncio.Queue(max_inflight)
+	tasks = [
+		asyncio.create_task(_async_forward(
+			ws_client, ws_upstream, upstream_queue, client_queue, debug, "C→A", to_upstream,
+			_inspector(tracker.client_frame if tracker else None, offload.client_frame if offload else None),
+		)),
+		asyncio.create_task(_async_forward(
+			ws_upstream, ws_client, client_queue, upstream_queue, debug, "A→C", to_client,
+			_inspector(tracker.upstream_frame if tracker else None, offload.upstream_frame if offload else None),
+		)),
+	]
+	try:
+		await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+	finally:
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
+		if offload is not None and not ws_upstream.closed:
+			# The client went away; drop its registration rather than let
+			# Asterisk keep ringing it until the long upstream expiry
+			unregister = offload.unregister_frame()
+			if unregister is not None:
+				try:
+					await ws_upstream.send_str(unregister)
+				except Exception as e:
+					_LOGGER.debug("Could not unregister offloaded client: %s", e)
+		for ws in (ws_client, ws_upstream):
+			if not ws.closed:
+				try:
+					await ws.close()
+				except Exception as e:
+					_LOGGER.error(f"Error during WebSocket cleanup: {e}")
+
+
+def _inspector(observe, inspect):
+	"""Combine a frame observer and an inspect function into one inspect function."""
+	if observe is None:
+		return inspect
+	if inspect is None:
+		def _observe_only(text):
+			observe(text)
+			return text, None
+		return _observe_only
+
+	def _observe_and_inspect(text):
+		observe(text)
+		return inspect(text)
+	return _observe_and_inspect
+
+
+async def _async_forward(
+	source,
+	sink,
+	queue: asyncio.Queue,
+	replies: asyncio.Queue,
+	debug: bool,
+	direction: str,
+	counters: DirectionCounters,
+	inspect=None,
+):
+	"""Read frames from source and queue them for the sink writer.
+
+	``inspect`` maps each text frame to ``(relay, reply)``: the text to
+	forward, if any, and the text to send back to the source instead, if
+	any. Replies go through the source's own queue to keep frames ordered.
+	"""
+	writer = asyncio.create_task(_async_drain(queue, sink))
+	reading = True
+	reader = asyncio.current_task()
+
+	def _writer_done(_task):
+		# The sink failed while we were still reading; stop reading too,
+		# otherwise a full queue would block the reader forever.
+		if reading:
+			reader.cancel()
+
+	writer.add_done_callback(_writer_done)
+
+	receive = source.receive
+	put = queue.put
+	try:
+		while True:
+			msg = await receive()
+			msg_type = msg.type
+			if inspect is not None and msg_type is WSMsgType.TEXT:
+				relay, reply = inspect(msg.data)
+				if reply is not None:
+					await replies.put(WSMessage(WSMsgType.TEXT, reply, None))
+				if relay is None:
+					counters.offloaded += 1
+					continue
+				if relay is not msg.data:
+					msg = WSMessage(WSMsgType.TEXT, relay, None)
+			if msg_type is WSMsgType.TEXT or msg_type is WSMsgType.BINARY:
+				counters.frames += 1
+				counters.bytes += len(msg.data)
+				if debug:
+					_LOGGER.debug("Proxy %s: %.100r", direction, msg.data)
+				await put(msg)
+			elif msg_type is WSMsgType.ERROR:
+				_LOGGER.error("WebSocket error on %s: %s", direction, source.exception())
+				break
+			elif msg_type in _CLOSE_TYPES:
+				if debug:
+					_LOGGER.debug("Proxy %s: source closed", direction)
+				break
+
+		# Let the writer flush what is already queued, then stop it
+		reading = False
+		await put(None)
+		await writer
+	finally:
+		reading = False
+		writer.cancel()
+
+
+async def _async_drain(queue: asyncio.Queue, sink):
+	"""Send queued frames to the sink until the end-of-stream marker."""
+	get = queue.get
+	send_str = sink.send_str
+	send_bytes = sink.send_bytes
+	while True:
+		msg = await get()
+		if msg is None:
+			return
+		if msg.type is WSMsgType.TEXT:
+			await send_str(msg.data)
+		else:
+			await send_bytes(msg.data)
+
+
+def _create_upstream_session() -> aiohttp.ClientSession:
+	"""Create the long-lived session used for all upstream Asterisk sockets."""
+	connector = aiohttp.TCPConnector(
+		limit=0,
+		use_dns_cache=True,
+		ttl_dns_cache=UPSTREAM_DNS_CACHE_TTL,
+		keepalive_timeout=UPSTREAM_KEEPALIVE_TIMEOUT,
+	)
+	return aiohttp.ClientSession(
+		connector=connector,
+		timeout=aiohttp.ClientTimeout(total=None, connect=UPSTREAM_CONNECT_TIMEOUT),
+	)
+
+
 def setup_websocket_proxy(hass: HomeAssistant):
 	"""Set up the WebSocket proxy."""
-	proxy_view = AsteriskWebSocketProxyView(hass)
+	# The upstream session is only created once a client connects
+	pool = UpstreamPool(hass, _create_upstream_session)
+	cancel_probe = async_track_time_interval(hass, pool.async_probe, UPSTREAM_PROBE_INTERVAL)
+
+	async def _async_close_session(event):
+		"""Close the shared upstream session when Home Assistant shuts down."""
+		cancel_probe()
+		await pool.async_close()
+
+	registry = hass.data[DATA_PROXY_SESSIONS] = ProxySessionRegistry()
+
+	async def _async_drain_sessions(event):
+		"""Close every proxied session before the HTTP server goes away."""
+		registry.closed = True
+		await registry.async_drain()
+
+	hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_drain_sessions)
+	hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+
+	proxy_view = AsteriskWebSocketProxyView(
+		hass,
+		pool,
+		async_get_metrics(hass),
+		async_get_ticket_signer(hass),
+		ClientLimiter(),
+		registry,
+	)
 	hass.http.register_view(proxy_view)
-	_LOGGER.info("WebSocket proxy registered at /api/asterisk_doorbell/ws")
\ No newline at end of file
+	_LOGGER.info("WebSocket proxy registered at /api/asterisk_doorbell/ws")
+
+
+async def async_drain_proxy_sessions(hass: HomeAssistant, entry_id: str = None):
+	"""Close the proxied sessions of an entry, or all of them."""
+	registry = hass.data.get(DATA_PROXY_SESSIONS)
+	if registry is not None:
+		await registry.async_drain(entry_id)
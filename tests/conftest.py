@@ -0,0 +1,28 @@
+"""Shared fixtures for the Asterisk Doorbell tests."""
+from types import SimpleNamespace
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.asterisk_doorbell import GlobalAsteriskCoordinator, services
+from custom_components.asterisk_doorbell.const import DOMAIN
+from custom_components.asterisk_doorbell.settings import async_cache_settings
+
+
+@pytest.fixture
+async def hass(tmp_path):
+    """Return a bare Home Assistant core, stopped after the test."""
+    hass = HomeAssistant(str(tmp_path))
+    yield hass
+    await services.async_unload_services(hass)
+    await hass.async_stop(force=True)
+
+
+def add_entry(hass: HomeAssistant, entry_id: str, **data) -> GlobalAsteriskCoordinator:
+    """Cache an entry's settings and route its confbridges to a new coordinator."""
+    async_cache_settings(hass, SimpleNamespace(entry_id=entry_id, data=data, options={}))
+    coordinator = GlobalAsteriskCoordinator(hass)
+    hass.data.setdefault(DOMAIN, {})[entry_id] = coordinator
+    services.async_update_routes(hass)
+    return coordinator
@@ -0,0 +1,141 @@
+"""Tests for the proxy tickets, the per-client limiter and the proxy's ticket check."""
+from aiohttp.test_utils import make_mocked_request
+import pytest
+
+from custom_components.asterisk_doorbell.access import TICKET_LIFETIME, ClientLimiter, ProxyTicketSigner
+from custom_components.asterisk_doorbell.metrics import async_get_metrics
+from custom_components.asterisk_doorbell.websocket_proxy import (
+    AsteriskWebSocketProxyView,
+    ProxySessionRegistry,
+)
+
+from .conftest import add_entry
+
+T0 = 1_700_000_000.0
+
+
+def test_ticket_round_trip():
+    """A fresh ticket verifies to the user it was issued for."""
+    signer = ProxyTicketSigner()
+    assert signer.verify(signer.issue("user-1", now=T0), now=T0) == "user-1"
+
+
+def test_ticket_expires():
+    """A ticket is valid for TICKET_LIFETIME seconds and no longer."""
+    signer = ProxyTicketSigner()
+    ticket = signer.issue("user-1", now=T0)
+
+    assert signer.verify(ticket, now=T0 + TICKET_LIFETIME) == "user-1"
+    assert signer.verify(ticket, now=T0 + TICKET_LIFETIME + 1) is None
+
+
+@pytest.mark.parametrize(
+    "tamper",
+    [
+        lambda ticket: ticket.replace("user-1", "user-2"),
+        lambda ticket: str(int(ticket.split(".")[0]) + 3600) + ticket[ticket.index("."):],
+        lambda ticket: ticket[:-2] + ("AA" if not ticket.endswith("AA") else "BB"),
+        lambda ticket: ticket.rpartition(".")[0],
+        lambda ticket: "",
+    ],
+    ids=["user", "expiry", "signature", "unsigned", "empty"],
+)
+def test_tampered_ticket_is_rejected(tamper):
+    """Changing any part of a ticket breaks its signature."""
+    signer = ProxyTicketSigner()
+    assert signer.verify(tamper(signer.issue("user-1", now=T0)), now=T0) is None
+
+
+def test_ticket_from_another_key_is_rejected():
+    """Tickets don't survive a restart, which picks a new key."""
+    ticket = ProxyTicketSigner().issue("user-1", now=T0)
+    assert ProxyTicketSigner().verify(ticket, now=T0) is None
+
+
+def test_limiter_burst_then_rate():
+    """A client gets its burst at once, then one socket per 1/rate seconds."""
+    limiter = ClientLimiter(max_connections=100, rate=2.0, burst=3)
+
+    assert [limiter.try_acquire("10.0.0.1", now=1.0) for _ in range(4)] == [True, True, True, False]
+    assert not limiter.try_acquire("10.0.0.1", now=1.4)
+    assert limiter.try_acquire("10.0.0.1", now=1.5)
+    assert limiter.try_acquire("10.0.0.2", now=1.5)
+
+
+def test_limiter_refill_is_capped_at_the_burst():
+    """A long idle client doesn't save up more than the burst."""
+    limiter = ClientLimiter(max_connections=100, rate=1.0, burst=2)
+    limiter.try_acquire("10.0.0.1", now=1.0)
+
+    assert [limiter.try_acquire("10.0.0.1", now=1000.0) for _ in range(3)] == [True, True, False]
+
+
+def test_limiter_caps_open_connections():
+    """Open sockets are capped per client until one is released."""
+    limiter = ClientLimiter(max_connections=2, rate=1.0, burst=10)
+
+    assert limiter.try_acquire("10.0.0.1", now=1.0)
+    assert limiter.try_acquire("10.0.0.1", now=1.0)
+    assert not limiter.try_acquire("10.0.0.1", now=1.0)
+    limiter.release("10.0.0.1")
+    assert limiter.try_acquire("10.0.0.1", now=1.0)
+
+
+@pytest.fixture
+def view(hass):
+    """Return a proxy view that reports where it would have proxied to."""
+    view = AsteriskWebSocketProxyView(
+        hass, None, async_get_metrics(hass), ProxyTicketSigner(), ClientLimiter(), ProxySessionRegistry()
+    )
+
+    async def proxied(request, settings, session):
+        return settings.entry_id
+
+    view._async_proxy = proxied
+    return view
+
+
+def request(query=""):
+    """Return a proxy upgrade request with the given query string."""
+    return make_mocked_request("GET", f"/api/asterisk_doorbell/ws{query}")
+
+
+async def test_proxy_requires_a_ticket(hass, view):
+    """Without a ticket the proxy answers 401."""
+    add_entry(hass, "entry", asterisk_host="10.0.0.1")
+
+    response = await view._async_handle(request())
+    assert response.status == 401
+    assert async_get_metrics(hass).proxy_rejected == 1
+
+
+async def test_proxy_rejects_a_bad_ticket(hass, view):
+    """A ticket that doesn't verify answers 401."""
+    add_entry(hass, "entry", asterisk_host="10.0.0.1")
+
+    response = await view._async_handle(request("?ticket=1.user-1.bogus"))
+    assert response.status == 401
+
+
+async def test_proxy_accepts_a_valid_ticket(hass, view):
+    """A valid ticket is proxied to the entry's Asterisk."""
+    add_entry(hass, "entry", asterisk_host="10.0.0.1")
+    ticket = view._signer.issue("user-1")
+
+    assert await view._async_handle(request(f"?ticket={ticket}")) == "entry"
+
+
+async def test_ticketless_fallback_is_opt_in(hass, view, caplog):
+    """An entry that allows ticketless clients lets them through with a warning."""
+    add_entry(hass, "entry", asterisk_host="10.0.0.1", allow_ticketless_proxy=True)
+
+    assert await view._async_handle(request()) == "entry"
+    assert "without a ticket" in caplog.text
+
+
+async def test_ticketless_client_learns_nothing_about_entries(hass, view):
+    """Without a ticket an ambiguous request is still just 401."""
+    add_entry(hass, "front", asterisk_host="10.0.0.1")
+    add_entry(hass, "back", asterisk_host="10.0.0.2")
+
+    assert (await view._async_handle(request())).status == 401
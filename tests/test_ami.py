@@ -0,0 +1,200 @@
+"""Tests for the AMI listener, run against a fake Asterisk Manager Interface."""
+import asyncio
+import logging
+
+import pytest
+
+from custom_components.asterisk_doorbell import ami, services
+
+from .conftest import add_entry
+
+USERNAME = "doorbell"
+SECRET = "s3cret"
+
+
+class FakeAmi:
+    """Just enough of an AMI server to log in and stream ConfBridge events."""
+
+    def __init__(self, secret):
+        """Initialize the server; logins are checked against secret."""
+        self.secret = secret
+        self.logins = []
+        self.sessions = asyncio.Queue()
+
+    async def handle(self, reader, writer):
+        """Serve one AMI connection."""
+        writer.write(b"Asterisk Call Manager/5.0.1\r\n")
+        action = {}
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            action[key.strip()] = value.strip()
+
+        accepted = action.get("Action") == "Login" and action.get("Secret") == self.secret
+        self.logins.append((action.get("Username"), accepted))
+        if not accepted:
+            writer.write(b"Response: Error\r\nMessage: Authentication failed\r\n\r\n")
+            await writer.drain()
+            writer.close()
+            return
+        writer.write(b"Response: Success\r\nMessage: Authentication accepted\r\n\r\n")
+        await writer.drain()
+        await self.sessions.put(writer)
+
+    @staticmethod
+    def event(writer, name, **fields):
+        """Send one event, with ChanVariable lines for chanvars."""
+        chanvars = fields.pop("chanvars", {})
+        lines = [f"Event: {name}"]
+        lines.extend(f"{key}: {value}" for key, value in fields.items())
+        lines.extend(f"ChanVariable: {key}={value}" for key, value in chanvars.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+
+
+async def wait_for_state(coordinator, confbridge_id, call_status):
+    """Wait until a confbridge has the given call status."""
+    async with asyncio.timeout(2):
+        while coordinator.bridge_state(confbridge_id)["call_status"] != call_status:
+            await asyncio.sleep(0.001)
+
+
+@pytest.fixture(autouse=True)
+def fast_timings(monkeypatch):
+    """Shrink the back-off and the gate's window so tests take milliseconds."""
+    monkeypatch.setattr(ami, "RECONNECT_MIN_DELAY", 0.01)
+    monkeypatch.setattr(ami, "RECONNECT_MAX_DELAY", 0.04)
+    monkeypatch.setattr(services, "COALESCE_WINDOW", 0.001)
+
+
+@pytest.fixture
+async def coordinator(hass):
+    """Return the coordinator of one entry taking every confbridge."""
+    coordinator = add_entry(hass, "entry")
+    await services.async_setup_services(hass)
+    return coordinator
+
+
+@pytest.fixture
+async def fake_ami():
+    """Run a fake AMI server on localhost."""
+    fake = FakeAmi(SECRET)
+    server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+    fake.port = server.sockets[0].getsockname()[1]
+    yield fake
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.fixture
+async def listener(hass, coordinator, fake_ami):
+    """Return a started listener connected to the fake server."""
+    listener = ami.AsteriskAmiListener(hass, "127.0.0.1", fake_ami.port, USERNAME, SECRET)
+    listener.async_start()
+    yield listener
+    await listener.async_stop()
+
+
+async def test_login_rejected_then_retried(hass, coordinator, fake_ami):
+    """A rejected login is retried after the back-off and then accepted."""
+    fake_ami.secret = "something else"
+    listener = ami.AsteriskAmiListener(hass, "127.0.0.1", fake_ami.port, USERNAME, SECRET)
+    listener.async_start()
+    try:
+        async with asyncio.timeout(2):
+            while not fake_ami.logins:
+                await asyncio.sleep(0.001)
+        assert not listener.connected
+        fake_ami.secret = SECRET
+        await asyncio.wait_for(fake_ami.sessions.get(), 2)
+        assert fake_ami.logins[0] == (USERNAME, False)
+        assert fake_ami.logins[-1] == (USERNAME, True)
+    finally:
+        await listener.async_stop()
+
+
+async def test_backoff_doubles_up_to_the_maximum(hass, coordinator, fake_ami, caplog):
+    """Failed logins back off exponentially, capped at the maximum delay."""
+    fake_ami.secret = "something else"
+    caplog.set_level(logging.DEBUG, logger=ami.__name__)
+    listener = ami.AsteriskAmiListener(hass, "127.0.0.1", fake_ami.port, USERNAME, SECRET)
+    listener.async_start()
+    try:
+        async with asyncio.timeout(2):
+            while len(fake_ami.logins) < 5:
+                await asyncio.sleep(0.001)
+    finally:
+        await listener.async_stop()
+
+    delays = [
+        record.args[0] for record in caplog.records if record.msg == "Reconnecting to AMI in %s seconds"
+    ]
+    assert delays[:4] == [0.01, 0.02, 0.04, 0.04]
+
+
+async def test_events_update_the_coordinator(hass, coordinator, fake_ami, listener):
+    """ConfBridge events become call, answered and terminate; others are ignored."""
+    writer = await asyncio.wait_for(fake_ami.sessions.get(), 2)
+
+    FakeAmi.event(writer, "FullyBooted", Status="Fully Booted")
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_1", Admin="No", CallerIDNum="100")
+    await wait_for_state(coordinator, "door_1", "ringing")
+
+    FakeAmi.event(writer, "Newchannel", Channel="PJSIP/200-00000001")
+    FakeAmi.event(
+        writer, "ConfbridgeJoin", Conference="door_1", Admin="Yes", CallerIDNum="200", chanvars={"ADMIN": "1001"}
+    )
+    await wait_for_state(coordinator, "door_1", "active")
+    assert coordinator.bridge_state("door_1")["extension"] == "1001"
+
+    FakeAmi.event(writer, "ConfbridgeLeave", Conference="door_1", Admin="No", CallerIDNum="100")
+    await wait_for_state(coordinator, "door_1", "inactive")
+
+
+async def test_admin_leaving_keeps_the_call(hass, coordinator, fake_ami, listener):
+    """Only the visitor leaving ends a call."""
+    writer = await asyncio.wait_for(fake_ami.sessions.get(), 2)
+
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_1", Admin="No", CallerIDNum="100")
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_1", Admin="Yes", CallerIDNum="200")
+    await wait_for_state(coordinator, "door_1", "active")
+    FakeAmi.event(writer, "ConfbridgeLeave", Conference="door_1", Admin="Yes", CallerIDNum="200")
+    FakeAmi.event(writer, "ConfbridgeEnd", Conference="door_2")
+    await writer.drain()
+    await asyncio.sleep(0.05)
+    assert coordinator.bridge_state("door_1")["call_status"] == "active"
+
+
+async def test_reconnects_after_the_connection_drops(hass, coordinator, fake_ami, listener):
+    """The listener logs in again and keeps applying events."""
+    writer = await asyncio.wait_for(fake_ami.sessions.get(), 2)
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_2", Admin="No", CallerIDNum="101")
+    await wait_for_state(coordinator, "door_2", "ringing")
+    writer.close()
+
+    writer = await asyncio.wait_for(fake_ami.sessions.get(), 2)
+    assert [accepted for _, accepted in fake_ami.logins] == [True, True]
+    FakeAmi.event(writer, "ConfbridgeEnd", Conference="door_2")
+    await wait_for_state(coordinator, "door_2", "inactive")
+
+
+async def test_unexpected_error_is_logged_and_retried(hass, coordinator, fake_ami, listener, monkeypatch, caplog):
+    """A bug handling a frame is logged and the listener reconnects."""
+    handle_event = listener._handle_event
+    failures = []
+
+    def fail_once(message, received):
+        if not failures:
+            failures.append(message)
+            raise RuntimeError("boom")
+        handle_event(message, received)
+
+    monkeypatch.setattr(listener, "_handle_event", fail_once)
+    writer = await asyncio.wait_for(fake_ami.sessions.get(), 2)
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_3", Admin="No", CallerIDNum="102")
+
+    writer = await asyncio.wait_for(fake_ami.sessions.get(), 2)
+    assert "Unexpected error on AMI connection" in caplog.text
+    FakeAmi.event(writer, "ConfbridgeJoin", Conference="door_3", Admin="No", CallerIDNum="102")
+    await wait_for_state(coordinator, "door_3", "ringing")
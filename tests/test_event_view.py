@@ -0,0 +1,117 @@
+"""Tests for the endpoint Asterisk posts call events to."""
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+import pytest
+
+from custom_components.asterisk_doorbell import services
+from custom_components.asterisk_doorbell.event_view import SECRET_HEADER, AsteriskEventView
+
+from .conftest import add_entry
+
+SECRET = "s3cret"
+CALL = {"event": "call", "confbridge": "door", "extension": "1001"}
+
+
+@pytest.fixture
+async def coordinator(hass):
+    """Return the coordinator of an entry with the event endpoint enabled."""
+    coordinator = add_entry(hass, "entry", event_secret=SECRET)
+    await services.async_setup_services(hass)
+    return coordinator
+
+
+@pytest.fixture
+async def client(hass):
+    """Return an HTTP client for the event endpoint."""
+    view = AsteriskEventView(hass)
+    app = web.Application()
+    app.router.add_post(AsteriskEventView.url, view.post)
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+async def test_form_event(hass, coordinator, client):
+    """A single form-encoded event, as CURL() posts it, is applied."""
+    response = await client.post(AsteriskEventView.url, data={**CALL, "secret": SECRET})
+
+    assert response.status == 200
+    assert await response.json() == {"accepted": 1}
+    assert coordinator.bridge_state("door")["call_status"] == "ringing"
+
+
+async def test_json_batch(hass, coordinator, client):
+    """A JSON batch authenticated by header is applied in order."""
+    response = await client.post(
+        AsteriskEventView.url,
+        json={"events": [
+            {**CALL, "confbridge": "door_1"},
+            {**CALL, "confbridge": "door_2"},
+        ]},
+        headers={SECRET_HEADER: SECRET},
+    )
+
+    assert await response.json() == {"accepted": 2}
+    assert coordinator.bridge_state("door_1")["call_status"] == "ringing"
+    assert coordinator.bridge_state("door_2")["call_status"] == "ringing"
+
+
+@pytest.mark.parametrize(
+    "bad_item",
+    [
+        {"event": "ring", "confbridge": "door_2"},
+        {"event": "call", "extension": "1001"},
+        {"confbridge": "door_2"},
+        "call",
+    ],
+    ids=["unknown event", "no confbridge", "no event", "not an object"],
+)
+async def test_batch_with_a_bad_item_is_rejected_whole(hass, coordinator, client, bad_item):
+    """One invalid event rejects the batch before any of it is applied."""
+    response = await client.post(
+        AsteriskEventView.url,
+        json={"secret": SECRET, "events": [{**CALL, "confbridge": "door_1"}, bad_item]},
+    )
+
+    assert response.status == 400
+    assert coordinator.bridge_state("door_1")["call_status"] == "inactive"
+
+
+@pytest.mark.parametrize("secret", ["wrong", "", SECRET + "x", SECRET[:-1]])
+async def test_wrong_secret_is_rejected(hass, coordinator, client, secret):
+    """Any secret other than the configured one answers 401."""
+    response = await client.post(AsteriskEventView.url, data={**CALL, "secret": secret})
+
+    assert response.status == 401
+    assert coordinator.bridge_state("door")["call_status"] == "inactive"
+
+
+async def test_missing_secret_is_rejected(hass, coordinator, client):
+    """A batch without a secret answers 401."""
+    response = await client.post(AsteriskEventView.url, json=[CALL])
+    assert response.status == 401
+
+
+async def test_any_entrys_secret_is_accepted(hass, coordinator, client):
+    """With several entries each one's secret works."""
+    add_entry(hass, "other", event_secret="other-secret")
+
+    response = await client.post(AsteriskEventView.url, data={**CALL, "secret": "other-secret"})
+    assert response.status == 200
+
+
+async def test_disabled_without_a_secret(hass, client):
+    """Without any configured secret the endpoint doesn't exist."""
+    add_entry(hass, "entry")
+
+    response = await client.post(AsteriskEventView.url, data=CALL)
+    assert response.status == 404
+
+
+async def test_invalid_json(hass, coordinator, client):
+    """A body that isn't JSON answers 400."""
+    response = await client.post(
+        AsteriskEventView.url, data="{", headers={"Content-Type": "application/json", SECRET_HEADER: SECRET}
+    )
+    assert response.status == 400
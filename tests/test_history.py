@@ -0,0 +1,127 @@
+"""Tests for the call history."""
+import pytest
+
+from homeassistant.helpers.storage import Store
+
+from custom_components.asterisk_doorbell import history
+from custom_components.asterisk_doorbell.const import STATE_ACTIVE, STATE_INACTIVE, STATE_RINGING
+from custom_components.asterisk_doorbell.history import CallHistory
+
+T0 = 1_700_000_000.0
+
+
+@pytest.fixture
+async def calls(hass):
+    """Return an empty, loaded call history."""
+    calls = CallHistory(hass)
+    await calls.async_load()
+    return calls
+
+
+def ring(calls, confbridge_id, at, extension="1001"):
+    """Record a call that rang and ended unanswered."""
+    calls.async_record(STATE_RINGING, confbridge_id, extension, at)
+    calls.async_record(STATE_INACTIVE, confbridge_id, "", at + 10)
+
+
+async def test_records_ring_answer_and_end(calls):
+    """A call keeps its ring, answer and end times."""
+    calls.async_record(STATE_RINGING, "door", "", T0)
+    calls.async_record(STATE_ACTIVE, "door", "1001", T0 + 4)
+    calls.async_record(STATE_INACTIVE, "door", "", T0 + 60)
+
+    assert calls.async_query() == [{
+        "confbridge": "door",
+        "extension": "1001",
+        "rang_at": T0,
+        "answered_at": T0 + 4,
+        "ended_at": T0 + 60,
+        "ring_to_answer": 4.0,
+        "answered": True,
+    }]
+
+
+async def test_terminate_without_call_is_ignored(calls):
+    """A terminate for a confbridge with no open call records nothing."""
+    calls.async_record(STATE_INACTIVE, "door", "", T0)
+    assert calls.async_query() == []
+
+
+async def test_query_by_time_confbridge_and_limit(calls):
+    """Queries select by ring time and confbridge, newest first."""
+    for index in range(10):
+        ring(calls, "front" if index % 2 else "back", T0 + index * 100)
+
+    rang = [call["rang_at"] for call in calls.async_query(start_time=T0 + 200, end_time=T0 + 500)]
+    assert rang == [T0 + 500, T0 + 400, T0 + 300, T0 + 200]
+
+    front = calls.async_query(confbridge_id="front", limit=2)
+    assert [call["rang_at"] for call in front] == [T0 + 900, T0 + 700]
+    assert calls.async_query(start_time=T0 + 1000) == []
+
+
+async def test_prunes_by_count(calls, monkeypatch):
+    """Only the newest MAX_CALLS calls are kept."""
+    monkeypatch.setattr(history, "MAX_CALLS", 3)
+    for index in range(5):
+        ring(calls, "door", T0 + index)
+
+    assert [call["rang_at"] for call in calls.async_query()] == [T0 + 4, T0 + 3, T0 + 2]
+
+
+async def test_prunes_by_age(calls):
+    """Calls older than MAX_AGE are dropped when a new one rings."""
+    ring(calls, "door", T0)
+    ring(calls, "door", T0 + 10)
+    ring(calls, "door", T0 + history.MAX_AGE + 5)
+
+    assert [call["rang_at"] for call in calls.async_query()] == [T0 + history.MAX_AGE + 5, T0 + 10]
+
+
+async def test_unanswered_call_goes_stale(calls):
+    """A ring that lost its terminate doesn't swallow the next call."""
+    calls.async_record(STATE_RINGING, "door", "1001", T0)
+    calls.async_record(STATE_RINGING, "door", "1001", T0 + history.STALE_CALL + 1)
+    calls.async_record(STATE_INACTIVE, "door", "", T0 + history.STALE_CALL + 20)
+
+    old, new = sorted(calls.async_query(), key=lambda call: call["rang_at"])
+    assert old["ended_at"] is None
+    assert new["ended_at"] == T0 + history.STALE_CALL + 20
+
+
+async def test_long_answered_call_keeps_its_end(calls):
+    """A conversation longer than STALE_CALL still ends at its terminate."""
+    calls.async_record(STATE_RINGING, "door", "", T0)
+    calls.async_record(STATE_ACTIVE, "door", "1001", T0 + 5)
+    calls.async_record(STATE_INACTIVE, "door", "", T0 + history.STALE_CALL * 2)
+
+    (call,) = calls.async_query()
+    assert call["ended_at"] == T0 + history.STALE_CALL * 2
+
+
+async def test_ring_after_answer_starts_a_new_call(calls):
+    """A ring on an answered call means its terminate was lost."""
+    calls.async_record(STATE_RINGING, "door", "", T0)
+    calls.async_record(STATE_ACTIVE, "door", "1001", T0 + 5)
+    calls.async_record(STATE_RINGING, "door", "", T0 + 100)
+
+    assert [call["rang_at"] for call in calls.async_query()] == [T0 + 100, T0]
+
+
+async def test_load_drops_stale_open_calls(hass, monkeypatch):
+    """After a restart, stale unanswered calls are not reopened; answered ones are."""
+    monkeypatch.setattr(history.time, "time", lambda: T0 + history.STALE_CALL * 2)
+    store = Store(hass, history.STORAGE_VERSION, history.STORAGE_KEY)
+    await store.async_save({"calls": [
+        [T0, None, None, "back", "1001"],
+        [T0, T0 + 5, None, "front", "1002"],
+    ]})
+
+    calls = CallHistory(hass)
+    await calls.async_load()
+    now = T0 + history.STALE_CALL * 2
+    calls.async_record(STATE_INACTIVE, "back", "", now)
+    calls.async_record(STATE_INACTIVE, "front", "", now)
+
+    ended = {call["confbridge"]: call["ended_at"] for call in calls.async_query()}
+    assert ended == {"back": None, "front": now}
@@ -0,0 +1,184 @@
+"""Tests for the event gate and the routing of call events."""
+import asyncio
+
+import pytest
+
+from custom_components.asterisk_doorbell import services
+from custom_components.asterisk_doorbell.const import DATA_DOOR_STATIONS
+from custom_components.asterisk_doorbell.metrics import async_get_metrics
+
+from .conftest import add_entry
+
+WINDOW = 0.02
+
+
+class FakeStations:
+    """Stand-in for an entry's door stations that counts hang-ups."""
+
+    def __init__(self):
+        """Initialize the counter."""
+        self.cancelled = 0
+
+    def async_cancel_calls(self):
+        """Count a hang-up round."""
+        self.cancelled += 1
+
+
+@pytest.fixture(autouse=True)
+def short_window(monkeypatch):
+    """Shrink the coalescing window."""
+    monkeypatch.setattr(services, "COALESCE_WINDOW", WINDOW)
+
+
+@pytest.fixture
+async def coordinator(hass):
+    """Return the coordinator of one entry with the services set up."""
+    coordinator = add_entry(hass, "entry")
+    await services.async_setup_services(hass)
+    return coordinator
+
+
+def dispatch(hass, event, extension="", sent_at=None, confbridge_id="door"):
+    """Hand one event to the gate."""
+    services.async_dispatch_event(hass, event, confbridge_id, extension, sent_at=sent_at)
+
+
+def applied(hass):
+    """Return the events that reached the coordinators, oldest first."""
+    return [(item["event"], item["extension"]) for item in services.async_get_transitions(hass)]
+
+
+async def close_window():
+    """Wait until the current coalescing window has closed."""
+    await asyncio.sleep(WINDOW * 3)
+
+
+async def test_first_terminate_for_unseen_bridge_is_applied(hass, coordinator):
+    """A terminate after a restart mid-call still hangs up the door stations."""
+    stations = hass.data[DATA_DOOR_STATIONS] = {"entry": FakeStations()}
+
+    dispatch(hass, "terminate")
+
+    assert applied(hass) == [("terminate", "")]
+    assert stations["entry"].cancelled == 1
+    assert async_get_metrics(hass).events_dropped == 0
+
+
+async def test_duplicates_are_dropped(hass, coordinator):
+    """A repeated call or terminate is applied once."""
+    dispatch(hass, "call", "1001")
+    dispatch(hass, "call", "1001")
+    await close_window()
+    dispatch(hass, "terminate")
+    dispatch(hass, "terminate")
+    await close_window()
+
+    assert applied(hass) == [("call", "1001"), ("terminate", "")]
+    assert async_get_metrics(hass).events_dropped == 2
+
+
+async def test_call_after_answered_is_stale(hass, coordinator):
+    """A late call can't move an answered call back to ringing."""
+    dispatch(hass, "call", "1001")
+    await close_window()
+    dispatch(hass, "answered", "1001")
+    await close_window()
+    dispatch(hass, "call", "1001")
+    await close_window()
+
+    assert applied(hass) == [("call", "1001"), ("answered", "1001")]
+    assert coordinator.bridge_state("door")["call_status"] == "active"
+
+
+async def test_retry_older_than_terminate_is_stale(hass, coordinator):
+    """A call sent before the terminate is a retry of the call that ended."""
+    dispatch(hass, "call", "1001", sent_at=100.0)
+    await close_window()
+    dispatch(hass, "terminate", sent_at=110.0)
+    await close_window()
+    dispatch(hass, "call", "1001", sent_at=100.0)
+    await close_window()
+
+    assert applied(hass) == [("call", "1001"), ("terminate", "")]
+    assert coordinator.bridge_state("door")["call_status"] == "inactive"
+
+
+async def test_quick_re_ring_is_applied(hass, coordinator):
+    """A new call right after a terminate rings again."""
+    dispatch(hass, "call", "1001", sent_at=100.0)
+    await close_window()
+    dispatch(hass, "terminate", sent_at=110.0)
+    await close_window()
+    dispatch(hass, "call", "1001", sent_at=110.5)
+
+    assert applied(hass)[-1] == ("call", "1001")
+    assert coordinator.bridge_state("door")["call_status"] == "ringing"
+
+
+async def test_events_without_timestamp_are_accepted(hass, coordinator):
+    """Without timestamps a call after a terminate can't be told stale."""
+    dispatch(hass, "call", "1001", sent_at=100.0)
+    await close_window()
+    dispatch(hass, "terminate", sent_at=110.0)
+    await close_window()
+    dispatch(hass, "call", "1001")
+
+    assert coordinator.bridge_state("door")["call_status"] == "ringing"
+
+
+async def test_burst_is_coalesced(hass, coordinator):
+    """The first event applies at once, the rest of a burst once the window closes."""
+    dispatch(hass, "call", "1001")
+    dispatch(hass, "answered", "1001")
+    dispatch(hass, "terminate")
+
+    assert applied(hass) == [("call", "1001")]
+    await close_window()
+    assert applied(hass) == [("call", "1001"), ("terminate", "")]
+    assert async_get_metrics(hass).events_coalesced == 1
+
+
+async def test_burst_ending_where_it_started_is_not_applied(hass, coordinator):
+    """A window that ends in the applied state writes nothing more."""
+    dispatch(hass, "call", "1001")
+    dispatch(hass, "terminate")
+    dispatch(hass, "call", "1001")
+    await close_window()
+
+    assert applied(hass) == [("call", "1001")]
+    assert coordinator.bridge_state("door")["call_status"] == "ringing"
+
+
+async def test_confbridges_are_gated_separately(hass, coordinator):
+    """Events for one confbridge don't coalesce or drop another's."""
+    dispatch(hass, "call", "1001", confbridge_id="door_1")
+    dispatch(hass, "call", "1001", confbridge_id="door_2")
+
+    assert coordinator.bridge_state("door_1")["call_status"] == "ringing"
+    assert coordinator.bridge_state("door_2")["call_status"] == "ringing"
+
+
+async def test_unload_resets_the_gate(hass, coordinator):
+    """Services set up again after an unload start from a fresh gate."""
+    dispatch(hass, "call", "1001")
+    await services.async_unload_services(hass)
+    assert services.DATA_GATE not in hass.data
+
+    await services.async_setup_services(hass)
+    dispatch(hass, "call", "1001")
+    assert applied(hass) == [("call", "1001"), ("call", "1001")]
+
+
+async def test_events_reach_only_the_owning_entries(hass):
+    """A confbridge an entry lists is not applied to the other entries."""
+    front = add_entry(hass, "front", confbridges="door_front")
+    other = add_entry(hass, "other")
+    await services.async_setup_services(hass)
+
+    dispatch(hass, "call", "1001", confbridge_id="door_front")
+    dispatch(hass, "call", "1002", confbridge_id="door_back")
+
+    assert front.bridge_state("door_front")["call_status"] == "ringing"
+    assert other.bridge_state("door_front")["call_status"] == "inactive"
+    assert other.bridge_state("door_back")["call_status"] == "ringing"
+    assert front.bridge_state("door_back")["call_status"] == "inactive"
@@ -0,0 +1,44 @@
+"""Tests for resolving which entry's settings a request means."""
+from custom_components.asterisk_doorbell.settings import (
+    async_get_settings,
+    async_is_ambiguous,
+    async_settings_error,
+)
+
+from .conftest import add_entry
+
+
+async def test_not_set_up(hass):
+    """Without entries there are no settings."""
+    assert async_get_settings(hass) is None
+    assert not async_is_ambiguous(hass)
+    assert async_settings_error(hass) == "Asterisk Doorbell is not set up"
+
+
+async def test_single_entry_needs_no_entry_id(hass):
+    """With one entry it is used when no entry_id is given."""
+    add_entry(hass, "front", asterisk_host="10.0.0.1")
+
+    assert async_get_settings(hass).entry_id == "front"
+    assert async_get_settings(hass, "front").asterisk_host == "10.0.0.1"
+    assert not async_is_ambiguous(hass)
+
+
+async def test_several_entries_need_an_entry_id(hass):
+    """With several entries no entry is picked without an entry_id."""
+    add_entry(hass, "front", asterisk_host="10.0.0.1")
+    add_entry(hass, "back", asterisk_host="10.0.0.2")
+
+    assert async_get_settings(hass) is None
+    assert async_is_ambiguous(hass)
+    assert "pass entry_id" in async_settings_error(hass)
+    assert async_get_settings(hass, "back").asterisk_host == "10.0.0.2"
+    assert not async_is_ambiguous(hass, "back")
+
+
+async def test_unknown_entry(hass):
+    """An entry_id that isn't loaded resolves to nothing."""
+    add_entry(hass, "front")
+
+    assert async_get_settings(hass, "gone") is None
+    assert async_settings_error(hass, "gone") == "No loaded Asterisk Doorbell entry gone"
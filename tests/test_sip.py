@@ -0,0 +1,267 @@
+"""Tests for the SIP inspection done by the WebSocket proxy."""
+import pytest
+
+from custom_components.asterisk_doorbell import sip
+from custom_components.asterisk_doorbell.metrics import SipClientStats
+from custom_components.asterisk_doorbell.sip import (
+    KEEPALIVE_PING,
+    KEEPALIVE_PONG,
+    DialogTracker,
+    RegistrationOffload,
+    parse_message,
+    peek_message,
+)
+
+CONTACT = "<sip:k3j2@df7jal23ls0d.invalid;transport=ws>"
+AUTHORIZATION = 'Digest username="1001", realm="asterisk", nonce="abc", uri="sip:10.0.0.1", response="f00d"'
+
+
+def register(cseq, expires=300, contact=CONTACT, call_id="reg-1", authorization=None):
+    """Return a REGISTER as JsSIP sends it."""
+    lines = [
+        "REGISTER sip:10.0.0.1 SIP/2.0",
+        f"Via: SIP/2.0/WSS df7jal23ls0d.invalid;branch=z9hG4bK{cseq:04d}",
+        "From: <sip:1001@10.0.0.1>;tag=client",
+        "To: <sip:1001@10.0.0.1>",
+        f"Call-ID: {call_id}",
+        f"CSeq: {cseq} REGISTER",
+        f"Contact: {contact};expires={expires}",
+        f"Expires: {expires}",
+    ]
+    if authorization:
+        lines.append(f"Authorization: {authorization}")
+    lines.append("Content-Length: 0")
+    return "\r\n".join(lines) + "\r\n\r\n"
+
+
+def response(cseq, status="200 OK", expires=600, call_id="reg-1", method="REGISTER"):
+    """Return Asterisk's response to a request."""
+    lines = [
+        f"SIP/2.0 {status}",
+        f"Via: SIP/2.0/WSS df7jal23ls0d.invalid;branch=z9hG4bK{cseq:04d}",
+        "From: <sip:1001@10.0.0.1>;tag=client",
+        "To: <sip:1001@10.0.0.1>;tag=server",
+        f"Call-ID: {call_id}",
+        f"CSeq: {cseq} {method}",
+        f"Contact: {CONTACT};expires={expires}",
+        f"Expires: {expires}",
+        "Content-Length: 0",
+    ]
+    return "\r\n".join(lines) + "\r\n\r\n"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Control the monotonic clock the offload reads."""
+    now = [1000.0]
+    monkeypatch.setattr(sip.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def registered(clock):
+    """Return an offload whose client holds a 600 second upstream binding."""
+    offload = RegistrationOffload()
+    offload.client_frame(register(1, authorization=AUTHORIZATION))
+    offload.upstream_frame(response(1))
+    return offload
+
+
+def test_keepalive_ping_is_answered_locally():
+    """A double-CRLF ping gets its pong without reaching Asterisk."""
+    offload = RegistrationOffload()
+    assert offload.client_frame(KEEPALIVE_PING) == (None, KEEPALIVE_PONG)
+    assert offload.answered == 1
+
+
+def test_other_requests_are_relayed_unchanged():
+    """Only registrations are touched."""
+    offload = RegistrationOffload()
+    invite = register(1).replace("REGISTER", "INVITE")
+    assert offload.client_frame(invite) == (invite, None)
+    assert offload.upstream_frame(response(1, method="INVITE")) == (response(1, method="INVITE"), None)
+
+
+def test_first_register_is_lengthened_upstream(clock):
+    """Asterisk is asked for the long expiry, the client sees the one it asked for."""
+    offload = RegistrationOffload()
+
+    relayed, reply = offload.client_frame(register(1))
+    assert reply is None
+    assert parse_message(relayed).expires() == sip.UPSTREAM_REGISTER_EXPIRES
+    assert parse_message(relayed).header("expires") == str(sip.UPSTREAM_REGISTER_EXPIRES)
+
+    relayed, _ = offload.upstream_frame(response(1))
+    assert parse_message(relayed).expires() == 300
+
+
+def test_refresh_is_answered_while_the_binding_lasts(registered, clock):
+    """A refresh the upstream binding comfortably outlives gets a local 200 OK."""
+    clock[0] += 100
+
+    relayed, reply = registered.client_frame(register(2))
+    assert relayed is None
+    ok = parse_message(reply)
+    assert ok.status == 200
+    assert ok.header("call-id") == "reg-1"
+    assert ok.header("cseq") == "2 REGISTER"
+    assert ok.header("to") == "<sip:1001@10.0.0.1>;tag=server"
+    assert ok.header("via") == "SIP/2.0/WSS df7jal23ls0d.invalid;branch=z9hG4bK0002"
+    assert ok.expires() == 300
+    assert registered.answered == 1
+
+
+def test_refresh_near_expiry_is_relayed(registered, clock):
+    """Once the binding might lapse before the next refresh, Asterisk is asked again."""
+    clock[0] += 600 - 300 - sip.REFRESH_MARGIN
+
+    relayed, reply = registered.client_frame(register(2))
+    assert reply is None
+    assert parse_message(relayed).cseq() == (2, "REGISTER")
+
+
+def test_refresh_with_new_contact_is_relayed(registered, clock):
+    """A client that changed its contact needs a new binding."""
+    relayed, reply = registered.client_frame(register(2, contact="<sip:other@x.invalid;transport=ws>"))
+    assert relayed is not None and reply is None
+
+
+def test_rejected_register_leaves_no_binding(clock):
+    """A challenged REGISTER isn't treated as a binding."""
+    offload = RegistrationOffload()
+    offload.client_frame(register(1))
+    offload.upstream_frame(response(1, status="401 Unauthorized"))
+
+    relayed, reply = offload.client_frame(register(2))
+    assert relayed is not None and reply is None
+    assert offload.unregister_frame() is None
+
+
+def test_unregister_reuses_the_clients_authorization(registered):
+    """The un-REGISTER carries the last Authorization, Expires 0 and a fresh branch."""
+    unregister = parse_message(registered.unregister_frame())
+
+    assert unregister.method == "REGISTER"
+    assert unregister.header("authorization") == AUTHORIZATION
+    assert unregister.header("call-id") == "reg-1"
+    assert unregister.cseq() == (2, "REGISTER")
+    assert unregister.expires() == 0
+    assert unregister.header("expires") == "0"
+    assert "branch=z9hG4bK0001" not in unregister.header("via")
+    assert registered.unregister_frame() is None
+
+
+def test_no_unregister_after_the_binding_lapsed(registered, clock):
+    """A binding Asterisk already dropped isn't removed again."""
+    clock[0] += 601
+    assert registered.unregister_frame() is None
+
+
+def test_no_unregister_after_the_client_unregistered(registered):
+    """A client that unregistered itself leaves nothing to remove."""
+    registered.client_frame(register(2, expires=0))
+    registered.upstream_frame(response(2, expires=0))
+    assert registered.unregister_frame() is None
+
+
+def request(method, cseq, call_id="call-1"):
+    """Return a bodyless request of a dialog."""
+    return (
+        f"{method} sip:1001@10.0.0.1 SIP/2.0\r\n"
+        "Via: SIP/2.0/WSS 10.0.0.1;branch=z9hG4bK77\r\n"
+        f"Call-ID: {call_id}\r\n"
+        f"CSeq: {cseq} {method}\r\n"
+        "Content-Length: 0\r\n\r\n"
+    )
+
+
+@pytest.fixture
+def tracker():
+    """Return a tracker with a clock the test moves by hand."""
+    tracker = DialogTracker(SipClientStats(), clock=lambda: tracker.now)
+    tracker.now = 0.0
+    return tracker
+
+
+def test_peek_message_reads_compact_and_odd_spellings():
+    """Call-ID and CSeq are found in any spelling, the body is ignored."""
+    text = "INVITE sip:1001@10.0.0.1 SIP/2.0\r\ni: abc\r\ncseq: 7 INVITE\r\n\r\nCall-ID: body"
+    assert peek_message(text) == ("INVITE sip:1001@10.0.0.1 SIP/2.0", "abc", "7 INVITE")
+    assert peek_message("not sip\r\n\r\n") is None
+    assert peek_message("INVITE sip:1001@10.0.0.1 SIP/2.0\r\nCall-ID: abc") is None
+
+
+def test_answered_call_and_hang_up(tracker):
+    """An INVITE answered and later hung up is timed from end to end."""
+    stats = tracker.stats
+    tracker.upstream_frame(request("INVITE", 1))
+    tracker.client_frame(response(1, status="180 Ringing", call_id="call-1", method="INVITE"))
+    tracker.now = 2.5
+    tracker.client_frame(response(1, call_id="call-1", method="INVITE"))
+    assert (stats.invites, stats.answered, stats.active_dialogs) == (1, 1, 1)
+    assert stats.answer_ms.total == 2500
+
+    tracker.now = 62.5
+    tracker.client_frame(request("BYE", 2))
+    tracker.now = 62.55
+    tracker.upstream_frame(response(2, call_id="call-1", method="BYE"))
+    assert stats.active_dialogs == 0
+    assert stats.call_s.total == 60
+    assert stats.bye_ms.count == 1
+    assert stats.bye_ms.total == pytest.approx(50)
+
+
+def test_re_invite_is_not_a_new_call(tracker):
+    """A re-INVITE within an answered dialog doesn't count as a call."""
+    tracker.upstream_frame(request("INVITE", 1))
+    tracker.client_frame(response(1, call_id="call-1", method="INVITE"))
+    tracker.upstream_frame(request("INVITE", 2))
+    tracker.client_frame(response(2, call_id="call-1", method="INVITE"))
+
+    assert (tracker.stats.invites, tracker.stats.answered, tracker.stats.active_dialogs) == (1, 1, 1)
+
+
+def test_failures_are_counted_except_challenges(tracker):
+    """Error responses are counted by status; auth challenges are not."""
+    tracker.upstream_frame(request("INVITE", 1))
+    tracker.client_frame(response(1, status="486 Busy Here", call_id="call-1", method="INVITE"))
+    tracker.upstream_frame(response(1, status="401 Unauthorized"))
+    tracker.upstream_frame(response(2, status="407 Proxy Authentication Required"))
+    tracker.upstream_frame(response(3, status="503 Service Unavailable"))
+
+    assert tracker.stats.failures == {486: 1, 503: 1}
+    assert (tracker.stats.answered, tracker.stats.active_dialogs) == (0, 0)
+
+
+def test_register_intervals(tracker):
+    """Each REGISTER is counted and the time between them observed."""
+    for tracker.now in (0.0, 300.0, 600.0):
+        tracker.client_frame(register(int(tracker.now) + 1))
+
+    assert tracker.stats.registers == 3
+    assert tracker.stats.register_interval_s.count == 2
+    assert tracker.stats.register_interval_s.total == 600
+
+
+def test_tracked_dialogs_are_capped(tracker):
+    """Only the newest MAX_TRACKED dialogs are remembered per socket."""
+    for index in range(DialogTracker.MAX_TRACKED + 4):
+        call_id = f"call-{index}"
+        tracker.upstream_frame(request("INVITE", 1, call_id))
+        tracker.client_frame(response(1, call_id=call_id, method="INVITE"))
+
+    assert tracker.stats.active_dialogs == DialogTracker.MAX_TRACKED
+    tracker.close()
+    assert tracker.stats.active_dialogs == 0
+
+
+def test_close_forgets_the_sockets_dialogs(tracker):
+    """A socket that goes away takes its open calls with it, not other sockets'."""
+    other = DialogTracker(tracker.stats, clock=lambda: 0.0)
+    for dialogs, call_id in ((tracker, "call-1"), (other, "call-2")):
+        dialogs.upstream_frame(request("INVITE", 1, call_id))
+        dialogs.client_frame(response(1, call_id=call_id, method="INVITE"))
+    assert tracker.stats.active_dialogs == 2
+
+    tracker.close()
+    assert tracker.stats.active_dialogs == 1
@@ -0,0 +1,157 @@
+"""Tests for choosing and failing over between Asterisk upstreams."""
+import aiohttp
+import pytest
+
+from custom_components.asterisk_doorbell.upstream import UpstreamPool
+
+from .conftest import add_entry
+
+PRIMARY = "ws://10.0.0.1:8089/ws"
+SECONDARY = "ws://10.0.0.2:8089/ws"
+TERTIARY = "ws://10.0.0.3:8089/ws"
+
+
+class FakeWebSocket:
+    """A connected upstream socket."""
+
+    def __init__(self, url):
+        """Initialize the socket."""
+        self.url = url
+        self.closed = False
+
+    async def close(self):
+        """Close the socket."""
+        self.closed = True
+
+
+class FakeSession:
+    """Stand-in for the shared client session, with upstreams that can be down."""
+
+    def __init__(self):
+        """Initialize the session with every upstream up."""
+        self.down = set()
+        self.attempts = []
+        self.closed = False
+
+    async def ws_connect(self, url, protocols):
+        """Connect, or fail like aiohttp does for an unreachable server."""
+        self.attempts.append(url)
+        if url in self.down:
+            raise aiohttp.ClientConnectionError(f"{url} is down")
+        return FakeWebSocket(url)
+
+    async def close(self):
+        """Close the session."""
+        self.closed = True
+
+
+@pytest.fixture
+def session():
+    """Return the fake session."""
+    return FakeSession()
+
+
+@pytest.fixture
+def pool(hass, session):
+    """Return a pool using the fake session."""
+    return UpstreamPool(hass, lambda: session)
+
+
+async def test_session_is_created_on_first_connect(hass, session):
+    """Setting up the proxy doesn't create a client session."""
+    created = []
+    pool = UpstreamPool(hass, lambda: created.append(session) or session)
+    assert not created
+
+    await pool.async_connect([PRIMARY])
+    await pool.async_connect([PRIMARY])
+    assert created == [session]
+
+    await pool.async_close()
+    assert session.closed
+
+
+async def test_least_loaded_healthy_upstream_first(pool):
+    """Connections spread over healthy upstreams, ties in configured order."""
+    urls = [PRIMARY, SECONDARY]
+
+    _, first = await pool.async_connect(urls)
+    _, second = await pool.async_connect(urls)
+    _, third = await pool.async_connect(urls)
+
+    assert [first.url, second.url, third.url] == [PRIMARY, SECONDARY, PRIMARY]
+    pool.release(first)
+    pool.release(third)
+    assert [upstream.url for upstream in pool.candidates(urls)] == [PRIMARY, SECONDARY]
+
+
+async def test_fails_over_and_marks_the_upstream_unhealthy(pool, session):
+    """A failed upstream is skipped and then tried last."""
+    session.down.add(PRIMARY)
+
+    ws, upstream = await pool.async_connect([PRIMARY, SECONDARY])
+    assert (ws.url, upstream.url) == (SECONDARY, SECONDARY)
+    assert pool.as_dict() == {
+        PRIMARY: {"healthy": False, "active": 0},
+        SECONDARY: {"healthy": True, "active": 1},
+    }
+    assert [upstream.url for upstream in pool.candidates([PRIMARY, SECONDARY, TERTIARY])] == [
+        TERTIARY, SECONDARY, PRIMARY
+    ]
+
+
+async def test_unhealthy_upstream_is_the_last_resort(pool, session):
+    """An upstream marked unhealthy is still used when it is the only one left."""
+    session.down.update((PRIMARY, SECONDARY))
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await pool.async_connect([PRIMARY, SECONDARY])
+
+    session.down.discard(PRIMARY)
+    _, upstream = await pool.async_connect([PRIMARY, SECONDARY])
+    assert upstream.url == PRIMARY
+    assert upstream.healthy
+
+
+async def test_no_upstreams(pool):
+    """Without upstreams connecting fails."""
+    with pytest.raises(aiohttp.ClientError):
+        await pool.async_connect([])
+
+
+async def test_probe_only_with_a_choice(hass, pool, session):
+    """Entries with a single upstream aren't probed."""
+    add_entry(hass, "entry", asterisk_host="10.0.0.1")
+
+    await pool.async_probe()
+    assert session.attempts == []
+
+
+async def test_probe_updates_health(hass, pool, session):
+    """Probing marks upstreams down and up again."""
+    add_entry(hass, "entry", asterisk_host="10.0.0.1", additional_upstreams="10.0.0.2")
+    session.down.add(SECONDARY)
+
+    await pool.async_probe()
+    assert pool.as_dict() == {
+        PRIMARY: {"healthy": True, "active": 0},
+        SECONDARY: {"healthy": False, "active": 0},
+    }
+
+    session.down.clear()
+    await pool.async_probe()
+    assert pool.as_dict()[SECONDARY]["healthy"]
+
+
+async def test_probe_forgets_idle_unconfigured_upstreams(hass, pool):
+    """Upstreams no entry lists are dropped once nothing uses them."""
+    add_entry(hass, "entry", asterisk_host="10.0.0.1")
+    _, busy = await pool.async_connect([TERTIARY])
+    await pool.async_connect([SECONDARY])
+    pool.release(pool.candidates([SECONDARY])[0])
+
+    await pool.async_probe()
+    assert set(pool.as_dict()) == {TERTIARY}
+
+    pool.release(busy)
+    await pool.async_probe()
+    assert pool.as_dict() == {}